@@ -1,3 +1,3 @@
 """Bake orchestration stubs."""
 
-__all__ = ["pipeline"]
+__all__ = ["pipeline", "scheduler", "framestore"]
@@ -8,26 +8,47 @@ from typing import Iterable, Sequence
 
 import numpy as np
 
+from fieldfixer.io.manifest import MANIFEST_NAME, Manifest
+from fieldfixer.io.sidecar import SidecarWriter
+from fieldfixer.ops.tiles import DEFAULT_TILE, activity_map
+
 try:  # Optional dependency for image output; imported lazily elsewhere too.
     import imageio.v3 as iio
 except Exception:  # pragma: no cover - tests stub in tmp envs that may lack imageio
     iio = None
 
 
-def pack_sidecars(target_dirs: Iterable[Path], flow_dirs: Iterable[Path], out_dir: Path) -> None:
-    """Convert rendered targets and flow fields into runtime sidecars."""
+def pack_sidecars(
+    target_dirs: Iterable[Path],
+    flow_dirs: Iterable[Path],
+    out_dir: Path,
+    manifest: Manifest | None = None,
+    frame_range: tuple[int, int] | None = None,
+) -> None:
+    """Convert rendered targets and flow fields into runtime sidecars.
+
+    Flow and confidence files are located through ``manifest`` (a fresh one
+    by default), so each input directory is listed once instead of probed per
+    frame. The bake gets its own ``manifest.json`` of its top level and sidecar
+    directories, which the runtime uses instead of probing for curves, the
+    LUT and (without ``refs.json``) per-frame sidecars.
+    With ``frame_range`` (``(start, end)``, end exclusive) only those frames
+    are packed and the bake is recorded as a shard covering that range.
+    """
 
     target_dirs = [Path(p) for p in target_dirs]
     flow_dirs = [Path(p) for p in flow_dirs]
     out_dir = Path(out_dir)
+    if manifest is None:
+        manifest = Manifest()
 
-    w_dir = out_dir / "W"
-    m_dir = out_dir / "M"
     lut_dir = out_dir / "LUT"
-    for folder in (w_dir, m_dir, lut_dir):
-        folder.mkdir(parents=True, exist_ok=True)
+    lut_dir.mkdir(parents=True, exist_ok=True)
+    writer = SidecarWriter(out_dir)
 
-    frame_indices = _collect_frame_indices(flow_dirs)
+    frame_indices = _collect_frame_indices(flow_dirs, manifest)
+    if frame_range is not None:
+        frame_indices = [i for i in frame_indices if frame_range[0] <= i < frame_range[1]]
     if not frame_indices:
         return
 
@@ -35,69 +56,62 @@ def pack_sidecars(target_dirs: Iterable[Path], flow_dirs: Iterable[Path], out_di
     shape_hint: tuple[int, int] | None = None
 
     for frame_idx in frame_indices:
-        flows, confidences = _load_flows_for_frame(flow_dirs, frame_idx)
+        flows, confidences = _load_flows_for_frame(flow_dirs, frame_idx, manifest)
         if not flows:
             continue
         height, width = flows[0].shape[:2]
         shape_hint = (height, width)
 
         fused_flow, fused_conf = _fuse_flows(flows, confidences)
-        _write_warp(w_dir / f"{frame_idx:06d}.npz", fused_flow)
-        _write_mask(m_dir / f"{frame_idx:06d}.png", fused_conf)
+        _write_warp(writer, frame_idx, fused_flow)
+        mask = _write_mask(writer, frame_idx, fused_conf)
+        _write_tiles(writer, frame_idx, fused_flow, mask)
         written_frames.append(frame_idx)
 
+    writer.close()
     if not written_frames:
         return
 
     _maybe_copy_curves(target_dirs, out_dir)
     _maybe_copy_lut(target_dirs, lut_dir)
-    _write_meta(out_dir, flow_dirs, written_frames, shape_hint)
+    _write_meta(out_dir, flow_dirs, written_frames, shape_hint, frame_range)
+    Manifest.scan(out_dir, (".", "W", "M", "T", "LUT")).save(out_dir / MANIFEST_NAME)
 
 
-def _collect_frame_indices(flow_dirs: Sequence[Path]) -> list[int]:
+def _collect_frame_indices(flow_dirs: Sequence[Path], manifest: Manifest) -> list[int]:
     indices: set[int] = set()
     for flow_dir in flow_dirs:
-        if not flow_dir.exists():
-            continue
-        for file in flow_dir.glob("*.npy"):
-            idx = _parse_frame_index(file.stem)
-            if idx is not None:
-                indices.add(idx)
+        indices.update(manifest.frame_indices(flow_dir, ".npy"))
     return sorted(indices)
 
 
-def _parse_frame_index(stem: str) -> int | None:
-    try:
-        return int(stem)
-    except ValueError:
-        return None
-
-
-def _load_flows_for_frame(flow_dirs: Sequence[Path], frame_idx: int) -> tuple[list[np.ndarray], list[np.ndarray]]:
+def _load_flows_for_frame(
+    flow_dirs: Sequence[Path], frame_idx: int, manifest: Manifest
+) -> tuple[list[np.ndarray], list[np.ndarray]]:
     flows: list[np.ndarray] = []
     confidences: list[np.ndarray] = []
     for flow_dir in flow_dirs:
         flow_path = flow_dir / f"{frame_idx:06d}.npy"
-        if not flow_path.exists():
+        if not manifest.exists(flow_path):
             continue
         flow = np.load(flow_path)
         if flow.ndim != 3 or flow.shape[2] != 2:
             raise ValueError(f"Invalid flow shape {flow.shape} at {flow_path}")
         flow = flow.astype(np.float32, copy=False)
-        conf = _load_confidence_map(flow_dir, frame_idx, flow.shape[:2])
+        conf = _load_confidence_map(flow_dir, frame_idx, flow.shape[:2], manifest)
         flows.append(flow)
         confidences.append(conf)
     return flows, confidences
 
 
-def _load_confidence_map(flow_dir: Path, frame_idx: int, shape: tuple[int, int]) -> np.ndarray:
+def _load_confidence_map(flow_dir: Path, frame_idx: int, shape: tuple[int, int], manifest: Manifest) -> np.ndarray:
     candidates = [
         flow_dir.parent / "conf" / f"{frame_idx:06d}.npy",
         flow_dir.parent / "conf" / flow_dir.name / f"{frame_idx:06d}.npy",
         flow_dir / "conf" / f"{frame_idx:06d}.npy",
     ]
     for cand in candidates:
-        if cand.exists():
+        if manifest.exists(cand):
             conf = np.load(cand)
             if conf.ndim == 3 and conf.shape[-1] == 1:
                 conf = conf[..., 0]
@@ -131,19 +145,22 @@ def _fuse_flows(flows: Sequence[np.ndarray], confidences: Sequence[np.ndarray])
     return fused_flow, fused_conf
 
 
-def _write_warp(path: Path, flow: np.ndarray) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    du = flow[..., 0].astype(np.float16)
-    dv = flow[..., 1].astype(np.float16)
-    np.savez_compressed(path, du=du, dv=dv)
+def _write_warp(writer: SidecarWriter, frame_idx: int, flow: np.ndarray) -> None:
+    writer.write_warp(frame_idx, flow[..., 0], flow[..., 1])
 
 
-def _write_mask(path: Path, confidence: np.ndarray) -> None:
+def _write_mask(writer: SidecarWriter, frame_idx: int, confidence: np.ndarray) -> np.ndarray:
     if iio is None:
         raise RuntimeError("imageio.v3 is required to write mask PNGs")
     mask = np.clip(confidence * 255.0, 0, 255).astype(np.uint8)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    iio.imwrite(path, mask)
+    writer.write_mask(frame_idx, mask)
+    return mask
+
+
+def _write_tiles(writer: SidecarWriter, frame_idx: int, flow: np.ndarray, mask: np.ndarray) -> None:
+    # Judge activity on the float16 values the warp is stored as.
+    stored = flow.astype(np.float16)
+    writer.write_tiles(frame_idx, activity_map(stored[..., 0], stored[..., 1], mask, tile=DEFAULT_TILE))
 
 
 def _maybe_copy_curves(target_dirs: Sequence[Path], out_dir: Path) -> None:
@@ -165,7 +182,13 @@ def _maybe_copy_lut(target_dirs: Sequence[Path], lut_dir: Path) -> None:
                 return
 
 
-def _write_meta(out_dir: Path, flow_dirs: Sequence[Path], frames: Sequence[int], shape_hint: tuple[int, int] | None) -> None:
+def _write_meta(
+    out_dir: Path,
+    flow_dirs: Sequence[Path],
+    frames: Sequence[int],
+    shape_hint: tuple[int, int] | None,
+    frame_range: tuple[int, int] | None = None,
+) -> None:
     modules = sorted({
         flow_dir.parent.name if flow_dir.name.lower() == "flows" else flow_dir.name
         for flow_dir in flow_dirs
@@ -178,10 +201,13 @@ def _write_meta(out_dir: Path, flow_dirs: Sequence[Path], frames: Sequence[int],
         "frame_start": frames[0],
         "frame_end": frames[-1],
         "frame_count": len(frames),
+        "tile_size": DEFAULT_TILE,
     }
     if shape_hint is not None:
         height, width = shape_hint
         meta.update({"height": int(height), "width": int(width)})
+    if frame_range is not None:
+        meta["shard"] = {"start": int(frame_range[0]), "end": int(frame_range[1])}
 
     sources: dict[str, object] = {}
     for flow_dir in flow_dirs:
@@ -0,0 +1,231 @@
+"""Decode-once frame store shared by bake stages.
+
+The source (a video, a directory of frames, a glob or a list of images) is
+decoded a single time into raw uint8 RGB arrays on disk, one file per pyramid
+level, described by ``index.json``. Stages open the store and get read-only
+memory-mapped ``(N, H, W, 3)`` arrays, so a frame is a zero-copy slice and
+the OS page cache is shared between every module and flow engine.
+
+Level ``k`` is downsampled by ``2**k`` (``cv2.pyrDown`` when OpenCV is
+available, a 2x2 box filter otherwise). A store may hold only a frame range
+of the source (one shard of a split bake); ``store.start`` is then the clip
+index of ``store[0]``.
+"""
+
+from __future__ import annotations
+
+import glob as globlib
+import itertools
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+
+try:
+    import cv2
+
+    _HAS_CV2 = True
+except Exception:  # pragma: no cover - optional dependency
+    cv2 = None
+    _HAS_CV2 = False
+
+INDEX_NAME = "index.json"
+_VIDEO_SUFFIXES = {".mp4", ".mov", ".mkv", ".avi", ".m4v", ".webm"}
+
+
+def _pyr_down(img: np.ndarray) -> np.ndarray:
+    if _HAS_CV2:
+        return cv2.pyrDown(img)
+    h, w = img.shape[:2]
+    padded = np.pad(img, ((0, h % 2), (0, w % 2), (0, 0)), mode="edge").astype(np.uint16)
+    summed = padded[0::2, 0::2] + padded[1::2, 0::2] + padded[0::2, 1::2] + padded[1::2, 1::2]
+    return ((summed + 2) >> 2).astype(np.uint8)
+
+
+def _image_paths(source: str | os.PathLike | Sequence[str | os.PathLike]) -> list[Path] | None:
+    """Resolve an image source to a sorted path list, or ``None`` for a video file."""
+
+    if isinstance(source, (list, tuple)):
+        return [Path(p) for p in source]
+    path = Path(source)
+    if path.is_dir():
+        from fieldfixer.io.frames import list_frames
+
+        return list_frames(path)
+    if path.suffix.lower() in _VIDEO_SUFFIXES and path.exists():
+        return None
+    matches = sorted(globlib.glob(str(source)))
+    if matches:
+        return [Path(p) for p in matches]
+    if path.exists():
+        return None  # unknown extension: let the video decoder try it
+    raise FileNotFoundError(f"No frames found for {source}")
+
+
+def _fingerprint(source, paths: list[Path] | None, start: int, end: int | None) -> dict:
+    files = [Path(source)] if paths is None else paths
+    stats = [f.stat() for f in files]
+    return {
+        "source": [str(f.resolve()) for f in files] if paths is not None else str(Path(source).resolve()),
+        "bytes": sum(s.st_size for s in stats),
+        "mtime_ns": max((s.st_mtime_ns for s in stats), default=0),
+        "range": [start, end],
+    }
+
+
+def _decode(
+    source, paths: list[Path] | None, start: int, end: int | None
+) -> tuple[Iterator[np.ndarray], float | None, tuple[int, int]]:
+    if paths is None:
+        from fieldfixer.buffers import FramePool
+        from fieldfixer.io.video import VideoReader
+
+        vr = VideoReader(str(source), readahead=4, pool=FramePool())
+        if start:
+            vr.seek(start)
+
+        def frames() -> Iterator[np.ndarray]:
+            try:
+                yield from itertools.islice(vr, None if end is None else end - start)
+            finally:
+                vr.close()
+
+        return frames(), vr.fps, (vr.height, vr.width)
+
+    import imageio.v3 as iio
+
+    from fieldfixer.io.frames import iter_frames
+
+    paths = paths[start:end]
+    if not paths:
+        raise FileNotFoundError(f"No frames found for {source} in range {start}:{'' if end is None else end}")
+    height, width = iio.improps(paths[0]).shape[:2]
+    return iter_frames(paths, (height, width)), None, (height, width)
+
+
+class FrameStore:
+    """Read-only view of a built store; ``store[i]`` is a zero-copy (H, W, 3) slice."""
+
+    def __init__(self, root: str | os.PathLike) -> None:
+        self.root = Path(root)
+        self.index = json.loads((self.root / INDEX_NAME).read_text())
+        self.count = int(self.index["frames"])
+        self.start = int(self.index.get("frame_start", 0))
+        self.fps = self.index.get("fps")
+        self._levels: dict[int, np.ndarray] = {}
+
+    @classmethod
+    def build(
+        cls,
+        source: str | os.PathLike | Sequence[str | os.PathLike],
+        root: str | os.PathLike,
+        levels: int = 1,
+        fps: float | None = None,
+        frame_range: tuple[int, int | None] | None = None,
+    ) -> "FrameStore":
+        """Decode ``source`` once into ``root``, reusing an existing store for the same source.
+
+        ``frame_range`` is ``(start, end)`` in clip frames, end exclusive
+        (``None`` = to the end); only those frames are decoded and stored. A
+        source with no frames gives an empty store of the container's size.
+        """
+
+        if levels < 1:
+            raise ValueError("levels must be >= 1")
+        start, end = frame_range or (0, None)
+        if start < 0 or (end is not None and end <= start):
+            raise ValueError(f"Invalid frame range {start}:{end}")
+        root = Path(root)
+        paths = _image_paths(source)
+        fingerprint = _fingerprint(source, paths, start, end)
+        try:
+            existing = json.loads((root / INDEX_NAME).read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            existing = None
+        if existing and existing.get("fingerprint") == fingerprint and len(existing.get("levels", [])) >= levels:
+            return cls(root)
+
+        root.mkdir(parents=True, exist_ok=True)
+        (root / INDEX_NAME).unlink(missing_ok=True)
+        frames, source_fps, size = _decode(source, paths, start, end)
+        files = [open(root / f"level{k}.u8", "wb") for k in range(levels)]
+        shapes: list[tuple[int, int]] = []
+        count = 0
+        try:
+            for frame in frames:
+                level = np.ascontiguousarray(frame)
+                for k, fh in enumerate(files):
+                    if k:
+                        level = _pyr_down(level)
+                    if count == 0:
+                        shapes.append(level.shape[:2])
+                    elif level.shape[:2] != shapes[k]:
+                        raise ValueError(f"Frame {count} has shape {level.shape[:2]}, expected {shapes[k]}")
+                    fh.write(memoryview(level))
+                count += 1
+        finally:
+            for fh in files:
+                fh.close()
+        if count == 0:
+            # An empty clip (or a range past its end) keeps the container's frame size.
+            level = np.zeros(size + (3,), dtype=np.uint8)
+            for k in range(levels):
+                level = _pyr_down(level) if k else level
+                shapes.append(level.shape[:2])
+
+        index = {
+            "version": 1,
+            "fingerprint": fingerprint,
+            "frames": count,
+            "frame_start": start,
+            "fps": fps or source_fps,
+            "levels": [
+                {"level": k, "file": f"level{k}.u8", "shape": [count, h, w, 3]} for k, (h, w) in enumerate(shapes)
+            ],
+        }
+        tmp = root / (INDEX_NAME + ".tmp")
+        tmp.write_text(json.dumps(index, indent=2))
+        os.replace(tmp, root / INDEX_NAME)  # the index appears only once the data is complete
+        return cls(root)
+
+    @property
+    def levels(self) -> int:
+        return len(self.index["levels"])
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """(height, width) of level 0."""
+
+        _, h, w, _ = self.index["levels"][0]["shape"]
+        return h, w
+
+    def level(self, k: int = 0) -> np.ndarray:
+        """All frames of pyramid level ``k`` as a read-only ``(N, H, W, 3)`` memmap."""
+
+        arr = self._levels.get(k)
+        if arr is None:
+            entry = self.index["levels"][k]
+            if entry["shape"][0]:
+                arr = np.memmap(self.root / entry["file"], dtype=np.uint8, mode="r", shape=tuple(entry["shape"]))
+            else:
+                arr = np.zeros(entry["shape"], dtype=np.uint8)  # empty files cannot be mapped
+                arr.flags.writeable = False
+            self._levels[k] = arr
+        return arr
+
+    def frame(self, idx: int, level: int = 0) -> np.ndarray:
+        return self.level(level)[idx]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, idx):
+        return self.level(0)[idx]
+
+    def __iter__(self) -> Iterable[np.ndarray]:
+        return iter(self.level(0))
+
+    def close(self) -> None:
+        self._levels.clear()
@@ -5,7 +5,7 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any
 
-# TODO(codex): Launch RS-NeRF/URS-NeRF to estimate rolling-shutter poses.
+# TODO(codex): Launch RS-NeRF/URS-NeRF on FrameStore(config["frame_store"]) to estimate rolling-shutter poses.
 # TODO(codex): Produce GS-corrected target renders per frame.
 # TODO(codex): Compute orig->target flow; write flows + conf.
 
@@ -1,64 +1,258 @@
 from __future__ import annotations
 
 import json
+import shutil
 from pathlib import Path
+from typing import Any, Callable
 
 import numpy as np
 
-from fieldfixer.io.video import VideoReader
+from fieldfixer.bake.framestore import FrameStore
+from fieldfixer.bake.scheduler import NodeContext, NodeResult, Scheduler, file_fingerprint
+from fieldfixer.io.sidecar import SidecarWriter
+from fieldfixer.ops.tiles import DEFAULT_TILE, grid_shape
 
+# Rough per-module resource estimates (cpus, MB) used by the scheduler budget.
+_MODULE_COST = {
+    "rsnerf": (4, 8000),
+    "deblurnerf": (4, 8000),
+    "rawnerf": (4, 12000),
+    "nerfw": (4, 12000),
+}
 
-def run_bake(inp: Path, out: Path, profile: str, modules: list[str]) -> None:
-    """Stub bake pipeline that emits identity sidecars for quick testing."""
 
+def _module_runner(name: str) -> Callable[[dict[str, Any], Path], Any]:
+    if name == "rsnerf":
+        from fieldfixer.bake.modules.rsnerf import run_rsnerf as fn
+    elif name == "deblurnerf":
+        from fieldfixer.bake.modules.deblurnerf import run_deblurnerf as fn
+    elif name == "rawnerf":
+        from fieldfixer.bake.modules.rawnerf import run_rawnerf as fn
+    elif name == "nerfw":
+        from fieldfixer.bake.modules.nerfw import run_nerfw as fn
+    else:
+        raise ValueError(f"Unknown bake module {name!r}; expected one of {', '.join(_MODULE_COST)}")
+    return fn
+
+
+def default_work_dir(out: Path) -> Path:
     out = Path(out)
-    (out / "W").mkdir(parents=True, exist_ok=True)
-    (out / "M").mkdir(parents=True, exist_ok=True)
-    (out / "LUT").mkdir(parents=True, exist_ok=True)
+    return out.with_name(out.name + ".work")
 
-    from imageio.v3 import imwrite
 
-    vr = VideoReader(str(inp))
-    frames_written = 0
-    width = vr.width
-    height = vr.height
+def run_bake(
+    inp: Path,
+    out: Path,
+    profile: str,
+    modules: list[str],
+    work_dir: Path | None = None,
+    cpus: int | None = None,
+    mem_mb: int | None = None,
+    frame_range: tuple[int, int | None] | None = None,
+) -> dict[str, NodeResult]:
+    """Bake sidecars for ``inp`` into ``out`` by running the bake graph.
 
-    for idx, frame in enumerate(vr):
-        h, w = frame.shape[:2]
-        np.savez_compressed(
-            out / "W" / f"{idx:06d}.npz",
-            du=np.zeros((h, w), np.float16),
-            dv=np.zeros((h, w), np.float16),
-        )
-        imwrite(out / "M" / f"{idx:06d}.png", np.full((h, w), 255, dtype=np.uint8))
-        frames_written = idx + 1
-        width, height = w, h
-
-    if frames_written == 0:
-        np.savez_compressed(
-            out / "W" / "000000.npz",
-            du=np.zeros((height, width), np.float16),
-            dv=np.zeros((height, width), np.float16),
+    Module wrappers that are not implemented yet are skipped, so the bake falls
+    back to identity sidecars. Node outputs are cached under ``work_dir``
+    (default ``<out>.work``); a re-bake reruns only nodes whose input, config or
+    upstream results changed. Raises ``RuntimeError`` if any node fails.
+
+    With ``frame_range`` (``(start, end)``, end exclusive or ``None``) only
+    those frames are baked and ``out`` becomes one shard of the clip; see
+    :func:`fieldfixer.io.shards.merge_shards`.
+    """
+
+    scheduler = build_bake_graph(
+        inp, out, profile, modules, work_dir=work_dir, cpus=cpus, mem_mb=mem_mb, frame_range=frame_range
+    )
+    results = scheduler.run()
+    failed = [r for r in results.values() if r.status == "failed"]
+    if failed:
+        raise RuntimeError("Bake failed: " + "; ".join(f"{r.name}: {r.error}" for r in failed))
+    return results
+
+
+def build_bake_graph(
+    inp: Path,
+    out: Path,
+    profile: str,
+    modules: list[str],
+    work_dir: Path | None = None,
+    cpus: int | None = None,
+    mem_mb: int | None = None,
+    frame_range: tuple[int, int | None] | None = None,
+) -> Scheduler:
+    """Describe a bake as frames -> modules -> flow -> curves/LUT -> pack."""
+
+    inp, out = Path(inp), Path(out)
+    modules = list(dict.fromkeys(modules))
+    runners = {name: _module_runner(name) for name in modules}
+    scheduler = Scheduler(work_dir or default_work_dir(out), input_key=file_fingerprint(inp), cpus=cpus, mem_mb=mem_mb)
+
+    frames_config: dict[str, Any] = {"version": 1, "levels": 1}
+    if frame_range is not None:
+        frames_config["range"] = list(frame_range)
+    scheduler.add("frames", lambda ctx: _frames(ctx, inp), config=frames_config)
+    for name in modules:
+        cpus_needed, mem_needed = _MODULE_COST[name]
+        scheduler.add(
+            name,
+            _run_module(runners[name], inp),
+            deps=("frames",),
+            config={"profile": profile},
+            cpus=cpus_needed,
+            mem_mb=mem_needed,
         )
-        imwrite(out / "M" / "000000.png", np.full((height, width), 255, dtype=np.uint8))
-        frames_written = 1
+        scheduler.add(f"flow-{name}", lambda ctx, name=name: _flow(ctx, name), deps=("frames", name), config={"method": "dis"})
+    scheduler.add("curves", _curves, deps=tuple(modules), config={"lut_size": 33})
+    scheduler.add(
+        "pack",
+        lambda ctx: _pack(ctx, inp, profile, modules),
+        deps=("frames", *modules, *(f"flow-{name}" for name in modules), "curves"),
+        config={"version": 1, "profile": profile, "modules": modules},
+        output=out,
+    )
+    return scheduler
 
-    vr.close()
 
-    (out / "LUT" / "scene.cube").write_text(_identity_cube_lut())
-    (out / "curves.json").write_text(json.dumps({"global": {"exposure": 1.0, "gamma": 1.0}}, indent=2))
+def _frames(ctx: NodeContext, inp: Path) -> dict[str, Any]:
+    """Decode the input (or its frame range) once into a frame store that later nodes slice from."""
 
-    meta = {
-        "version": 1,
-        "mapping": "displacement",
-        "modules": modules,
-        "profile": profile,
-        "input": str(inp),
+    frame_range = ctx.config.get("range")
+    store = FrameStore.build(
+        inp, ctx.dir / "store", levels=ctx.config["levels"], frame_range=tuple(frame_range) if frame_range else None
+    )
+    if frame_range and not len(store):
+        raise ValueError(f"Frame range {frame_range[0]}:{frame_range[1] or ''} is past the end of {inp}")
+    height, width = store.shape
+    return {
         "width": width,
         "height": height,
-        "frames": frames_written,
+        "fps": store.fps,
+        "frames": len(store),
+        "frame_start": store.start,
+        "sharded": frame_range is not None,
+        "store": str(store.root),
     }
+
+
+def _run_module(fn: Callable[[dict[str, Any], Path], Any], inp: Path) -> Callable[[NodeContext], dict[str, Any]]:
+    def run(ctx: NodeContext) -> dict[str, Any]:
+        frames = ctx.deps["frames"].data
+        fn({**ctx.config, **frames, "input": str(inp), "frame_store": frames["store"]}, ctx.dir)
+        found = {sub: (ctx.dir / sub).is_dir() for sub in ("targets", "flows", "conf")}
+        return {"outputs": sorted(k for k, v in found.items() if v)}
+
+    return run
+
+
+def _flow(ctx: NodeContext, module: str) -> dict[str, Any]:
+    """Locate the module's flows, computing orig -> target flow when it only rendered targets."""
+
+    upstream = ctx.deps[module]
+    if not upstream.produced:
+        return {"flows": None}
+    if (upstream.dir / "flows").is_dir():
+        return {"flows": str(upstream.dir / "flows")}
+    targets = upstream.dir / "targets"
+    if not targets.is_dir():
+        return {"flows": None}
+
+    try:
+        import cv2
+    except Exception as exc:  # pragma: no cover - cv2 is a soft dependency
+        raise RuntimeError("OpenCV is required to compute flow from rendered targets") from exc
+    import imageio.v3 as iio
+
+    flows = ctx.dir / module / "flows"
+    flows.mkdir(parents=True)
+    dis = cv2.DISOpticalFlow_create(cv2.DISOPTICAL_FLOW_PRESET_MEDIUM)
+    store = FrameStore(ctx.deps["frames"].data["store"])
+    # Module outputs and flows are named by clip frame, also in a shard.
+    for idx, frame in enumerate(store, start=store.start):
+        target_path = targets / f"{idx:06d}.png"
+        if not target_path.exists():
+            continue
+        target = cv2.cvtColor(np.asarray(iio.imread(target_path))[..., :3], cv2.COLOR_RGB2GRAY)
+        # Flow from target to original: sampling the original at x + flow reproduces the target.
+        flow = dis.calc(target, cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), None)
+        np.save(flows / f"{idx:06d}.npy", flow.astype(np.float32))
+    store.close()
+    return {"flows": str(flows)}
+
+
+def _curves(ctx: NodeContext) -> dict[str, Any]:
+    """Collect fitted curves/LUT from module outputs, falling back to identity."""
+
+    sources: dict[str, str] = {}
+    for name, result in ctx.deps.items():
+        if not result.produced:
+            continue
+        if "curves" not in sources and (result.dir / "curves.json").exists():
+            shutil.copyfile(result.dir / "curves.json", ctx.dir / "curves.json")
+            sources["curves"] = name
+        for lut_name in ("scene.cube", "lut.cube"):
+            if "lut" not in sources and (result.dir / lut_name).exists():
+                shutil.copyfile(result.dir / lut_name, ctx.dir / "scene.cube")
+                sources["lut"] = name
+    if "curves" not in sources:
+        (ctx.dir / "curves.json").write_text(json.dumps({"global": {"exposure": 1.0, "gamma": 1.0}}, indent=2))
+    if "lut" not in sources:
+        (ctx.dir / "scene.cube").write_text(_identity_cube_lut(ctx.config["lut_size"]))
+    return {"sources": sources}
+
+
+def _pack(ctx: NodeContext, inp: Path, profile: str, modules: list[str]) -> dict[str, Any]:
+    from fieldfixer.bake.exporters.pack import pack_sidecars
+
+    out = ctx.dir
+    frames = ctx.deps["frames"].data
+    curves_dir = ctx.deps["curves"].dir
+    flow_dirs = [Path(r.data["flows"]) for name, r in ctx.deps.items() if name.startswith("flow-") and r.data.get("flows")]
+
+    start = frames.get("frame_start", 0)
+    frame_range = (start, start + frames["frames"]) if frames.get("sharded") else None
+    if not frames["frames"]:
+        # An empty clip still bakes to a single identity frame at the container's size.
+        frames, flow_dirs = {**frames, "frames": 1}, []
+    if flow_dirs:
+        pack_sidecars([curves_dir], flow_dirs, out, frame_range=frame_range)
+        meta = json.loads((out / "meta.json").read_text())
+    else:
+        _write_identity_sidecars(out, frames)
+        meta = {
+            "version": 1,
+            "mapping": "displacement",
+            "width": frames["width"],
+            "height": frames["height"],
+            "frames": frames["frames"],
+            "tile_size": DEFAULT_TILE,
+        }
+        if frame_range is not None:
+            meta["shard"] = {"start": frame_range[0], "end": frame_range[1]}
+    (out / "LUT").mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(curves_dir / "curves.json", out / "curves.json")
+    shutil.copyfile(curves_dir / "scene.cube", out / "LUT" / "scene.cube")
+
+    meta.update(modules=modules, profile=profile, input=str(inp))
+    meta["nodes"] = {name: r.status for name, r in ctx.deps.items()}
     (out / "meta.json").write_text(json.dumps(meta, indent=2))
+    return {"frames": meta.get("frames", meta.get("frame_count", 0))}
+
+
+def _write_identity_sidecars(out: Path, frames: dict[str, Any]) -> None:
+    width, height = frames["width"], frames["height"]
+    zeros = np.zeros((height, width), np.float16)
+    full = np.full((height, width), 255, dtype=np.uint8)
+    idle = np.zeros(grid_shape((height, width), DEFAULT_TILE), dtype=bool)
+    writer = SidecarWriter(out)
+    # Identity payloads dedupe to a single W, M and T file however long the clip is.
+    start = frames.get("frame_start", 0)
+    for idx in range(start, start + frames["frames"]):
+        writer.write_warp(idx, zeros, zeros)
+        writer.write_mask(idx, full)
+        writer.write_tiles(idx, idle)
+    writer.close()
 
 
 def _identity_cube_lut(size: int = 33) -> str:
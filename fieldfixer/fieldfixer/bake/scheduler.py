@@ -0,0 +1,248 @@
+"""Dependency-graph scheduler for bake steps.
+
+A bake is a set of named nodes (frame store, NeRF modules, flow, curves/LUT
+fitting, packing). Each node declares its dependencies, a JSON-able config
+and a CPU/memory estimate. Independent nodes run concurrently as long as the
+sum of their estimates fits the budget; a node larger than the whole budget
+runs alone.
+
+Every node writes into its own directory and records a ``.node.json`` marker
+with a cache key derived from the input fingerprint, the node's config and the
+results of its dependencies. A re-bake whose key matches reuses the directory
+instead of running the node again, so only steps downstream of a change rerun.
+Nodes with an ``output`` outside the work dir (the published bake) keep their
+marker in the work dir, so it never ships with the bake.
+
+A node that raises :class:`NotImplementedError` (the module stubs) is marked
+``skipped``; its dependents still run and fall back to identity output.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+MARKER_NAME = ".node.json"
+
+
+def file_fingerprint(path: str | os.PathLike) -> str:
+    """Cheap identity of a file from its resolved path, size, mtime and inode (blake2b, hex).
+
+    The file is never read, so long clips and every shard of a ``--frames``
+    bake get their cache key without a full pass over the video.
+    """
+
+    path = Path(path).resolve()
+    st = path.stat()
+    blob = json.dumps([str(path), st.st_size, st.st_mtime_ns, st.st_ino]).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def total_memory_mb() -> int | None:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1 << 20)
+    except (AttributeError, ValueError, OSError):  # pragma: no cover - non-POSIX
+        return None
+
+
+@dataclass
+class NodeResult:
+    name: str
+    status: str  # ok | cached | skipped | failed | blocked
+    key: str = ""
+    dir: Path | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    seconds: float = 0.0
+    error: str | None = None
+
+    @property
+    def produced(self) -> bool:
+        return self.status in ("ok", "cached")
+
+
+@dataclass
+class NodeContext:
+    """What a node function sees: its config, output directory and dependency results."""
+
+    node: "Node"
+    dir: Path
+    deps: dict[str, NodeResult]
+
+    @property
+    def config(self) -> dict[str, Any]:
+        return self.node.config
+
+
+@dataclass
+class Node:
+    name: str
+    fn: Callable[[NodeContext], dict[str, Any] | None]
+    deps: tuple[str, ...] = ()
+    config: dict[str, Any] = field(default_factory=dict)
+    cpus: int = 1
+    mem_mb: int = 0
+    output: Path | None = None  # write here instead of the work dir (e.g. the final bake)
+
+
+class Scheduler:
+    """Run a graph of :class:`Node` objects under CPU and memory budgets."""
+
+    def __init__(
+        self,
+        work_dir: str | os.PathLike,
+        input_key: str = "",
+        cpus: int | None = None,
+        mem_mb: int | None = None,
+    ) -> None:
+        self.work_dir = Path(work_dir)
+        self.input_key = input_key
+        self.cpus = max(1, cpus or os.cpu_count() or 1)
+        self.mem_mb = mem_mb if mem_mb is not None else total_memory_mb()
+        self.nodes: dict[str, Node] = {}
+
+    def add(self, name: str, fn: Callable[[NodeContext], dict[str, Any] | None], **kwargs: Any) -> Node:
+        if name in self.nodes:
+            raise ValueError(f"Duplicate bake node {name!r}")
+        node = Node(name=name, fn=fn, **kwargs)
+        node.deps = tuple(node.deps)
+        self.nodes[name] = node
+        return node
+
+    def order(self) -> list[Node]:
+        """Nodes in a dependency-respecting order (declaration order among peers)."""
+
+        ordered: list[Node] = []
+        state: dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(name: str, path: tuple[str, ...]) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Bake graph has a cycle: {' -> '.join(path + (name,))}")
+            node = self.nodes.get(name)
+            if node is None:
+                raise ValueError(f"Bake node {path[-1]!r} depends on unknown node {name!r}")
+            state[name] = 1
+            for dep in node.deps:
+                visit(dep, path + (name,))
+            state[name] = 2
+            ordered.append(node)
+
+        for name in self.nodes:
+            visit(name, ())
+        return ordered
+
+    def cache_key(self, node: Node, deps: dict[str, NodeResult]) -> str:
+        payload = {
+            "name": node.name,
+            "config": node.config,
+            "input": self.input_key,
+            # "ok" and "cached" are the same output, so they hash alike.
+            "deps": {name: [r.key, "ok" if r.produced else r.status, r.data] for name, r in sorted(deps.items())},
+        }
+        blob = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+    def node_dir(self, node: Node, key: str) -> Path:
+        if node.output is not None:
+            return Path(node.output)
+        return self.work_dir / "nodes" / f"{node.name}-{key[:16]}"
+
+    def marker_path(self, node: Node, out: Path) -> Path:
+        if node.output is not None:
+            return self.work_dir / "nodes" / f"{node.name}{MARKER_NAME}"
+        return out / MARKER_NAME
+
+    def _execute(self, node: Node, deps: dict[str, NodeResult]) -> NodeResult:
+        key = self.cache_key(node, deps)
+        out = self.node_dir(node, key)
+        marker = self.marker_path(node, out)
+        try:
+            cached = json.loads(marker.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            cached = None
+        if cached is not None and cached.get("key") == key and cached.get("output") == str(out) and out.is_dir():
+            return NodeResult(node.name, "cached", key, out, cached.get("data", {}))
+
+        if node.output is None:
+            shutil.rmtree(out, ignore_errors=True)
+        else:
+            marker.unlink(missing_ok=True)
+        out.mkdir(parents=True, exist_ok=True)
+        marker.parent.mkdir(parents=True, exist_ok=True)
+
+        start = time.perf_counter()
+        try:
+            data = node.fn(NodeContext(node, out, deps)) or {}
+        except NotImplementedError as exc:
+            if node.output is None:
+                shutil.rmtree(out, ignore_errors=True)
+            return NodeResult(node.name, "skipped", key, None, {}, time.perf_counter() - start, str(exc))
+        except Exception as exc:  # noqa: BLE001 - reported in the node result
+            return NodeResult(node.name, "failed", key, out, {}, time.perf_counter() - start, f"{type(exc).__name__}: {exc}")
+
+        record = {"key": key, "name": node.name, "config": node.config, "output": str(out), "data": data}
+        marker.write_text(json.dumps(record, indent=2, default=str))
+        if node.output is None:
+            self._prune(node, keep=out)
+        return NodeResult(node.name, "ok", key, out, data, time.perf_counter() - start)
+
+    def _prune(self, node: Node, keep: Path) -> None:
+        """Drop this node's outputs for older keys so the work dir does not grow without bound."""
+
+        for stale in (self.work_dir / "nodes").glob(f"{node.name}-*"):
+            if stale != keep and stale.name[len(node.name) + 1 :].isalnum():
+                shutil.rmtree(stale, ignore_errors=True)
+
+    def _cost(self, node: Node) -> tuple[int, int]:
+        cpus = min(max(node.cpus, 1), self.cpus)
+        mem = min(node.mem_mb, self.mem_mb) if self.mem_mb else 0
+        return cpus, mem
+
+    def run(self) -> dict[str, NodeResult]:
+        """Run every node once its dependencies finish; returns results by node name."""
+
+        pending = self.order()
+        results: dict[str, NodeResult] = {}
+        running: dict[Future, Node] = {}
+        used_cpus = used_mem = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, len(pending)), thread_name_prefix="ffx-bake") as pool:
+            while pending or running:
+                for node in list(pending):
+                    if any(dep not in results for dep in node.deps):
+                        continue
+                    broken = [d for d in node.deps if results[d].status in ("failed", "blocked")]
+                    if broken:
+                        results[node.name] = NodeResult(node.name, "blocked", error=f"needs {', '.join(broken)}")
+                        pending.remove(node)
+                        continue
+                    cpus, mem = self._cost(node)
+                    fits = used_cpus + cpus <= self.cpus and (not self.mem_mb or used_mem + mem <= self.mem_mb)
+                    if running and not fits:
+                        continue
+                    deps = {d: results[d] for d in node.deps}
+                    running[pool.submit(self._execute, node, deps)] = node
+                    used_cpus += cpus
+                    used_mem += mem
+                    pending.remove(node)
+
+                if not running:
+                    if pending:
+                        raise RuntimeError("Bake scheduler stalled with pending nodes")  # pragma: no cover
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    node = running.pop(fut)
+                    cpus, mem = self._cost(node)
+                    used_cpus -= cpus
+                    used_mem -= mem
+                    results[node.name] = fut.result()
+        return results
@@ -0,0 +1,212 @@
+"""Batch apply: run many (input, bake, output) jobs on one worker pool."""
+
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+
+from fieldfixer.io.storage import is_remote
+
+
+@dataclass
+class BatchJob:
+    inp: Path
+    bake: Path | str
+    out: Path
+    crf: int = 18
+
+
+@dataclass
+class JobResult:
+    job: BatchJob
+    status: str = "pending"
+    attempts: int = 0
+    frames: int = 0
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return dict(
+            {"in": str(self.job.inp), "bake": str(self.job.bake), "out": str(self.job.out)},
+            crf=self.job.crf,
+            status=self.status,
+            attempts=self.attempts,
+            frames=self.frames,
+            seconds=round(self.seconds, 3),
+            fps=round(self.fps, 2),
+            errors=self.errors,
+        )
+
+
+def load_manifest(path: Path) -> list[BatchJob]:
+    """Read jobs from a JSON list (or ``{"jobs": [...]}``) or a JSONL file.
+
+    Each entry needs ``in``, ``bake`` and ``out``; ``crf`` is optional. Relative
+    paths resolve against the manifest's directory; ``bake`` may be a URL.
+    """
+
+    path = Path(path)
+    text = path.read_text()
+    if path.suffix.lower() == ".jsonl":
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        data = json.loads(text)
+        entries = data["jobs"] if isinstance(data, dict) else data
+
+    base = path.parent
+    jobs: list[BatchJob] = []
+    for n, entry in enumerate(entries):
+        missing = [k for k in ("in", "bake", "out") if k not in entry]
+        if missing:
+            raise ValueError(f"Manifest entry {n} is missing {', '.join(missing)}")
+        jobs.append(
+            BatchJob(
+                inp=base / entry["in"],
+                bake=entry["bake"] if is_remote(entry["bake"]) else base / entry["bake"],
+                out=base / entry["out"],
+                crf=int(entry.get("crf", 18)),
+            )
+        )
+    return jobs
+
+
+def _init_worker() -> None:
+    # Import the runtime once per worker so every job after the first reuses
+    # loaded modules, compiled kernels and the per-process LUT cache.
+    import fieldfixer.runtime  # noqa: F401
+    from fieldfixer.ops import warp
+
+    if not warp._HAS_CV2:
+        from fieldfixer.ops.kernels import warmup
+
+        warmup()
+
+
+def _run_job(job: BatchJob) -> tuple[int, float]:
+    from fieldfixer.runtime import apply_video
+
+    start = time.perf_counter()
+    job.out.parent.mkdir(parents=True, exist_ok=True)
+    frames = apply_video(job.inp, job.bake, job.out, crf=job.crf, progress=False)
+    return frames, time.perf_counter() - start
+
+
+def _job_weight(job: BatchJob) -> int:
+    try:
+        return job.inp.stat().st_size
+    except OSError:
+        return 0
+
+
+def run_batch(
+    jobs: Iterable[BatchJob],
+    workers: int = 2,
+    retries: int = 1,
+    report: Path | None = None,
+) -> dict[str, Any]:
+    """Run ``jobs`` on a pool of ``workers`` processes and return a summary.
+
+    Largest inputs are scheduled first so long clips do not end up trailing
+    the batch. A failing job is resubmitted up to ``retries`` more times;
+    at most ``workers`` jobs are in flight, so when a worker process dies only
+    the jobs running at the time count an attempt and the rest continue on a
+    new pool. ``workers=0`` runs every job in the
+    calling process. The ``report`` is written even if the batch aborts.
+    """
+
+    results = [JobResult(job) for job in jobs]
+    order = sorted(results, key=lambda r: _job_weight(r.job), reverse=True)
+    start = time.perf_counter()
+
+    def record(result: JobResult, outcome: tuple[int, float] | None, exc: BaseException | None) -> bool:
+        result.attempts += 1
+        if exc is None and outcome is not None:
+            result.frames, result.seconds = outcome
+            result.status = "ok"
+            return True
+        result.errors.append(f"{type(exc).__name__}: {exc}")
+        if result.attempts > retries:
+            result.status = "failed"
+            return True
+        return False
+
+    try:
+        if workers <= 0:
+            _init_worker()
+            for result in order:
+                done = False
+                while not done:
+                    try:
+                        done = record(result, _run_job(result.job), None)
+                    except Exception as exc:  # noqa: BLE001 - reported per job
+                        done = record(result, None, exc)
+        else:
+            _run_pool(order, workers, record)
+    finally:
+        # Also on an unexpected error, so a partial summary still lands in the report.
+        elapsed = time.perf_counter() - start
+        frames = sum(r.frames for r in results)
+        summary: dict[str, Any] = {
+            "workers": workers,
+            "seconds": round(elapsed, 3),
+            "frames": frames,
+            "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+            "succeeded": sum(r.status == "ok" for r in results),
+            "failed": sum(r.status == "failed" for r in results),
+            "jobs": [r.to_dict() for r in results],
+        }
+        if report is not None:
+            Path(report).parent.mkdir(parents=True, exist_ok=True)
+            Path(report).write_text(json.dumps(summary, indent=2))
+    return summary
+
+
+def _run_pool(order: list[JobResult], workers: int, record) -> None:
+    """Run jobs on a process pool, replacing the pool whenever a worker process dies."""
+
+    queue = list(order)
+    while queue:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        pending: dict[Future, JobResult] = {}
+
+        def submit() -> bool:
+            # Tops the pool up to ``workers`` jobs in flight, so a worker death only
+            # fails jobs that were handed to a process; False once the pool is broken.
+            try:
+                while queue and len(pending) < workers:
+                    pending[pool.submit(_run_job, queue[0].job)] = queue[0]
+                    queue.pop(0)
+            except BrokenProcessPool:
+                return False
+            return True
+
+        try:
+            broken = not submit()
+            while pending and not broken:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    result = pending.pop(fut)
+                    exc = fut.exception()
+                    broken = broken or isinstance(exc, BrokenProcessPool)
+                    if not record(result, None if exc else fut.result(), exc):
+                        queue.append(result)
+                broken = broken or not submit()
+            if broken:
+                # A worker was killed (OOM, segfault); the pool fails every job in flight,
+                # and each counts as an attempt. Jobs still queued move to a fresh pool as-is.
+                for fut in wait(pending).done:
+                    result = pending[fut]
+                    exc = fut.exception()
+                    if not record(result, None if exc else fut.result(), exc):
+                        queue.append(result)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,59 @@
+"""Reusable frame-sized scratch buffers."""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+class FramePool:
+    """Hand out named arrays that are reused whenever shape and dtype repeat.
+
+    Ops take an optional pool for their scratch space; the apply loop keeps one
+    pool for the whole clip so steady-state frames allocate nothing large.
+    Buffers are keyed by ``(name, shape, dtype)``, so clips of different
+    resolutions can share a pool without thrashing each other.
+    """
+
+    def __init__(self) -> None:
+        self._arrays: dict[tuple[str, tuple[int, ...], np.dtype], np.ndarray] = {}
+        self._children: dict[object, FramePool] = {}
+        self._allocations = 0
+
+    def get(self, name: str, shape: tuple[int, ...], dtype=np.float32) -> np.ndarray:
+        """Return the buffer registered as ``name`` for this shape/dtype (uninitialised)."""
+
+        key = (name, tuple(shape), np.dtype(dtype))
+        arr = self._arrays.get(key)
+        if arr is None:
+            arr = np.empty(key[1], dtype=key[2])
+            self._arrays[key] = arr
+            self._allocations += 1
+        return arr
+
+    def child(self, key: object) -> "FramePool":
+        """A sub-pool for one concurrent worker (e.g. a row band), so threads never share scratch."""
+
+        pool = self._children.get(key)
+        if pool is None:
+            pool = self._children.setdefault(key, FramePool())
+        return pool
+
+    @property
+    def allocations(self) -> int:
+        return self._allocations + sum(c.allocations for c in self._children.values())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in self._arrays.values()) + sum(c.nbytes for c in self._children.values())
+
+    def clear(self) -> None:
+        self._arrays.clear()
+        self._children.clear()
+
+
+def scratch(pool: FramePool | None, name: str, shape: tuple[int, ...], dtype=np.float32) -> np.ndarray:
+    """Take ``name`` from ``pool`` or allocate a throwaway buffer when no pool is given."""
+
+    if pool is None:
+        return np.empty(shape, dtype=dtype)
+    return pool.get(name, shape, dtype)
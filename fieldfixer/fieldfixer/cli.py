@@ -2,50 +2,109 @@ from __future__ import annotations
 
 from pathlib import Path
 
-import numpy as np
 import typer
-from tqdm import tqdm
 
-from fieldfixer.io.sidecar import SidecarBundle
-from fieldfixer.io.video import VideoReader, VideoWriter
-from fieldfixer.ops.exposure import apply_curves
-from fieldfixer.ops.lut3d import apply_lut, load_cube_lut
-from fieldfixer.ops.mask import composite_with_mask
-from fieldfixer.ops.warp import apply_displacement
+# Heavy dependencies (numpy, av, cv2, numba, tqdm) are imported inside the
+# commands that use them so `fieldfixer --help` and light commands start fast.
 
 app = typer.Typer(help="FieldFixer CLI")
 
 
 @app.command("apply")
 def apply_cli(
-    inp: Path = typer.Option(..., "--in", help="Input video"),
-    bake: Path = typer.Option(..., "--bake", help="Bake directory with sidecars"),
-    out: Path = typer.Option(..., "--out", help="Output video path"),
+    inp: Path = typer.Option(..., "--in", help="Input video (raw mode: file, FIFO or '-' for stdin)"),
+    bake: str = typer.Option(..., "--bake", help="Bake directory or http(s):// URL with sidecars"),
+    out: Path = typer.Option(..., "--out", help="Output video path (raw mode: file, FIFO or '-' for stdout)"),
     crf: int = typer.Option(18, help="H264 CRF"),
+    size: str | None = typer.Option(None, "--size", help="Raw frame size WIDTHxHEIGHT; enables raw pipe mode"),
+    pix_fmt: str = typer.Option("rgb24", "--pix-fmt", help="Raw pipe pixel format (rgb24 or yuv420p)"),
+    resume: bool = typer.Option(False, "--resume", help="Encode in checkpointed chunks and continue an interrupted run"),
+    chunk_frames: int = typer.Option(600, "--chunk-frames", help="Frames per chunk in --resume mode"),
+    readahead: int | None = typer.Option(None, "--readahead", help="Frames decoded ahead of rendering (0 = inline; default: tuned or 4)"),
+    decode_threads: int | None = typer.Option(None, "--decode-threads", help="Decoder threads (0 = auto; default: tuned or 0)"),
+    workers: int | None = typer.Option(None, "--workers", help="Threads rendering each frame (default: tuned or 1)"),
+    band_rows: int | None = typer.Option(None, "--band-rows", help="Rows per render band with --workers > 1 (default: tuned)"),
+    passthrough: bool = typer.Option(True, "--passthrough/--no-passthrough", help="Copy audio, subtitle and data streams unchanged"),
+    batch_frames: int | None = typer.Option(None, "--batch-frames", help="Frames rendered together as one stack (0 = by resolution, 1 = off; default: tuned or 0)"),
 ):
+    from fieldfixer.runtime import apply_video, load_bake_lut, run_apply
+
+    if size is None:
+        apply_video(
+            inp,
+            bake,
+            out,
+            crf=crf,
+            resume=resume,
+            chunk_frames=chunk_frames,
+            readahead=readahead,
+            decode_threads=decode_threads,
+            workers=workers,
+            band_rows=band_rows,
+            passthrough=passthrough,
+            batch_frames=batch_frames,
+        )
+        return
+    if resume:
+        raise typer.BadParameter("--resume needs a seekable video input, not raw pipe mode")
+
+    from fieldfixer.io.rawpipe import PIX_FMTS, RawFrameReader, RawFrameWriter, parse_size
+    from fieldfixer.io.sidecar import SidecarBundle
+    from fieldfixer.tuning import resolve_settings
+
+    try:
+        width, height = parse_size(size)
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc), param_hint="--size") from exc
+    if pix_fmt not in PIX_FMTS:
+        raise typer.BadParameter(f"{pix_fmt!r} is not one of {', '.join(PIX_FMTS)}", param_hint="--pix-fmt")
+    if pix_fmt == "yuv420p" and (width % 2 or height % 2):
+        raise typer.BadParameter("yuv420p frames need even width and height", param_hint="--size")
+    settings = resolve_settings(width, height, workers=workers, band_rows=band_rows, batch_frames=batch_frames)
     bundle = SidecarBundle.load(bake)
-    lut_path = bake / "LUT" / "scene.cube"
-    lut = load_cube_lut(lut_path) if lut_path.exists() else None
-
-    vr = VideoReader(inp)
-    vw = VideoWriter(out, width=vr.width, height=vr.height, fps=vr.fps, crf=crf)
-
-    for i, frame in enumerate(tqdm(vr, total=vr.nframes or None)):
-        du, dv = bundle.load_warp(i, shape=frame.shape[:2])
-        mask = bundle.load_mask(i, shape=frame.shape[:2])
-        curves = bundle.load_curves(i)
-
-        warped = apply_displacement(frame, du, dv)
-        composited = composite_with_mask(warped, frame, mask)
-        tonemapped = apply_curves(composited, curves)
+    try:
+        vr = RawFrameReader(str(inp), width=width, height=height, pix_fmt=pix_fmt)
+        try:
+            vw = RawFrameWriter(str(out), width=width, height=height, pix_fmt=pix_fmt)
+            try:
+                run_apply(
+                    vr,
+                    vw,
+                    bundle,
+                    load_bake_lut(bundle),
+                    workers=settings.workers,
+                    band_rows=settings.band_rows,
+                    batch_frames=settings.batch_frames,
+                )
+            finally:
+                vw.close()
+        finally:
+            vr.close()
+    finally:
+        bundle.close()
+
+
+@app.command("apply-batch")
+def apply_batch_cli(
+    manifest: Path = typer.Option(..., "--manifest", help="JSON/JSONL list of {in, bake, out} jobs"),
+    workers: int | None = typer.Option(None, "--workers", help="Worker processes (0 runs jobs in-process; default: tuned or 2)"),
+    retries: int = typer.Option(1, "--retries", help="Extra attempts for a failed job"),
+    report: Path | None = typer.Option(None, "--report", help="Summary report path (JSON)"),
+):
+    """Apply many bakes with one shared worker pool."""
 
-        if lut is not None:
-            tonemapped = apply_lut(tonemapped, lut)
+    from fieldfixer.batch import load_manifest, run_batch
 
-        vw.write(tonemapped)
+    if workers is None:
+        from fieldfixer.tuning import resolve_settings
 
-    vw.close()
-    vr.close()
+        workers = resolve_settings().batch_workers
+    jobs = load_manifest(manifest)
+    summary = run_batch(jobs, workers=workers, retries=retries, report=report)
+    failed = summary["failed"]
+    typer.echo(f"{summary['succeeded']}/{len(jobs)} jobs ok, {summary['frames']} frames in {summary['seconds']:.1f}s")
+    if failed:
+        raise typer.Exit(code=1)
 
 
 @app.command("bake")
@@ -54,12 +113,128 @@ def bake_cli(
     out: Path = typer.Option(..., "--out"),
     profile: str = typer.Option("quality", "--profile"),
     modules: list[str] = typer.Option(["rsnerf", "deblurnerf"], "--modules"),
+    work: Path | None = typer.Option(None, "--work", help="Node cache directory (default: <out>.work)"),
+    cpus: int | None = typer.Option(None, "--cpus", help="CPU budget for concurrent bake steps (default: all cores)"),
+    mem_gb: float | None = typer.Option(None, "--mem-gb", help="Memory budget for concurrent bake steps (default: system RAM)"),
+    frames: str | None = typer.Option(None, "--frames", help="Bake only frames START:END (end exclusive) as one shard"),
 ):
     """Run the offline bake pipeline using selected modules."""
 
     from fieldfixer.bake.pipeline import run_bake
+    from fieldfixer.io.shards import parse_frame_range
+
+    try:
+        frame_range = parse_frame_range(frames) if frames is not None else None
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc), param_hint="--frames") from exc
+    mem_mb = int(mem_gb * 1024) if mem_gb is not None else None
+    results = run_bake(inp, out, profile, modules, work_dir=work, cpus=cpus, mem_mb=mem_mb, frame_range=frame_range)
+    for result in results.values():
+        typer.echo(f"{result.name:<16} {result.status:<8} {result.seconds:7.1f}s", err=True)
+
+
+@app.command("merge-shards")
+def merge_shards_cli(
+    shards: list[Path] = typer.Argument(..., help="Shard bake directories (any order)"),
+    out: Path = typer.Option(..., "--out", help="Index bake to write; apply --bake accepts it"),
+    frames: int | None = typer.Option(None, "--frames", help="Clip length; also require the last frames to be covered"),
+    allow_gaps: bool = typer.Option(False, "--allow-gaps", help="Accept uncovered frames (they render unchanged)"),
+):
+    """Join shard bakes into one bake by reference, checking frame size and coverage."""
+
+    from fieldfixer.io.shards import merge_shards
+
+    try:
+        meta = merge_shards(shards, out, frames=frames, allow_gaps=allow_gaps)
+    except ValueError as exc:
+        typer.echo(f"merge-shards: {exc}", err=True)
+        raise typer.Exit(code=1) from exc
+    typer.echo(f"{len(meta['shards'])} shards, frames {meta['frame_start']}-{meta['frame_end']} -> {out}")
+    for start, end in meta.get("gaps", []):
+        typer.echo(f"warning: frames {start}:{end} are not covered", err=True)
+    if meta.get("lut_mismatch"):
+        typer.echo(f"warning: scene LUT differs in {', '.join(meta['lut_mismatch'])}; using the first shard's", err=True)
+
+
+@app.command("encode-frames")
+def encode_frames_cli(
+    frame_dir: Path = typer.Option(..., "--in", help="Directory of PNG/JPG frames"),
+    out: Path = typer.Option(..., "--out", help="Output video path"),
+    fps: float = typer.Option(20.0, "--fps"),
+    crf: int = typer.Option(18, help="H264 CRF"),
+    workers: int | None = typer.Option(None, "--workers", help="Decode threads (default: up to 8)"),
+    readahead: int | None = typer.Option(None, "--readahead", help="Frames decoded ahead of the encoder"),
+    threads: int = typer.Option(0, "--threads", help="Encoder threads (0 = auto)"),
+):
+    """Encode a directory of frames (e.g. bake targets) into a preview video."""
+
+    from fieldfixer.io.frames import encode_frames
+
+    count = encode_frames(frame_dir, out, fps, crf=crf, workers=workers, readahead=readahead, threads=threads)
+    typer.echo(f"Wrote {count} frames to {out}")
+
+
+@app.command("serve")
+def serve_cli(
+    host: str = typer.Option("127.0.0.1", "--host"),
+    port: int = typer.Option(8765, "--port"),
+    socket: Path | None = typer.Option(None, "--socket", help="Serve on a Unix socket instead of TCP"),
+    max_concurrency: int = typer.Option(2, "--max-concurrency", help="Requests rendered at once"),
+    max_queue: int = typer.Option(32, "--max-queue", help="Requests allowed to wait before 503"),
+    cache_size: int = typer.Option(8, "--cache-size", help="Bakes and open clips kept warm"),
+):
+    """Run the apply daemon with warm kernels and cached bakes."""
+
+    from fieldfixer.daemon import serve
+
+    where = socket if socket is not None else f"http://{host}:{port}"
+    typer.echo(f"Serving on {where}", err=True)
+    try:
+        serve(host=host, port=port, socket_path=socket, max_concurrency=max_concurrency, max_queue=max_queue, cache_size=cache_size)
+    except FileExistsError as exc:
+        raise typer.BadParameter(str(exc), param_hint="--socket") from exc
+
+
+@app.command("tune")
+def tune_cli(
+    size: str = typer.Option("1920x1080", "--size", help="Resolution to tune for, WIDTHxHEIGHT"),
+    frames: int = typer.Option(8, "--frames", help="Timed renders per render candidate"),
+    clip_frames: int = typer.Option(24, "--clip-frames", help="Length of the synthetic clip for read-ahead trials"),
+    profile: Path | None = typer.Option(None, "--profile", help="Profile file (default: $FIELDFIXER_TUNED or ~/.config/fieldfixer/tuned.json)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Print the result without saving it"),
+):
+    """Benchmark threading, band size and read-ahead here and save the fastest settings for apply."""
+
+    from fieldfixer.io.rawpipe import parse_size
+    from fieldfixer.tuning import save_profile, tune
+
+    try:
+        width, height = parse_size(size)
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc), param_hint="--size") from exc
+
+    def log(trial) -> None:
+        params = " ".join(f"{k}={v}" for k, v in trial.settings.items())
+        typer.echo(f"{trial.stage:<7} {params:<28} {trial.fps:8.2f} fps")
+
+    settings, _ = tune(width, height, frames=frames, clip_frames=clip_frames, log=log)
+    typer.echo(
+        f"chosen: workers={settings.workers} band_rows={settings.band_rows} batch_frames={settings.batch_frames} "
+        f"readahead={settings.readahead} "
+        f"batch_workers={settings.batch_workers} ({settings.fps} fps)"
+    )
+    if not dry_run:
+        typer.echo(f"saved {save_profile(width, height, settings, profile)}")
+
+
+@app.command("warmup")
+def warmup_cli():
+    """Precompile and cache the Numba kernels so the first apply starts fast."""
+
+    from fieldfixer.ops.kernels import warmup
 
-    run_bake(inp, out, profile, modules)
+    for sig in warmup():
+        typer.echo(f"compiled {sig}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,390 @@
+"""Long-running apply service for interactive tools.
+
+The daemon keeps kernels compiled and recently used bakes/LUTs in memory, then
+serves JSON requests over localhost HTTP or a Unix socket:
+
+``GET /health``, ``GET /metrics``
+    Liveness and queue/latency counters.
+``POST /render`` ``{"in": video, "bake": dir|url, "frame": n, "format": "png"|"raw"}``
+    Render one frame; ``raw`` returns rgb24 bytes with ``X-Width``/``X-Height``.
+``POST /apply`` ``{"in": video, "bake": dir|url, "out": path, "crf": 18}``
+    Run a whole apply job and return its frame count and duration.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from fieldfixer.buffers import FramePool
+from fieldfixer.io.sidecar import REFS_NAME, SidecarBundle
+from fieldfixer.io.storage import is_remote
+from fieldfixer.runtime import apply_video, load_bake_lut, render_frame
+
+
+class ServiceBusy(RuntimeError):
+    """Raised when the request queue is full."""
+
+
+class _ClipCursor:
+    """An open reader positioned somewhere in a clip, so forward scrubbing does not re-decode."""
+
+    def __init__(self, inp: str) -> None:
+        self.inp = inp
+        self.lock = threading.Lock()
+        self._open()
+
+    def _open(self) -> None:
+        from fieldfixer.io.video import VideoReader
+
+        self.reader = VideoReader(self.inp)
+        self.frames = iter(self.reader)
+        self.position = -1
+        self.frame: np.ndarray | None = None
+
+    def read(self, idx: int) -> np.ndarray | None:
+        if idx < self.position:
+            # Jump back via the nearest keyframe instead of decoding from the start.
+            self.reader.seek(idx)
+            self.frames = iter(self.reader)
+            self.position = idx - 1
+        while self.position < idx:
+            frame = next(self.frames, None)
+            if frame is None:
+                return None
+            self.frame = frame
+            self.position += 1
+        return self.frame if self.position == idx else None
+
+    def close(self) -> None:
+        with self.lock:
+            self.reader.close()
+
+
+class _Entry:
+    """A cached bundle or cursor with the number of requests currently using it."""
+
+    def __init__(self, item, stamp) -> None:
+        self.item = item
+        self.stamp = stamp
+        self.users = 0
+        self.retired = False
+
+
+def _stamp(*paths: Path) -> tuple:
+    """``(mtime_ns, size)`` of each path, ``None`` where it is missing; rebuilt files change it."""
+
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            stamps.append(None)
+        else:
+            stamps.append((st.st_mtime_ns, st.st_size))
+    return tuple(stamps)
+
+
+def _bake_stamp(bake: str) -> tuple | None:
+    # Remote bakes are not revalidated; that would cost requests per render.
+    if is_remote(bake):
+        return None
+    return _stamp(Path(bake) / "meta.json", Path(bake) / REFS_NAME)
+
+
+class ApplyService:
+    """Admission control, caches and metrics shared by all request threads."""
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 32, cache_size: int = 8) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.cache_size = cache_size
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._bundles: OrderedDict[str, _Entry] = OrderedDict()
+        self._cursors: OrderedDict[str, _Entry] = OrderedDict()
+        self._local = threading.local()
+        self.started = time.time()
+        self.counters = {"queued": 0, "active": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latency_last = 0.0
+
+    # -- warm state --------------------------------------------------------
+
+    def warm(self) -> None:
+        """Compile kernels and exercise every op once before taking requests."""
+
+        from fieldfixer.ops import warp
+
+        if not warp._HAS_CV2:
+            from fieldfixer.ops.kernels import warmup
+
+            warmup()
+        frame = np.zeros((16, 16, 3), dtype=np.uint8)
+        axis = np.linspace(0.0, 1.0, 2, dtype=np.float32)
+        table = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1)
+        with tempfile.TemporaryDirectory() as empty:
+            render_frame(frame, 0, SidecarBundle.load(empty), {"size": 2, "table": table})
+
+    def _pool(self) -> FramePool:
+        pool = getattr(self._local, "pool", None)
+        if pool is None:
+            pool = self._local.pool = FramePool()
+        return pool
+
+    @contextmanager
+    def _lease(self, cache: OrderedDict, key: str, stamp, factory):
+        """Use the cached item for ``key``, building it if missing or if its ``stamp`` changed.
+
+        Evicted or stale items are only closed once the last request using
+        them has released its lease.
+        """
+
+        entry = self._acquire(cache, key, stamp, factory)
+        try:
+            yield entry.item
+        finally:
+            with self._lock:
+                entry.users -= 1
+                done = entry.retired and entry.users == 0
+            if done:
+                entry.item.close()
+
+    def _acquire(self, cache: OrderedDict, key: str, stamp, factory) -> _Entry:
+        with self._lock:
+            entry = cache.get(key)
+            if entry is not None and entry.stamp == stamp:
+                cache.move_to_end(key)
+                entry.users += 1
+                return entry
+        item = factory()
+        closing = []
+        with self._lock:
+            entry = cache.get(key)
+            if entry is not None and entry.stamp == stamp:
+                closing.append(item)  # another request built it first
+                cache.move_to_end(key)
+            else:
+                if entry is not None:
+                    closing += self._retire(cache.pop(key))
+                entry = cache[key] = _Entry(item, stamp)
+                while len(cache) > self.cache_size:
+                    closing += self._retire(cache.popitem(last=False)[1])
+            entry.users += 1
+        for old in closing:
+            old.close()
+        return entry
+
+    @staticmethod
+    def _retire(entry: _Entry) -> list:
+        # Called under the lock; returns the item if nobody is using it any more.
+        entry.retired = True
+        return [entry.item] if entry.users == 0 else []
+
+    def bundle(self, bake: str):
+        """Lease the cached bundle for ``bake`` (a context manager); reloaded when its meta/refs change."""
+
+        return self._lease(self._bundles, str(bake), _bake_stamp(str(bake)), lambda: SidecarBundle.load(bake))
+
+    # -- admission ---------------------------------------------------------
+
+    @contextmanager
+    def slot(self):
+        """Run the body under the concurrency limit, queueing up to ``max_queue`` waiters."""
+
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.counters["queued"] >= self.max_queue:
+                    self.counters["rejected"] += 1
+                    raise ServiceBusy("queue full")
+                self.counters["queued"] += 1
+            self._slots.acquire()
+            with self._lock:
+                self.counters["queued"] -= 1
+        with self._lock:
+            self.counters["active"] += 1
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            elapsed = time.perf_counter() - start
+            self._slots.release()
+            with self._lock:
+                self.counters["active"] -= 1
+                self.counters["completed" if ok else "failed"] += 1
+                self._latency_total += elapsed
+                self._latency_max = max(self._latency_max, elapsed)
+                self._latency_last = elapsed
+
+    # -- requests ----------------------------------------------------------
+
+    def render(self, inp: str, bake: str, idx: int) -> np.ndarray:
+        with self.slot(), self.bundle(bake) as bundle:
+            lut = load_bake_lut(bundle)
+            cursor_lease = self._lease(self._cursors, str(inp), _stamp(Path(inp)), lambda: _ClipCursor(inp))
+            with cursor_lease as cursor, cursor.lock:
+                frame = cursor.read(idx) if idx >= 0 else None
+                if frame is None:
+                    raise IndexError(f"Frame {idx} is out of range for {inp}")
+                return render_frame(frame, idx, bundle, lut, pool=self._pool()).copy()
+
+    def apply(self, inp: str, bake: str, out: str, crf: int = 18) -> dict[str, Any]:
+        with self.slot(), self.bundle(bake) as bundle:
+            start = time.perf_counter()
+            frames = apply_video(Path(inp), bake, Path(out), crf=crf, progress=False, bundle=bundle)
+            return {"frames": frames, "seconds": round(time.perf_counter() - start, 3)}
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            finished = self.counters["completed"] + self.counters["failed"]
+            return {
+                **self.counters,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "cached_bundles": len(self._bundles),
+                "latency_mean_s": round(self._latency_total / finished, 4) if finished else 0.0,
+                "latency_max_s": round(self._latency_max, 4),
+                "latency_last_s": round(self._latency_last, 4),
+                "uptime_s": round(time.time() - self.started, 1),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            closing = []
+            for entry in [*self._bundles.values(), *self._cursors.values()]:
+                closing += self._retire(entry)
+            self._bundles.clear()
+            self._cursors.clear()
+        for item in closing:
+            item.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service: ApplyService
+
+    def log_message(self, *args) -> None:  # noqa: ANN002 - keep the daemon quiet
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: int, payload: dict[str, Any]) -> None:
+        self._send(status, json.dumps(payload).encode(), "application/json")
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._json(200, {"ok": True})
+        elif self.path == "/metrics":
+            self._json(200, self.service.metrics())
+        else:
+            self._json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            req = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/render":
+                rgb = self.service.render(req["in"], req["bake"], int(req.get("frame", 0)))
+                if req.get("format", "png") == "raw":
+                    size = {"X-Width": str(rgb.shape[1]), "X-Height": str(rgb.shape[0])}
+                    self._send(200, rgb.tobytes(), "application/octet-stream", size)
+                else:
+                    import imageio.v3 as iio
+
+                    self._send(200, iio.imwrite("<bytes>", rgb, extension=".png"), "image/png")
+            elif self.path == "/apply":
+                self._json(200, self.service.apply(req["in"], req["bake"], req["out"], int(req.get("crf", 18))))
+            else:
+                self._json(404, {"error": f"unknown path {self.path}"})
+        except ServiceBusy as exc:
+            self._json(503, {"error": str(exc)})
+        except (KeyError, ValueError, IndexError, FileNotFoundError) as exc:
+            self._json(400, {"error": f"{type(exc).__name__}: {exc}"})
+        except Exception as exc:  # noqa: BLE001 - report and keep serving
+            self._json(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        conn, _ = super().get_request()
+        return conn, ("unix", 0)
+
+
+def _remove_stale_socket(path: Path) -> None:
+    """Unlink a socket left behind by a daemon that died; refuse to touch anything else."""
+
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except ConnectionRefusedError:
+        os.unlink(path)  # nothing is listening: stale
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(f"Another server is already listening on {path}")
+
+
+def make_server(service: ApplyService, host: str = "127.0.0.1", port: int = 8765, socket_path: Path | None = None):
+    """Build (but do not start) an HTTP server bound to TCP or a Unix socket."""
+
+    handler = type("ApplyHandler", (_Handler,), {"service": service})
+    if socket_path is not None:
+        socket_path = Path(socket_path)
+        _remove_stale_socket(socket_path)
+        return _UnixHTTPServer(str(socket_path), handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Path | None = None,
+    max_concurrency: int = 2,
+    max_queue: int = 32,
+    cache_size: int = 8,
+) -> None:
+    """Warm up, then serve requests until interrupted."""
+
+    service = ApplyService(max_concurrency=max_concurrency, max_queue=max_queue, cache_size=cache_size)
+    service.warm()
+    server = make_server(service, host=host, port=port, socket_path=socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
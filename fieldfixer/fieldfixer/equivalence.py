@@ -0,0 +1,347 @@
+"""Equivalence harness: every fast path against the float64 reference ops.
+
+Each :class:`Variant` implements one op (``warp``, ``composite``,
+``warp_blend``, ``curves``, ``lut``) and declares an error :class:`Budget`.
+:func:`run_equivalence` feeds all variants the same randomized and synthetic
+cases (noise and gradient frames, zero/sub-pixel/large displacement fields,
+hard and soft masks, extreme curves, identity and random LUTs). It records
+the worst max/mean absolute error and the lowest PSNR per variant, and marks
+a variant failed when any case exceeds its budget.
+
+Register new fast paths with :func:`register` so they are covered by
+``tests/test_equivalence.py`` before they are switched on. Batched
+(``*_batch``) ops are registered through :func:`_in_stack`, which checks the
+case frame in a stack behind an unrelated frame.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+from fieldfixer.ops import reference
+
+OPS = ("warp", "composite", "warp_blend", "curves", "lut")
+
+
+@dataclass(frozen=True)
+class Budget:
+    max_abs: float
+    mean_abs: float
+    min_psnr: float = 0.0
+
+
+@dataclass
+class ErrorStats:
+    max_abs: float = 0.0
+    mean_abs: float = 0.0
+    psnr: float = float("inf")
+
+    @classmethod
+    def compare(cls, ref: np.ndarray, out: np.ndarray) -> "ErrorStats":
+        diff = np.abs(out.astype(np.float64) - ref)
+        mse = float(np.mean(diff * diff))
+        psnr = float("inf") if mse == 0 else 10.0 * np.log10(255.0**2 / mse)
+        return cls(float(diff.max()), float(diff.mean()), psnr)
+
+    def merge(self, other: "ErrorStats") -> "ErrorStats":
+        """Worst case of two results."""
+
+        return ErrorStats(
+            max(self.max_abs, other.max_abs),
+            max(self.mean_abs, other.mean_abs),
+            min(self.psnr, other.psnr),
+        )
+
+    def within(self, budget: Budget) -> bool:
+        return self.max_abs <= budget.max_abs and self.mean_abs <= budget.mean_abs and self.psnr >= budget.min_psnr
+
+
+@dataclass
+class Variant:
+    op: str
+    name: str
+    fn: Callable[..., np.ndarray]
+    budget: Budget
+    available: Callable[[], bool] = lambda: True
+
+
+@dataclass
+class Result:
+    variant: Variant
+    stats: ErrorStats = field(default_factory=ErrorStats)
+    cases: int = 0
+    worst_case: str = ""
+    skipped: bool = False
+
+    @property
+    def passed(self) -> bool:
+        return self.skipped or self.stats.within(self.variant.budget)
+
+
+VARIANTS: list[Variant] = []
+
+
+def register(op: str, name: str, budget: Budget, available: Callable[[], bool] = lambda: True):
+    """Decorator adding a fast-path implementation of ``op`` to the harness."""
+
+    if op not in OPS:
+        raise ValueError(f"Unknown op {op!r}; expected one of {', '.join(OPS)}")
+
+    def wrap(fn: Callable[..., np.ndarray]) -> Callable[..., np.ndarray]:
+        VARIANTS.append(Variant(op, name, fn, budget, available))
+        return fn
+
+    return wrap
+
+
+# -- cases -------------------------------------------------------------------
+
+
+def _frames(rng: np.random.Generator, shape: tuple[int, int]) -> Iterator[tuple[str, np.ndarray]]:
+    h, w = shape
+    yield "noise", rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    ramp = np.linspace(0, 255, w, dtype=np.float32)
+    yield "gradient", np.ascontiguousarray(np.broadcast_to(np.stack([ramp, ramp[::-1], np.full_like(ramp, 128)], -1), (h, w, 3)), np.uint8)
+    check = ((np.indices((h, w)).sum(0) // 4) % 2 * 255).astype(np.uint8)
+    yield "checker", np.repeat(check[..., None], 3, axis=2)
+    yield "extremes", np.where(rng.random((h, w, 1)) < 0.5, 0, 255).astype(np.uint8).repeat(3, axis=2)
+
+
+def _fields(rng: np.random.Generator, shape: tuple[int, int]) -> Iterator[tuple[str, np.ndarray, np.ndarray]]:
+    zeros = np.zeros(shape, np.float32)
+    yield "zero", zeros, zeros
+    yield "subpixel", np.full(shape, 0.37, np.float32), np.full(shape, -0.61, np.float32)
+    ys, xs = np.indices(shape, dtype=np.float32)
+    yield "smooth", (2.5 * np.sin(xs / 5.0)).astype(np.float32), (1.5 * np.cos(ys / 7.0)).astype(np.float32)
+    yield "random", rng.uniform(-3, 3, shape).astype(np.float32), rng.uniform(-3, 3, shape).astype(np.float32)
+    sparse_u, sparse_v = zeros.copy(), zeros.copy()
+    h, w = shape
+    sparse_u[h // 4 : h // 2, w // 3 : w // 2] = 1.75
+    sparse_v[h // 4 : h // 2, w // 3 : w // 2] = -0.8
+    yield "sparse", sparse_u, sparse_v
+    yield "out_of_bounds", np.full(shape, w * 1.5, np.float32), np.full(shape, -h * 1.5, np.float32)
+
+
+def _masks(rng: np.random.Generator, shape: tuple[int, int]) -> Iterator[tuple[str, np.ndarray]]:
+    yield "opaque", np.full(shape, 255, np.uint8)
+    yield "clear", np.zeros(shape, np.uint8)
+    yield "random", rng.integers(0, 256, shape, dtype=np.uint8)
+    yield "ramp", np.broadcast_to(np.linspace(0, 255, shape[1]).astype(np.uint8), shape).copy()
+
+
+def _curves(rng: np.random.Generator) -> Iterator[tuple[str, dict]]:
+    yield "identity", {"exposure": 1.0, "gamma": 1.0}
+    yield "bright", {"exposure": 1.8, "gamma": 0.8, "white_balance": [1.1, 1.0, 0.9]}
+    yield "dark", {"exposure": 0.4, "gamma": 2.2}
+    yield "random", {
+        "exposure": float(rng.uniform(0.5, 2.0)),
+        "gamma": float(rng.uniform(0.5, 2.5)),
+        "white_balance": rng.uniform(0.7, 1.3, 3).tolist(),
+    }
+
+
+def _luts(rng: np.random.Generator) -> Iterator[tuple[str, dict]]:
+    for size in (2, 17):
+        axis = np.linspace(0.0, 1.0, size, dtype=np.float32)
+        ident = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1)
+        yield f"identity{size}", {"size": size, "table": ident}
+        warm = np.clip(ident**0.8 * np.array([1.05, 1.0, 0.9], np.float32), 0, 1).astype(np.float32)
+        yield f"smooth{size}", {"size": size, "table": warm}
+    yield "random9", {"size": 9, "table": rng.random((9, 9, 9, 3), dtype=np.float32)}
+
+
+def cases(op: str, rng: np.random.Generator, shape: tuple[int, int]) -> Iterator[tuple[str, tuple[Any, ...], np.ndarray]]:
+    """Yield ``(label, args, reference)`` for every case of ``op``."""
+
+    frames = list(_frames(rng, shape))
+    if op == "warp":
+        for (fname, img), (dname, du, dv) in ((f, d) for f in frames for d in _fields(rng, shape)):
+            yield f"{fname}/{dname}", (img, du, dv), reference.displacement(img, du, dv)
+    elif op == "composite":
+        for fname, fg in frames:
+            bg = rng.integers(0, 256, fg.shape, dtype=np.uint8)
+            for mname, mask in _masks(rng, shape):
+                yield f"{fname}/{mname}", (fg, bg, mask), reference.composite(fg, bg, mask)
+    elif op == "warp_blend":
+        for fname, img in frames:
+            for dname, du, dv in _fields(rng, shape):
+                for mname, mask in _masks(rng, shape):
+                    ref = reference.composite(np.clip(np.round(reference.displacement(img, du, dv)), 0, 255), img, mask)
+                    yield f"{fname}/{dname}/{mname}", (img, du, dv, mask), ref
+    elif op == "curves":
+        for (fname, img), (cname, params) in ((f, c) for f in frames for c in _curves(rng)):
+            yield f"{fname}/{cname}", (img, params), reference.curves(img, params)
+    elif op == "lut":
+        for (fname, img), (lname, table) in ((f, t) for f in frames for t in _luts(rng)):
+            yield f"{fname}/{lname}", (img, table), reference.lut(img, table)
+    else:
+        raise ValueError(f"Unknown op {op!r}")
+
+
+def run_equivalence(
+    variants: list[Variant] | None = None,
+    seeds: tuple[int, ...] = (0, 1),
+    shapes: tuple[tuple[int, int], ...] = ((24, 40), (37, 53)),
+) -> list[Result]:
+    """Run every variant over every case and return the worst-case stats per variant."""
+
+    _register_builtin()
+    variants = VARIANTS if variants is None else variants
+    results = []
+    for variant in variants:
+        result = Result(variant)
+        if not variant.available():
+            result.skipped = True
+            results.append(result)
+            continue
+        for seed in seeds:
+            for shape in shapes:
+                for label, args, ref in cases(variant.op, np.random.default_rng(seed), shape):
+                    stats = ErrorStats.compare(ref, variant.fn(*args))
+                    if not stats.within(variant.budget) and result.worst_case == "":
+                        result.worst_case = f"seed={seed} shape={shape} {label}"
+                    result.stats = result.stats.merge(stats)
+                    result.cases += 1
+        results.append(result)
+    return results
+
+
+def format_report(results: list[Result]) -> str:
+    lines = [f"{'op':<11} {'variant':<16} {'cases':>5} {'max':>7} {'mean':>8} {'psnr':>7}  status"]
+    for r in results:
+        if r.skipped:
+            lines.append(f"{r.variant.op:<11} {r.variant.name:<16} {'-':>5} {'':>7} {'':>8} {'':>7}  skipped")
+            continue
+        status = "ok" if r.passed else f"OVER BUDGET ({r.worst_case})"
+        lines.append(
+            f"{r.variant.op:<11} {r.variant.name:<16} {r.cases:>5} {r.stats.max_abs:>7.3f} "
+            f"{r.stats.mean_abs:>8.4f} {r.stats.psnr:>7.2f}  {status}"
+        )
+    return "\n".join(lines)
+
+
+# -- built-in variants ---------------------------------------------------------
+
+_registered = False
+
+
+def _has_cv2() -> bool:
+    from fieldfixer.ops import warp
+
+    return warp._HAS_CV2
+
+
+def _has_numba() -> bool:
+    try:
+        import numba  # noqa: F401
+    except Exception:  # pragma: no cover - optional dependency
+        return False
+    return True
+
+
+def _register_builtin() -> None:
+    """Register the shipped fast paths (done lazily so importing stays cheap)."""
+
+    global _registered
+    if _registered:
+        return
+    _registered = True
+
+    from fieldfixer.buffers import FramePool
+    from fieldfixer.ops.exposure import apply_curves, apply_curves_batch
+    from fieldfixer.ops.lut3d import apply_lut, apply_lut_batch
+    from fieldfixer.ops.mask import composite_with_mask, composite_with_mask_batch
+    from fieldfixer.ops.tiles import activity_map, warp_blend_tiles
+    from fieldfixer.ops.warp import apply_displacement, apply_displacement_batch
+
+    pool = FramePool()
+    # Most ops truncate to uint8, which alone costs up to 1 level; float32
+    # intermediates may push that a hair further.
+    truncating = Budget(max_abs=1.0 + 1e-3, mean_abs=0.75, min_psnr=48.0)
+    # cv2.remap may quantize coordinates to 1/32 px depending on build and
+    # size, costing up to ~8 levels on single-pixel noise.
+    remap = Budget(max_abs=9.0, mean_abs=0.75, min_psnr=40.0)
+
+    register("warp", "default", remap)(apply_displacement)
+    register("warp", "pooled_out", remap)(
+        lambda img, du, dv: apply_displacement(img, du, dv, out=np.empty(img.shape, np.uint8), pool=pool)
+    )
+
+    register("warp", "batched", remap)(_in_stack(lambda imgs, du, dv: apply_displacement_batch(imgs, du, dv, pool=pool)))
+
+    @register("warp", "numba", truncating, available=_has_numba)
+    def _numba_warp(img, du, dv):
+        from fieldfixer.ops.kernels import _bilinear_sample
+
+        return _bilinear_sample(img, du, dv, np.empty_like(img))
+
+    @register("warp", "float16_sidecar", Budget(max_abs=10.0, mean_abs=0.8, min_psnr=40.0))
+    def _quantized_warp(img, du, dv):
+        # Sidecars store displacement as float16.
+        return apply_displacement(img, du.astype(np.float16).astype(np.float32), dv.astype(np.float16).astype(np.float32))
+
+    register("composite", "default", truncating)(composite_with_mask)
+    register("composite", "pooled_out", truncating)(
+        lambda fg, bg, mask: composite_with_mask(fg, bg, mask, out=fg.copy(), pool=pool)
+    )
+    register("composite", "batched", truncating)(
+        _in_stack(lambda fg, bg, masks: composite_with_mask_batch(fg, bg, masks, pool=pool))
+    )
+
+    blend = remap
+
+    @register("warp_blend", "full_frame", blend)
+    def _full_blend(img, du, dv, mask):
+        return composite_with_mask(apply_displacement(img, du, dv), img, mask)
+
+    @register("warp_blend", "tiled", blend)
+    def _tiled_blend(img, du, dv, mask):
+        active = activity_map(du, dv, mask, tile=8)
+        return warp_blend_tiles(img, du, dv, mask, active, 8, pool=pool)
+
+    curves = truncating
+    register("curves", "table", curves)(apply_curves)
+    register("curves", "float_input", curves)(lambda img, params: apply_curves(img.astype(np.float32), params))
+
+    @register("curves", "in_place", curves)
+    def _curves_in_place(img, params):
+        work = img.copy()
+        return apply_curves(work, params, out=work)
+
+    @register("curves", "batched", curves)
+    def _curves_batched(img, params):
+        # The first frame gets other parameters, so the case frame needs its own table.
+        stack = np.stack([img[::-1], img])
+        return apply_curves_batch(stack, [{"exposure": 0.5, "gamma": 2.0}, params], out=stack)[1]
+
+    lut = truncating
+    register("lut", "default", lut)(apply_lut)
+
+    @register("lut", "in_place_pooled", lut)
+    def _lut_in_place(img, table):
+        work = img.copy()
+        return apply_lut(work, table, out=work, pool=pool)
+
+    register("lut", "batched", lut)(_in_stack(lambda imgs, table: apply_lut_batch(imgs, table, pool=pool)))
+
+
+def _in_stack(batch_fn: Callable[..., np.ndarray]) -> Callable[..., np.ndarray]:
+    """Adapt a batched op to single-frame cases: run it on a two-frame stack and return the second.
+
+    The first frame is the case frame flipped upside down, so indexing
+    mistakes across frames show up as errors. Arguments other than frames and
+    per-pixel maps (such as LUTs) are passed through unchanged.
+    """
+
+    def stacked(*args):
+        shape = args[0].shape[:2]
+        stacks = [
+            np.stack([a[::-1], a]) if isinstance(a, np.ndarray) and a.shape[:2] == shape else a
+            for a in args
+        ]
+        return batch_fn(*stacks)[1]
+
+    return stacked
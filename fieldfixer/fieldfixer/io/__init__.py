@@ -1,3 +1,3 @@
 """I/O helpers for FieldFixer."""
 
-__all__ = ["video", "sidecar"]
+__all__ = ["video", "sidecar", "rawpipe", "frames", "chunked", "manifest", "shards"]
@@ -0,0 +1,202 @@
+"""Resumable encoding: independent chunks plus a checkpoint, joined losslessly at the end."""
+
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import shutil
+from fractions import Fraction
+from pathlib import Path
+from typing import Iterator
+
+import av
+import numpy as np
+
+from fieldfixer.io.video import VideoWriter, muxable, passthrough_streams
+
+CHECKPOINT_NAME = "checkpoint.json"
+
+
+def parts_dir_for(out: Path) -> Path:
+    out = Path(out)
+    return out.with_name(out.name + ".parts")
+
+
+def _write_json_atomic(path: Path, data: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(data, fh, indent=2)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class ChunkedVideoWriter:
+    """Encode into ``chunk_frames``-sized files next to ``out`` and checkpoint each one.
+
+    Every chunk is a separate encoder session, so it starts on an IDR frame and
+    its GOPs are closed; a finished chunk never has to be touched again. If a
+    checkpoint with the same ``fingerprint`` exists, completed chunks are kept
+    and :attr:`resume_frame` tells the caller where to restart. ``close()``
+    remuxes all chunks into ``out`` without re-encoding and removes the parts;
+    with ``passthrough_from`` the audio/subtitle/data streams of that file are
+    copied in during the same remux.
+    """
+
+    def __init__(
+        self,
+        out: Path,
+        width: int,
+        height: int,
+        fps: float,
+        crf: int = 18,
+        chunk_frames: int = 600,
+        fingerprint: dict | None = None,
+        passthrough_from: Path | None = None,
+    ) -> None:
+        if chunk_frames <= 0:
+            raise ValueError("chunk_frames must be positive")
+        self.out = Path(out)
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.crf = crf
+        self.chunk_frames = chunk_frames
+        self.passthrough_from = passthrough_from
+        self.parts = parts_dir_for(self.out)
+        self.checkpoint_path = self.parts / CHECKPOINT_NAME
+
+        self.state = {
+            "version": 1,
+            "fingerprint": fingerprint or {},
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "crf": crf,
+            "chunk_frames": chunk_frames,
+            "chunks": [],
+        }
+        previous = self._load_checkpoint()
+        if previous is not None and all(previous.get(k) == v for k, v in self.state.items() if k != "chunks"):
+            self.state["chunks"] = [c for c in previous["chunks"] if (self.parts / c["file"]).exists()]
+        else:
+            shutil.rmtree(self.parts, ignore_errors=True)
+        self.parts.mkdir(parents=True, exist_ok=True)
+
+        self._writer: VideoWriter | None = None
+        self._pending = 0
+
+    def _load_checkpoint(self) -> dict | None:
+        try:
+            return json.loads(self.checkpoint_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @property
+    def resume_frame(self) -> int:
+        """Number of frames already encoded in completed chunks."""
+
+        return sum(c["frames"] for c in self.state["chunks"])
+
+    def _chunk_name(self, n: int) -> str:
+        return f"chunk_{n:05d}.mp4"
+
+    def write(self, rgb: np.ndarray) -> None:
+        if self._writer is None:
+            tmp = self.parts / f"chunk_{len(self.state['chunks']):05d}.tmp.mp4"
+            self._writer = VideoWriter(str(tmp), width=self.width, height=self.height, fps=self.fps, crf=self.crf)
+        self._writer.write(rgb)
+        self._pending += 1
+        if self._pending >= self.chunk_frames:
+            self._finish_chunk()
+
+    def _finish_chunk(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        n = len(self.state["chunks"])
+        name = self._chunk_name(n)
+        os.replace(self._writer.path, self.parts / name)
+        self.state["chunks"].append({"file": name, "start": self.resume_frame, "frames": self._pending})
+        _write_json_atomic(self.checkpoint_path, self.state)
+        self._writer = None
+        self._pending = 0
+
+    def close(self) -> None:
+        """Finish the last chunk, join all chunks into ``out`` and drop the parts directory."""
+
+        self._finish_chunk()
+        concat_chunks(
+            [self.parts / c["file"] for c in self.state["chunks"]], self.out, self.fps, passthrough_from=self.passthrough_from
+        )
+        shutil.rmtree(self.parts, ignore_errors=True)
+
+
+def _chunk_packets(chunks: list[Path], rate: Fraction, ostream) -> Iterator[tuple[float, int, av.Packet]]:
+    frames_done = 0
+    for path in chunks:
+        with av.open(str(path)) as chunk:
+            stream = chunk.streams.video[0]
+            offset = round(Fraction(frames_done) / rate / stream.time_base)
+            count = 0
+            for packet in chunk.demux(stream):
+                if packet.dts is None:
+                    continue  # demuxer flush packet
+                packet.pts += offset
+                packet.dts += offset
+                packet.stream = ostream
+                yield float(packet.dts * stream.time_base), 0, packet
+                count += 1
+            frames_done += count
+
+
+def _source_packets(source, copied: dict, shift: float) -> Iterator[tuple[float, int, av.Packet]]:
+    for packet in source.demux([source.streams[i] for i in copied]):
+        if packet.dts is None:
+            continue
+        tb = packet.time_base
+        # Chunks restart the video at 0; move the copied streams by the source video's start.
+        delta = round(Fraction(shift).limit_denominator(1 << 20) / tb)
+        packet.pts = packet.pts - delta if packet.pts is not None else None
+        packet.dts -= delta
+        packet.stream = copied[packet.stream.index]
+        yield float(packet.dts * tb), 1, packet
+
+
+def concat_chunks(chunks: list[Path], out: Path, fps: float, passthrough_from: Path | None = None) -> None:
+    """Concatenate same-codec video files by copying packets (no re-encode).
+
+    With ``passthrough_from`` its audio, subtitle and data streams are copied
+    into ``out`` as well, interleaved with the video by timestamp.
+    """
+
+    if not chunks:
+        raise ValueError("No chunks to concatenate")
+    rate = Fraction(fps).limit_denominator(1001)
+    output = av.open(str(out), mode="w")
+    source = av.open(str(passthrough_from)) if passthrough_from is not None else None
+    try:
+        with av.open(str(chunks[0])) as first:
+            template = first.streams.video[0]
+            add = getattr(output, "add_stream_from_template", None)
+            ostream = add(template) if add is not None else output.add_stream(template=template)
+
+        streams = [_chunk_packets(chunks, rate, ostream)]
+        if source is not None:
+            copied = {
+                s.index: output.add_stream_from_template(s)
+                for s in passthrough_streams(source)
+                if muxable(output.format.name, s)
+            }
+            if copied:
+                video = next((s for s in source.streams if s.type == "video"), None)
+                shift = float((video.start_time or 0) * video.time_base) if video is not None else 0.0
+                streams.append(_source_packets(source, copied, shift))
+        # Merge by time so the muxer never has to buffer one whole stream.
+        for _, _, packet in heapq.merge(*streams, key=lambda item: item[:2]):
+            output.mux(packet)
+    finally:
+        if source is not None:
+            source.close()
+        output.close()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, Sequence
+
+import numpy as np
+
+
+def list_frames(frame_dir: Path) -> list[Path]:
+    """Return the sorted PNG frames in ``frame_dir``, falling back to JPG."""
+
+    frame_dir = Path(frame_dir)
+    frames = sorted(frame_dir.glob("*.png")) or sorted(frame_dir.glob("*.jpg"))
+    if not frames:
+        raise FileNotFoundError(f"No frames found under {frame_dir}")
+    return frames
+
+
+def to_uint8(arr: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """Convert a decoded image to (H,W,3) uint8 RGB, writing into ``out`` when given.
+
+    uint16 keeps the high byte, other dtypes are clipped to [0, 255]; grey is
+    broadcast to three channels and alpha is dropped.
+    """
+
+    if arr.ndim == 2:
+        arr = arr[..., None]
+    elif arr.shape[-1] > 3:
+        arr = arr[..., :3]
+    shape = arr.shape[:2] + (3,)
+    if out is None:
+        if arr.dtype == np.uint8 and arr.shape[-1] == 3:
+            return arr
+        out = np.empty(shape, dtype=np.uint8)
+    elif out.shape != shape:
+        raise ValueError(f"Frame shape {shape} does not match buffer shape {out.shape}")
+
+    if arr.dtype == np.uint8:
+        np.copyto(out, arr)
+    elif arr.dtype == np.uint16:
+        np.right_shift(arr, 8, out=out, casting="unsafe")
+    else:
+        np.clip(arr, 0, 255, out=out, casting="unsafe")
+    return out
+
+
+def iter_frames(
+    paths: Sequence[Path],
+    shape: tuple[int, int],
+    workers: int | None = None,
+    readahead: int | None = None,
+) -> Iterator[np.ndarray]:
+    """Decode ``paths`` on a thread pool and yield uint8 RGB frames in order.
+
+    Up to ``readahead`` frames decode ahead of the consumer, each into its own
+    slot of a reused ring of buffers. A yielded frame stays valid until the
+    consumer asks for the next one.
+    """
+
+    import imageio.v3 as iio
+
+    workers = workers or min(8, os.cpu_count() or 1)
+    readahead = max(readahead or 2 * workers, 1)
+    ring = [np.empty(shape + (3,), dtype=np.uint8) for _ in range(min(readahead, len(paths)))]
+
+    def load(i: int) -> np.ndarray:
+        try:
+            return to_uint8(iio.imread(paths[i]), out=ring[i % len(ring)])
+        except ValueError as exc:
+            raise ValueError(f"{paths[i]}: {exc}") from exc
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(load, i) for i in range(len(ring)))
+        nxt = len(ring)
+        while pending:
+            frame = pending.popleft().result()
+            yield frame
+            if nxt < len(paths):
+                pending.append(pool.submit(load, nxt))
+                nxt += 1
+
+
+def encode_frames(
+    frame_dir: Path,
+    out_path: Path,
+    fps: float,
+    crf: int = 18,
+    workers: int | None = None,
+    readahead: int | None = None,
+    threads: int = 0,
+) -> int:
+    """Encode a directory of frames to H.264; returns the number of frames written."""
+
+    import imageio.v3 as iio
+
+    from fieldfixer.io.video import VideoWriter
+
+    frames = list_frames(frame_dir)
+    height, width = iio.improps(frames[0]).shape[:2]
+
+    vw = VideoWriter(str(out_path), width=width, height=height, fps=fps, crf=crf, threads=threads)
+    count = 0
+    try:
+        for rgb in iter_frames(frames, (height, width), workers=workers, readahead=readahead):
+            vw.write(rgb)
+            count += 1
+    finally:
+        vw.close()
+    return count
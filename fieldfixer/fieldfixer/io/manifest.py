@@ -0,0 +1,145 @@
+"""One-shot directory manifests for flows, confidences and sidecar frames.
+
+Packing and playback ask "does frame N exist in directory D" for every frame
+and every candidate location. On network filesystems each such ``exists()``
+or failed ``open()`` is a metadata round trip. A :class:`Manifest` lists each
+directory once with ``os.scandir`` and answers every later lookup from
+memory.
+
+Manifests can be saved as JSON (``manifest.json`` in a packed bake) and
+loaded again. On load each directory's mtime is checked (one ``stat`` per
+directory, not per file) and only changed directories are rescanned; pass
+``validate=False`` for immutable or remote trees.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+class Manifest:
+    """Cached file listings of directories under ``root`` (the working directory if omitted).
+
+    An ``offline`` manifest never touches the filesystem: directories it
+    does not list count as empty (used for remote bakes).
+    """
+
+    def __init__(self, root: str | os.PathLike | None = None, offline: bool = False) -> None:
+        self.root = Path(root) if root is not None else None
+        self.offline = offline
+        self._base = os.path.abspath(self.root if self.root is not None else os.curdir)
+        self._dirs: dict[str, frozenset[str]] = {}
+        self._mtimes: dict[str, int | None] = {}
+
+    def _key(self, directory: str | os.PathLike) -> str:
+        path = os.path.join(self._base, directory)
+        return Path(os.path.relpath(path, self._base)).as_posix()
+
+    def _scan(self, key: str) -> frozenset[str]:
+        path = os.path.join(self._base, key)
+        try:
+            # mtime first: an entry added mid-scan then still shows up as a change on refresh.
+            mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                names = frozenset(e.name for e in it if e.is_file())
+        except (FileNotFoundError, NotADirectoryError):
+            names, mtime = frozenset(), None
+        self._dirs[key] = names
+        self._mtimes[key] = mtime
+        return names
+
+    @classmethod
+    def scan(cls, root: str | os.PathLike, dirs: Iterable[str | os.PathLike] = (".",)) -> "Manifest":
+        """List ``dirs`` (relative to ``root``) right away."""
+
+        manifest = cls(root)
+        for directory in dirs:
+            manifest.listing(directory)
+        return manifest
+
+    def listing(self, directory: str | os.PathLike) -> frozenset[str]:
+        """File names in ``directory``; scanned on first use, empty if it does not exist."""
+
+        key = self._key(directory)
+        names = self._dirs.get(key)
+        if names is None:
+            names = frozenset() if self.offline else self._scan(key)
+        return names
+
+    def covers(self, directory: str | os.PathLike) -> bool:
+        """Whether ``directory`` has been listed (so lookups in it need no filesystem access)."""
+
+        return self._key(directory) in self._dirs
+
+    def exists(self, path: str | os.PathLike) -> bool:
+        directory, name = os.path.split(os.fspath(path))
+        return name in self.listing(directory or os.curdir)
+
+    def frame_indices(self, directory: str | os.PathLike, suffix: str = ".npy") -> list[int]:
+        """Sorted frame numbers of ``<int><suffix>`` files in ``directory``."""
+
+        indices = []
+        for name in self.listing(directory):
+            stem, ext = os.path.splitext(name)
+            if ext == suffix:
+                try:
+                    indices.append(int(stem))
+                except ValueError:
+                    continue
+        return sorted(indices)
+
+    def refresh(self) -> list[str]:
+        """Rescan directories whose mtime changed; returns their keys."""
+
+        stale = []
+        if self.offline:
+            return stale
+        for key, mtime in list(self._mtimes.items()):
+            try:
+                current = os.stat(os.path.join(self._base, key)).st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                current = None
+            if current != mtime:
+                self._scan(key)
+                stale.append(key)
+        return stale
+
+    def to_json(self) -> dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "dirs": {
+                key: {"mtime_ns": self._mtimes.get(key), "files": sorted(names)} for key, names in sorted(self._dirs.items())
+            },
+        }
+
+    @classmethod
+    def from_json(cls, doc: dict, root: str | os.PathLike | None = None, offline: bool = False) -> "Manifest":
+        if doc.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version {doc.get('version')!r}")
+        manifest = cls(root, offline=offline)
+        for key, entry in doc.get("dirs", {}).items():
+            manifest._dirs[key] = frozenset(entry.get("files", ()))
+            manifest._mtimes[key] = entry.get("mtime_ns")
+        return manifest
+
+    def save(self, path: str | os.PathLike) -> Path:
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(self.to_json()))
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str | os.PathLike, root: str | os.PathLike | None = None, validate: bool = True) -> "Manifest":
+        """Load a saved manifest; with ``validate`` directories changed since it was saved are rescanned."""
+
+        manifest = cls.from_json(json.loads(Path(path).read_text()), root=root)
+        if validate:
+            manifest.refresh()
+        return manifest
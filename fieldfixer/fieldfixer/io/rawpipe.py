@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+import numpy as np
+
+try:
+    import cv2
+
+    _HAS_CV2 = True
+except Exception:  # pragma: no cover
+    _HAS_CV2 = False
+
+PIX_FMTS = ("rgb24", "yuv420p")
+
+
+def parse_size(text: str) -> tuple[int, int]:
+    """Parse a ``WIDTHxHEIGHT`` string into ``(width, height)``."""
+
+    try:
+        w, h = (int(v) for v in text.lower().split("x"))
+    except ValueError as exc:
+        raise ValueError(f"Invalid frame size {text!r} (expected WIDTHxHEIGHT)") from exc
+    if w <= 0 or h <= 0:
+        raise ValueError(f"Invalid frame size {text!r} (expected WIDTHxHEIGHT)")
+    return w, h
+
+
+def _frame_bytes(width: int, height: int, pix_fmt: str) -> int:
+    if pix_fmt == "rgb24":
+        return width * height * 3
+    if pix_fmt == "yuv420p":
+        if width % 2 or height % 2:
+            raise ValueError("yuv420p frames need even width and height")
+        return width * height * 3 // 2
+    raise ValueError(f"Unsupported pix_fmt {pix_fmt!r} (expected one of {PIX_FMTS})")
+
+
+def _open_stream(target: str, mode: str) -> tuple[BinaryIO, bool]:
+    if target == "-":
+        std = sys.stdin if "r" in mode else sys.stdout
+        return std.buffer, False
+    return open(target, mode), True
+
+
+@dataclass
+class RawFrameReader:
+    """Iterate fixed-size raw frames from a file, FIFO or ``-`` (stdin).
+
+    Frames are decoded into buffers owned by the reader, so a yielded array is
+    only valid until the next iteration step.
+    """
+
+    path: str
+    width: int
+    height: int
+    pix_fmt: str = "rgb24"
+    fps: float = 30.0
+    nframes: int | None = field(default=None, init=False)
+
+    def __post_init__(self) -> None:
+        self.frame_size = _frame_bytes(self.width, self.height, self.pix_fmt)
+        if self.pix_fmt != "rgb24" and not _HAS_CV2:
+            raise RuntimeError(f"opencv-python is required for {self.pix_fmt} input")
+        self.stream, self._owns_stream = _open_stream(str(self.path), "rb")
+        self._raw = np.empty(self.frame_size, dtype=np.uint8)
+        self._rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def _read_exact(self) -> bool:
+        view = memoryview(self._raw)
+        filled = 0
+        while filled < self.frame_size:
+            n = self.stream.readinto(view[filled:])
+            if not n:
+                if filled:
+                    raise EOFError(f"Truncated raw frame ({filled}/{self.frame_size} bytes)")
+                return False
+            filled += n
+        return True
+
+    def __iter__(self):
+        while self._read_exact():
+            if self.pix_fmt == "rgb24":
+                yield self._raw.reshape(self.height, self.width, 3)
+            else:
+                yuv = self._raw.reshape(self.height * 3 // 2, self.width)
+                cv2.cvtColor(yuv, cv2.COLOR_YUV2RGB_I420, dst=self._rgb)
+                yield self._rgb
+
+    def close(self) -> None:
+        """Close the underlying stream unless it is stdin."""
+
+        if self._owns_stream:
+            self.stream.close()
+
+
+@dataclass
+class RawFrameWriter:
+    """Write RGB frames as raw ``pix_fmt`` bytes to a file, FIFO or ``-`` (stdout)."""
+
+    path: str
+    width: int
+    height: int
+    pix_fmt: str = "rgb24"
+
+    def __post_init__(self) -> None:
+        self.frame_size = _frame_bytes(self.width, self.height, self.pix_fmt)
+        if self.pix_fmt != "rgb24" and not _HAS_CV2:
+            raise RuntimeError(f"opencv-python is required for {self.pix_fmt} output")
+        self.stream, self._owns_stream = _open_stream(str(self.path), "wb")
+        self._yuv = (
+            np.empty((self.height * 3 // 2, self.width), dtype=np.uint8)
+            if self.pix_fmt == "yuv420p"
+            else None
+        )
+
+    def write(self, rgb: np.ndarray) -> None:
+        if rgb.shape != (self.height, self.width, 3):
+            raise ValueError(f"Frame shape {rgb.shape} does not match {self.height}x{self.width}x3")
+        if self._yuv is not None:
+            cv2.cvtColor(rgb, cv2.COLOR_RGB2YUV_I420, dst=self._yuv)
+            buf = self._yuv
+        else:
+            buf = np.ascontiguousarray(rgb, dtype=np.uint8)
+        self.stream.write(memoryview(buf).cast("B"))
+
+    def close(self) -> None:
+        self.stream.flush()
+        if self._owns_stream:
+            self.stream.close()
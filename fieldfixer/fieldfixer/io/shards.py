@@ -0,0 +1,223 @@
+"""Bakes split by frame range into shards, and a virtual bundle over them.
+
+Each node of a multi-node bake writes an ordinary bake directory for its
+frame range (``fieldfixer bake --frames START:END``); its ``meta.json``
+records ``"shard": {"start", "end"}``. :func:`merge_shards` checks that the
+shards agree on frame size and tile size and cover the clip without overlaps,
+then writes a small index bake whose ``meta.json`` has ``"layout": "shards"``
+and the relative path and range of every shard. No sidecar is copied; only
+the scene LUT is placed next to the index.
+
+:meth:`SidecarBundle.load` on an index returns a :class:`ShardedBundle`,
+which maps each frame to its shard by bisection and opens shards on first
+use. Frames in an allowed gap fall back to identity, like missing frames of a
+single bake.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Sequence
+from urllib.parse import urljoin
+
+import numpy as np
+
+from fieldfixer.io.sidecar import SidecarBundle
+from fieldfixer.io.storage import is_remote
+
+SHARDS_LAYOUT = "shards"
+_LUT_NAME = "LUT/scene.cube"
+
+
+def parse_frame_range(text: str) -> tuple[int, int | None]:
+    """Parse ``START:END`` (end exclusive, may be empty for "to the end")."""
+
+    start_text, sep, end_text = text.partition(":")
+    try:
+        start = int(start_text) if start_text else 0
+        end = int(end_text) if end_text else None
+    except ValueError:
+        start, end = -1, None
+    if not sep or start < 0 or (end is not None and end <= start):
+        raise ValueError(f"Invalid frame range {text!r} (expected START:END, end exclusive)")
+    return start, end
+
+
+def shard_range(meta: dict) -> tuple[int, int]:
+    """``(start, end)`` frames a bake covers, end exclusive."""
+
+    shard = meta.get("shard")
+    if shard:
+        return int(shard["start"]), int(shard["end"])
+    if "frame_start" in meta and "frame_end" in meta:
+        return int(meta["frame_start"]), int(meta["frame_end"]) + 1
+    if "frames" in meta:
+        return 0, int(meta["frames"])
+    raise ValueError("Bake meta.json does not record which frames it covers")
+
+
+def _join(root: Path | str, path: str) -> Path | str:
+    if is_remote(root):
+        # Resolve ``..`` here: object stores take ``/bake/../s0`` literally.
+        return urljoin(str(root).rstrip("/") + "/", path)
+    return Path(root) / path
+
+
+@dataclass
+class ShardedBundle(SidecarBundle):
+    """One bundle over the shards listed in an index bake's ``meta.json``."""
+
+    starts: list[int] = field(default_factory=list, repr=False, compare=False)
+    ends: list[int] = field(default_factory=list, repr=False, compare=False)
+    paths: list[str] = field(default_factory=list, repr=False, compare=False)
+    _shards: dict[int, SidecarBundle] = field(default_factory=dict, repr=False, compare=False)
+    _open_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @classmethod
+    def from_index(cls, root: Path | str, meta: dict, store) -> "ShardedBundle":
+        shards = sorted(meta["shards"], key=lambda s: s["start"])
+        return cls(
+            root=root,
+            meta=meta,
+            store=store,
+            starts=[int(s["start"]) for s in shards],
+            ends=[int(s["end"]) for s in shards],
+            paths=[s["path"] for s in shards],
+        )
+
+    def _shard(self, idx: int) -> SidecarBundle | None:
+        i = bisect.bisect_right(self.starts, idx) - 1
+        if i < 0 or idx >= self.ends[i]:
+            return None
+        bundle = self._shards.get(i)
+        if bundle is None:
+            with self._open_lock:
+                bundle = self._shards.get(i)
+                if bundle is None:
+                    bundle = self._shards[i] = SidecarBundle.load(_join(self.root, self.paths[i]))
+        return bundle
+
+    def load_warp(self, idx: int, shape: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+        shard = self._shard(idx)
+        if shard is None:
+            zeros = self._constant("warp", shape, np.float16, 0)
+            return zeros, zeros
+        return shard.load_warp(idx, shape)
+
+    def load_mask(self, idx: int, shape: tuple[int, int]) -> np.ndarray:
+        shard = self._shard(idx)
+        if shard is None:
+            return self._constant("mask", shape, np.uint8, 255)
+        return shard.load_mask(idx, shape)
+
+    def load_tiles(self, idx: int) -> np.ndarray | None:
+        shard = self._shard(idx)
+        return shard.load_tiles(idx) if shard is not None else None
+
+    def load_curves(self, idx: int) -> dict:
+        shard = self._shard(idx)
+        if shard is None:
+            return {"exposure": 1.0, "gamma": 1.0}
+        return shard.load_curves(idx)
+
+    def close(self) -> None:
+        for shard in self._shards.values():
+            shard.close()
+        self._shards.clear()
+        self.store.close()
+
+
+def merge_shards(
+    shards: Sequence[str | os.PathLike],
+    out: str | os.PathLike,
+    frames: int | None = None,
+    allow_gaps: bool = False,
+) -> dict:
+    """Validate ``shards`` and write an index bake at ``out`` that opens them as one; returns its meta.
+
+    Raises ``ValueError`` when shards disagree on frame or tile size, overlap,
+    or (unless ``allow_gaps``) leave frames of ``[0, frames)`` uncovered.
+    """
+
+    if not shards:
+        raise ValueError("No shards to merge")
+    out = Path(out)
+    entries = []
+    for path in shards:
+        path = Path(path)
+        try:
+            meta = json.loads((path / "meta.json").read_text())
+        except FileNotFoundError as exc:
+            raise ValueError(f"{path} is not a bake (no meta.json)") from exc
+        if meta.get("layout") == SHARDS_LAYOUT:
+            raise ValueError(f"{path} is already a shard index")
+        start, end = shard_range(meta)
+        entries.append({"path": path, "start": start, "end": end, "meta": meta})
+    entries.sort(key=lambda e: e["start"])
+
+    first = entries[0]["meta"]
+    for key in ("width", "height", "tile_size"):
+        values = {e["meta"].get(key) for e in entries}
+        if len(values) > 1:
+            detail = ", ".join(f"{e['path']}={e['meta'].get(key)}" for e in entries)
+            raise ValueError(f"Shards disagree on {key}: {detail}")
+    if first.get("width") is None or first.get("height") is None:
+        raise ValueError("Shards do not record their frame size")
+
+    gaps: list[list[int]] = []
+    cursor = 0
+    for prev, entry in zip([None, *entries], entries):
+        if entry["start"] < cursor:
+            raise ValueError(f"{entry['path']} (frames {entry['start']}:{entry['end']}) overlaps {prev['path']}")
+        if entry["start"] > cursor:
+            gaps.append([cursor, entry["start"]])
+        cursor = entry["end"]
+    if frames is not None:
+        if cursor > frames:
+            raise ValueError(f"Shards cover frames up to {cursor}, but the clip has {frames}")
+        if cursor < frames:
+            gaps.append([cursor, frames])
+    if gaps and not allow_gaps:
+        raise ValueError("Shards leave frames uncovered: " + ", ".join(f"{a}:{b}" for a, b in gaps))
+
+    out.mkdir(parents=True, exist_ok=True)
+    luts = [e["path"] / _LUT_NAME for e in entries if (e["path"] / _LUT_NAME).exists()]
+    lut_mismatch = []
+    if luts:
+        # The runtime applies one scene LUT per bundle; use the first shard's.
+        (out / "LUT").mkdir(exist_ok=True)
+        shutil.copyfile(luts[0], out / _LUT_NAME)
+        reference = luts[0].read_bytes()
+        lut_mismatch = [str(p.parent.parent) for p in luts[1:] if p.read_bytes() != reference]
+
+    meta = {
+        "version": 1,
+        "layout": SHARDS_LAYOUT,
+        "mapping": first.get("mapping", "displacement"),
+        "width": first["width"],
+        "height": first["height"],
+        "tile_size": first.get("tile_size"),
+        "frame_start": entries[0]["start"],
+        "frame_end": entries[-1]["end"] - 1,
+        "frame_count": sum(e["end"] - e["start"] for e in entries),
+        "shards": [
+            {
+                "path": Path(os.path.relpath(os.path.abspath(e["path"]), os.path.abspath(out))).as_posix(),
+                "start": e["start"],
+                "end": e["end"],
+            }
+            for e in entries
+        ],
+    }
+    if gaps:
+        meta["gaps"] = gaps
+    if lut_mismatch:
+        meta["lut_mismatch"] = lut_mismatch
+    (out / "meta.json").write_text(json.dumps(meta, indent=2))
+    return meta
@@ -1,49 +1,258 @@
 from __future__ import annotations
 
+import hashlib
+import io
 import json
-from dataclasses import dataclass
+import posixpath
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import numpy as np
 
+from fieldfixer.io.manifest import MANIFEST_NAME, Manifest
+from fieldfixer.io.storage import LocalStore, open_store
+
+
+REFS_NAME = "refs.json"
+_EXT = {"W": "npz", "M": "png", "T": "npy"}
+
+
+def payload_digest(*arrays: np.ndarray) -> str:
+    """Content hash of one sidecar payload (dtype, shape and bytes of each array)."""
+
+    h = hashlib.blake2b(digest_size=16)
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        h.update(f"{arr.dtype.str}{arr.shape}".encode())
+        h.update(memoryview(arr).cast("B"))
+    return h.hexdigest()
+
+
+class SidecarWriter:
+    """Write per-frame warps, masks and tile activity maps, storing each distinct payload once.
+
+    The first frame with a given payload owns the file (``W/000000.npz`` etc.);
+    later identical frames only get an entry in ``refs.json``, which maps every
+    frame to its payload hash and every hash to its file.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        for kind in ("W", "M"):
+            (self.root / kind).mkdir(parents=True, exist_ok=True)
+        self.frames: dict[str, dict[str, str]] = {kind: {} for kind in _EXT}
+        self.objects: dict[str, dict[str, str]] = {kind: {} for kind in _EXT}
+
+    def _claim(self, kind: str, idx: int, digest: str) -> Path | None:
+        self.frames[kind][str(idx)] = digest
+        if digest in self.objects[kind]:
+            return None
+        name = f"{idx:06d}.{_EXT[kind]}"
+        self.objects[kind][digest] = name
+        return self.root / kind / name
+
+    def write_warp(self, idx: int, du: np.ndarray, dv: np.ndarray) -> None:
+        du = np.asarray(du, dtype=np.float16)
+        dv = np.asarray(dv, dtype=np.float16)
+        path = self._claim("W", idx, payload_digest(du, dv))
+        if path is not None:
+            np.savez_compressed(path, du=du, dv=dv)
+
+    def write_mask(self, idx: int, mask: np.ndarray) -> None:
+        mask = np.asarray(mask, dtype=np.uint8)
+        path = self._claim("M", idx, payload_digest(mask))
+        if path is not None:
+            import imageio.v3 as iio
+
+            iio.imwrite(path, mask)
+
+    def write_tiles(self, idx: int, active: np.ndarray) -> None:
+        """Store a tile activity map (see :func:`fieldfixer.ops.tiles.activity_map`)."""
+
+        active = np.asarray(active, dtype=np.uint8)
+        path = self._claim("T", idx, payload_digest(active))
+        if path is not None:
+            path.parent.mkdir(exist_ok=True)
+            np.save(path, active)
+
+    @property
+    def unique_payloads(self) -> dict[str, int]:
+        return {kind: len(objs) for kind, objs in self.objects.items()}
+
+    def close(self) -> None:
+        refs = {"version": 1, "frames": self.frames, "objects": self.objects}
+        (self.root / REFS_NAME).write_text(json.dumps(refs))
+
 
 @dataclass
 class SidecarBundle:
-    root: Path
+    root: Path | str
     meta: dict
+    store: object = field(default=None, repr=False, compare=False)
+    refs: dict | None = field(default=None, repr=False, compare=False)
+    manifest: Manifest | None = field(default=None, repr=False, compare=False)
+    cache_size: int = field(default=16, repr=False, compare=False)
+    _identity: dict = field(default_factory=dict, repr=False, compare=False)
+    _curves: dict | None = field(default=None, repr=False, compare=False)
+    _decoded: OrderedDict = field(default_factory=OrderedDict, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.store is None:
+            self.store = LocalStore(self.root)
 
     @classmethod
-    def load(cls, root: Path) -> "SidecarBundle":
-        root = Path(root)
-        meta_path = root / "meta.json"
-        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
-        return cls(root=root, meta=meta)
+    def load(cls, root: Path | str, store=None) -> "SidecarBundle":
+        """Open a bake from a local directory or an ``http(s)://`` base URL.
+
+        A shard index (see :mod:`fieldfixer.io.shards`) opens as a single
+        :class:`~fieldfixer.io.shards.ShardedBundle`.
+        """
+
+        if store is None:
+            store = open_store(root)
+        if isinstance(store, LocalStore):
+            root = Path(root)
+        raw = store.read("meta.json")
+        meta = json.loads(raw) if raw is not None else {}
+        if meta.get("layout") == "shards":
+            from fieldfixer.io.shards import ShardedBundle
+
+            return ShardedBundle.from_index(root, meta, store)
+        raw_refs = store.read(REFS_NAME)
+        refs = json.loads(raw_refs) if raw_refs is not None else None
+        # The manifest answers "is this file there" (curves, LUT, and every sidecar of a bake
+        # without refs) without probing the store, which costs a request per miss remotely.
+        local = isinstance(store, LocalStore)
+        raw_manifest = store.read(MANIFEST_NAME)
+        manifest = None
+        if raw_manifest is not None:
+            manifest = Manifest.from_json(json.loads(raw_manifest), root=root if local else None, offline=not local)
+            manifest.refresh()
+        elif refs is None and local:
+            manifest = Manifest(root)
+        return cls(root=root, meta=meta, store=store, refs=refs, manifest=manifest)
+
+    def has(self, name: str) -> bool | None:
+        """Whether the bake contains ``name`` per its manifest; ``None`` when the manifest cannot tell."""
+
+        directory = posixpath.dirname(name) or "."
+        if self.manifest is None or not self.manifest.covers(directory):
+            return None
+        return self.manifest.exists(name)
+
+    def _resolve(self, kind: str, idx: int) -> tuple[str | None, str | None]:
+        """Map a frame to ``(payload hash, file name)``; the name is ``None`` if absent."""
+
+        if self.refs is None:
+            name = f"{kind}/{idx:06d}.{_EXT[kind]}"
+            if self.manifest is not None and not self.manifest.exists(name):
+                return None, None
+            return None, name
+        digest = self.refs["frames"].get(kind, {}).get(str(idx))
+        if digest is None:
+            return None, None
+        return digest, f"{kind}/{self.refs['objects'][kind][digest]}"
+
+    def _read_ahead(self, idx: int) -> None:
+        if self.store.readahead:
+            names = []
+            for i in range(idx + 1, idx + 1 + self.store.readahead):
+                for kind in self._kinds():
+                    digest, name = self._resolve(kind, i)
+                    if name is not None and (digest is None or digest not in self._decoded):
+                        names.append(name)
+            self.store.prefetch(dict.fromkeys(names))
+
+    @property
+    def tile_size(self) -> int | None:
+        """Tile edge in pixels when the bake carries activity maps (``meta.json``)."""
+
+        return self.meta.get("tile_size")
+
+    def _kinds(self) -> tuple[str, ...]:
+        return ("W", "M", "T") if self.tile_size else ("W", "M")
+
+    def _payload(self, kind: str, idx: int, decode):
+        digest, name = self._resolve(kind, idx)
+        if digest is not None:
+            with self._lock:
+                cached = self._decoded.get(digest)
+                if cached is not None:
+                    self._decoded.move_to_end(digest)
+                    return cached
+        data = self.store.read(name) if name is not None else None
+        if data is None:
+            return None
+        value = decode(data)
+        if digest is not None:
+            # Shared between every frame that references this payload, so freeze it.
+            for arr in value if isinstance(value, tuple) else (value,):
+                arr.setflags(write=False)
+            with self._lock:
+                self._decoded[digest] = value
+                while len(self._decoded) > self.cache_size:
+                    self._decoded.popitem(last=False)
+        return value
 
     def load_warp(self, idx: int, shape: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
-        path = self.root / "W" / f"{idx:06d}.npz"
-        if not path.exists():
-            return (
-                np.zeros(shape, dtype=np.float16),
-                np.zeros(shape, dtype=np.float16),
-            )
-        with np.load(path) as z:
-            du = z["du"].astype(np.float32)
-            dv = z["dv"].astype(np.float32)
-        return du, dv
+        self._read_ahead(idx)
+        warp = self._payload("W", idx, _decode_warp)
+        if warp is None:
+            zeros = self._constant("warp", shape, np.float16, 0)
+            return zeros, zeros
+        return warp
 
     def load_mask(self, idx: int, shape: tuple[int, int]) -> np.ndarray:
-        path = self.root / "M" / f"{idx:06d}.png"
-        if not path.exists():
-            return np.full(shape, 255, dtype=np.uint8)
-        import imageio.v3 as iio
+        mask = self._payload("M", idx, _decode_mask)
+        if mask is None:
+            return self._constant("mask", shape, np.uint8, 255)
+        return mask
 
-        m = iio.imread(path)
-        return m if m.ndim == 2 else m[..., 0]
+    def load_tiles(self, idx: int) -> np.ndarray | None:
+        """Bool map of tiles that need warping/blending, or ``None`` to process the whole frame."""
+
+        if not self.tile_size:
+            return None
+        return self._payload("T", idx, _decode_tiles)
+
+    def _constant(self, kind: str, shape: tuple[int, int], dtype, value) -> np.ndarray:
+        # Fallback planes are shared read-only across frames instead of reallocated.
+        key = (kind, tuple(shape))
+        arr = self._identity.get(key)
+        if arr is None:
+            arr = np.full(shape, value, dtype=dtype)
+            arr.setflags(write=False)
+            self._identity[key] = arr
+        return arr
 
     def load_curves(self, idx: int) -> dict:
-        path = self.root / "curves.json"
-        if not path.exists():
+        if self._curves is None:
+            raw = self.store.read("curves.json") if self.has("curves.json") is not False else None
+            self._curves = json.loads(raw) if raw is not None else {}
+        data = self._curves
+        if not data:
             return {"exposure": 1.0, "gamma": 1.0}
-        data = json.loads(path.read_text())
         key = str(idx)
         return data.get(key, data.get("global", {"exposure": 1.0, "gamma": 1.0}))
+
+    def close(self) -> None:
+        self.store.close()
+
+
+def _decode_warp(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    with np.load(io.BytesIO(data)) as z:
+        return z["du"].astype(np.float32), z["dv"].astype(np.float32)
+
+
+def _decode_tiles(data: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(data)).astype(bool)
+
+
+def _decode_mask(data: bytes) -> np.ndarray:
+    import imageio.v3 as iio
+
+    m = iio.imread(data, extension=".png")
+    return m if m.ndim == 2 else np.ascontiguousarray(m[..., 0])
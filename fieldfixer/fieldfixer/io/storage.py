@@ -0,0 +1,313 @@
+"""Storage backends that serve bake files to :class:`SidecarBundle`.
+
+A store maps bake-relative names such as ``W/000012.npz`` to bytes. The local
+store reads a directory; the HTTP store fetches from an object-store/web
+endpoint with ranged GETs over pooled keep-alive connections, reads ahead on
+background threads and keeps a size-bounded on-disk cache. Remote bakes are
+treated as immutable: a cached file is never revalidated.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.client
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import quote, urlsplit
+
+_REMOTE_SCHEMES = ("http://", "https://")
+
+
+def is_remote(location: str | os.PathLike) -> bool:
+    return str(location).startswith(_REMOTE_SCHEMES)
+
+
+def default_cache_dir() -> Path:
+    env = os.environ.get("FIELDFIXER_CACHE")
+    if env:
+        return Path(env)
+    return Path.home() / ".cache" / "fieldfixer" / "sidecars"
+
+
+class LocalStore:
+    """Bake files in a local (or network-mounted) directory."""
+
+    readahead = 0
+
+    def __init__(self, root: str | os.PathLike) -> None:
+        self.root = Path(root)
+
+    def read(self, name: str) -> bytes | None:
+        try:
+            return (self.root / name).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def read_range(self, name: str, start: int, length: int) -> bytes | None:
+        try:
+            with open(self.root / name, "rb") as fh:
+                fh.seek(start)
+                return fh.read(length)
+        except FileNotFoundError:
+            return None
+
+    def stamp(self, name: str) -> object | None:
+        """Return a value that changes whenever ``name`` changes (``None`` if missing)."""
+
+        try:
+            return (self.root / name).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def url(self, name: str) -> str:
+        return str(self.root / name)
+
+    def prefetch(self, names: Iterable[str]) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+class DiskCache:
+    """Least-recently-used file cache bounded by total size in bytes."""
+
+    def __init__(self, root: str | os.PathLike, max_bytes: int) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._sizes = {p.name: p.stat().st_size for p in self.root.iterdir() if p.is_file() and ".tmp" not in p.name}
+        self._total = sum(self._sizes.values())
+
+    def _path(self, key: str) -> Path:
+        return self.root / hashlib.sha256(key.encode()).hexdigest()
+
+    @property
+    def nbytes(self) -> int:
+        return self._total
+
+    def __contains__(self, key: str) -> bool:
+        return self._path(key).name in self._sizes
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # mtime doubles as the LRU clock
+        except FileNotFoundError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.tmp{threading.get_ident()}")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += len(data) - self._sizes.get(path.name, 0)
+            self._sizes[path.name] = len(data)
+            if self._total > self.max_bytes:
+                self._evict(keep=path.name)
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        for name in self._sizes:
+            try:
+                entries.append(((self.root / name).stat().st_mtime_ns, name))
+            except FileNotFoundError:
+                entries.append((0, name))
+        for _, name in sorted(entries):
+            if self._total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            (self.root / name).unlink(missing_ok=True)
+            self._total -= self._sizes.pop(name)
+
+
+class HTTPStore:
+    """Bake files behind an HTTP(S) base URL.
+
+    Files are fetched with ``Range`` requests in ``block_size`` pieces; blocks
+    after the first are downloaded in parallel over up to ``connections``
+    pooled keep-alive connections. ``prefetch`` queues reads on background
+    threads so the next frames are local by the time the apply loop asks.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        cache_dir: str | os.PathLike | None = None,
+        cache_bytes: int = 10 << 30,
+        connections: int = 4,
+        block_size: int = 4 << 20,
+        readahead: int = 8,
+        timeout: float = 30.0,
+    ) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme in {base_url!r}")
+        self.base_url = base_url.rstrip("/") + "/"
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._prefix = parts.path.rstrip("/") + "/"
+        self.block_size = int(block_size)
+        self.readahead = int(readahead)
+        self.timeout = timeout
+        self.cache = DiskCache(cache_dir, cache_bytes) if cache_dir is not None else None
+
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(connections)
+        self._ranges = ThreadPoolExecutor(max_workers=connections, thread_name_prefix="ffx-range")
+        self._readers = ThreadPoolExecutor(max_workers=max(1, connections // 2), thread_name_prefix="ffx-prefetch")
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    # -- connection pool -------------------------------------------------
+
+    def _checkout(self) -> http.client.HTTPConnection:
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+            with self._lock:
+                self.connections_opened += 1
+            return cls(self._netloc, timeout=self.timeout)
+
+    def _checkin(self, conn: http.client.HTTPConnection, reusable: bool) -> None:
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def _request(self, method: str, name: str, headers: dict[str, str] | None = None):
+        path = self._prefix + quote(name)
+        for attempt in range(2):
+            conn = self._checkout()
+            try:
+                conn.request(method, path, headers=headers or {})
+                resp = conn.getresponse()
+                body = resp.read()
+            except (http.client.HTTPException, OSError):
+                # A pooled connection the server already closed fails on first use; retry once fresh.
+                self._checkin(conn, reusable=False)
+                if attempt:
+                    raise
+                continue
+            with self._lock:
+                self.requests += 1
+            self._checkin(conn, reusable=not resp.will_close)
+            return resp.status, resp.headers, body
+        raise AssertionError("unreachable")
+
+    # -- reads -----------------------------------------------------------
+
+    def url(self, name: str) -> str:
+        return self.base_url + name
+
+    def stamp(self, name: str) -> object | None:
+        status, headers, _ = self._request("HEAD", name)
+        if status == 404:
+            return None
+        if status >= 400:
+            raise OSError(f"HTTP {status} for {self.url(name)}")
+        return headers.get("ETag") or headers.get("Last-Modified") or headers.get("Content-Length")
+
+    def read_range(self, name: str, start: int, length: int) -> bytes | None:
+        status, _, body = self._request("GET", name, {"Range": f"bytes={start}-{start + length - 1}"})
+        if status == 404:
+            return None
+        if status == 206:
+            return body
+        if status == 200:
+            return body[start : start + length]
+        if status == 416:
+            return b""
+        raise OSError(f"HTTP {status} for {self.url(name)}")
+
+    def _fetch(self, name: str) -> bytes | None:
+        status, headers, body = self._request("GET", name, {"Range": f"bytes=0-{self.block_size - 1}"})
+        if status == 404:
+            return None
+        if status == 416:
+            return b""
+        if status == 200:  # server ignored the range
+            return body
+        if status != 206:
+            raise OSError(f"HTTP {status} for {self.url(name)}")
+        total = int(headers["Content-Range"].rsplit("/", 1)[1])
+        if len(body) >= total:
+            return body
+        starts = range(len(body), total, self.block_size)
+        parts = self._ranges.map(lambda s: self.read_range(name, s, min(self.block_size, total - s)), starts)
+        return b"".join([body, *parts])
+
+    def _fetch_cached(self, name: str) -> bytes | None:
+        data = self._fetch(name)
+        if data is not None and self.cache is not None:
+            self.cache.put(self.url(name), data)
+        return data
+
+    def read(self, name: str) -> bytes | None:
+        with self._lock:
+            pending = self._inflight.pop(name, None)
+        if pending is not None:
+            return pending.result()
+        if self.cache is not None:
+            data = self.cache.get(self.url(name))
+            if data is not None:
+                return data
+        return self._fetch_cached(name)
+
+    def prefetch(self, names: Iterable[str]) -> None:
+        for name in names:
+            if self.cache is not None and self.url(name) in self.cache:
+                continue
+            with self._lock:
+                if name in self._inflight:
+                    continue
+                if len(self._inflight) > 4 * max(self.readahead, 1):
+                    # Drop finished reads nobody asked for (e.g. past the last frame).
+                    self._inflight = {k: f for k, f in self._inflight.items() if not f.done()}
+                self._inflight[name] = self._readers.submit(self._fetch_cached, name)
+
+    def close(self) -> None:
+        self._readers.shutdown(wait=True, cancel_futures=True)
+        self._ranges.shutdown(wait=True)
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def open_store(
+    location: str | os.PathLike,
+    cache_dir: str | os.PathLike | None = None,
+    cache_bytes: int | None = None,
+) -> LocalStore | HTTPStore:
+    """Pick a backend for ``location``: an ``http(s)://`` URL or a local path.
+
+    Remote stores cache under ``FIELDFIXER_CACHE`` (default ``~/.cache``),
+    bounded by ``FIELDFIXER_CACHE_GB`` (default 10).
+    """
+
+    if is_remote(location):
+        if cache_bytes is None:
+            cache_bytes = int(float(os.environ.get("FIELDFIXER_CACHE_GB", "10")) * (1 << 30))
+        return HTTPStore(str(location), cache_dir=cache_dir or default_cache_dir(), cache_bytes=cache_bytes)
+    return LocalStore(location)
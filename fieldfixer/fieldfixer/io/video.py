@@ -1,42 +1,250 @@
 from __future__ import annotations
 
+import io
+import queue
+import threading
 from dataclasses import dataclass
+from typing import Callable, Iterator
 
 import av
 import numpy as np
 from fractions import Fraction
 
+from fieldfixer.buffers import FramePool
+
+PASSTHROUGH_TYPES = ("audio", "subtitle", "data")
+
+
+def passthrough_streams(container) -> list:
+    """Streams of ``container`` that are copied packet by packet next to the processed video."""
+
+    return [s for s in container.streams if s.type in PASSTHROUGH_TYPES]
+
+
+def muxable(format_name: str, stream) -> bool:
+    """Whether ``stream`` can be copied into a ``format_name`` container (checked on a scratch muxer)."""
+
+    try:
+        with av.open(io.BytesIO(), mode="w", format=format_name) as probe:
+            probe.add_stream_from_template(stream)
+            probe.start_encoding()
+        return True
+    except (av.FFmpegError, ValueError, NotImplementedError):
+        return False
+
 
 @dataclass
 class VideoReader:
+    """Decode a video to RGB24 frames.
+
+    ``threads``/``thread_type`` configure the decoder's frame/slice threading
+    (``threads=0`` lets FFmpeg pick). With ``readahead > 0`` a background
+    thread decodes up to that many frames ahead of the consumer. With a
+    ``pool`` frames are converted into a ring of reused buffers instead of a
+    new array per frame; a yielded frame then stays valid until the consumer
+    asks for the next one.
+
+    With ``passthrough`` every stream is demuxed in the same pass. Packets of
+    :attr:`passthrough` streams (audio, subtitles, data) are handed to
+    ``on_packet`` on the consumer's thread, just before the video frame they
+    preceded in the file, and :attr:`pts` holds the timestamp of the frame
+    last yielded (see :meth:`VideoWriter.follow`).
+    """
+
     path: str | bytes
+    threads: int = 0
+    thread_type: str = "AUTO"
+    readahead: int = 0
+    pool: FramePool | None = None
+    passthrough: bool = False
 
     def __post_init__(self) -> None:
         self.container = av.open(self.path)
         self.stream = next(s for s in self.container.streams if s.type == "video")
+        # Must be set before the first packet is decoded (the codec opens lazily).
+        self.stream.codec_context.thread_type = self.thread_type
+        self.stream.codec_context.thread_count = self.threads
         self.width = self.stream.codec_context.width
         self.height = self.stream.codec_context.height
         self.fps = float(self.stream.average_rate) if self.stream.average_rate else 30.0
         self.nframes = self.stream.frames if self.stream.frames > 0 else None
+        self._skip_to: int | None = None
+        self._active = None
+        self.passthrough_streams = passthrough_streams(self.container) if self.passthrough else []
+        self.on_packet: Callable[[av.Packet], None] | None = None
+        self.pts: int | None = None
+        self._side: list[av.Packet] = []
+
+    def _frame_index(self, frame: av.VideoFrame) -> int:
+        start = self.stream.start_time or 0
+        return round(float((frame.pts - start) * self.stream.time_base) * self.fps)
+
+    def seek(self, idx: int) -> None:
+        """Position the reader so the next iteration starts at frame ``idx``.
+
+        Seeks to the nearest keyframe at or before ``idx`` and decodes forward,
+        dropping frames before it. Assumes a constant frame rate.
+        """
+
+        self._stop()
+        start = self.stream.start_time or 0
+        target = start + int(Fraction(idx) / Fraction(self.fps).limit_denominator(1001) / self.stream.time_base)
+        self.container.seek(target, stream=self.stream, backward=True, any_frame=False)
+        self._skip_to = idx
+
+    def _demuxed(self) -> Iterator[av.VideoFrame]:
+        if not self.passthrough_streams:
+            yield from self.container.decode(self.stream)
+            return
+        wanted = {s.index for s in self.passthrough_streams}
+        for packet in self.container.demux([self.stream, *self.passthrough_streams]):
+            if packet.stream.index == self.stream.index:
+                yield from packet.decode()
+            elif packet.stream.index in wanted and packet.dts is not None:
+                self._side.append(packet)
+
+    def _decoded(self) -> Iterator[av.VideoFrame]:
+        skip, self._skip_to = self._skip_to, None
+        for frame in self._demuxed():
+            if skip is not None:
+                if frame.pts is not None and self._frame_index(frame) < skip:
+                    self._side.clear()  # belongs to the part of the clip being skipped
+                    continue
+                skip = None
+            yield frame
+
+    @staticmethod
+    def to_rgb(frame: av.VideoFrame, out: np.ndarray | None = None) -> np.ndarray:
+        """Convert a decoded frame to (H, W, 3) uint8 RGB, into ``out`` when given."""
+
+        if out is None:
+            return frame.to_ndarray(format="rgb24")
+        rgb = frame.reformat(format="rgb24")
+        plane = rgb.planes[0]
+        h, w = rgb.height, rgb.width
+        if out.shape != (h, w, 3) or out.dtype != np.uint8:
+            raise ValueError(f"Frame is {(h, w, 3)} uint8, buffer is {out.shape} {out.dtype}")
+        # Rows may be padded to ``line_size``; copy only the visible bytes.
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(h, plane.line_size)
+        np.copyto(out.reshape(h, w * 3), rows[:, : w * 3])
+        return out
+
+    def frames_into(self, out: np.ndarray) -> Iterator[np.ndarray]:
+        """Decode every frame into the caller's ``out`` buffer, yielding it each time."""
+
+        for frame in self._decoded():
+            yield self.to_rgb(frame, out)
+
+    def _take_side(self) -> list[av.Packet]:
+        side, self._side = self._side, []
+        return side
+
+    def _converted(self, ring: int) -> Iterator[tuple[np.ndarray | None, int | None, list[av.Packet]]]:
+        # Runs on the decode thread; packets and pts travel with their frame to the consumer.
+        for i, frame in enumerate(self._decoded()):
+            buf = None
+            if self.pool is not None:
+                buf = self.pool.get(f"decode.{i % ring}", (frame.height, frame.width, 3), np.uint8)
+            yield self.to_rgb(frame, buf), frame.pts, self._take_side()
+        yield None, None, self._take_side()  # packets after the last frame
 
-    def __iter__(self):
-        for frame in self.container.decode(self.stream):
-            yield frame.to_ndarray(format="rgb24")
+    def _deliver(self, items: Iterator) -> Iterator[np.ndarray]:
+        for rgb, pts, side in items:
+            if self.on_packet is not None:
+                for packet in side:
+                    self.on_packet(packet)
+            if rgb is None:
+                return
+            self.pts = pts
+            yield rgb
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        self._stop()
+        if self.readahead <= 0:
+            return self._deliver(self._converted(ring=2))
+        # The producer may fill ``readahead`` queued slots plus one in progress
+        # while the consumer still holds one, hence ``readahead + 2`` buffers.
+        it = _ReadAhead(self._converted(ring=self.readahead + 2), self.readahead)
+        self._active = it
+        return self._deliver(it)
+
+    def _stop(self) -> None:
+        if self._active is not None:
+            self._active.close()
+            self._active = None
 
     def close(self) -> None:
-        """Close the underlying container."""
+        """Stop any read-ahead thread and close the underlying container."""
 
+        self._stop()
         self.container.close()
 
 
+class _ReadAhead:
+    """Run an iterator on a background thread, buffering up to ``depth`` items."""
+
+    _DONE = object()
+
+    def __init__(self, source: Iterator, depth: int) -> None:
+        self._source = source
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._stopping = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._produce, name="ffx-decode", daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stopping.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self) -> None:
+        try:
+            for item in self._source:
+                if not self._put(item):
+                    return
+        except BaseException as exc:  # noqa: BLE001 - re-raised in the consumer
+            self._put(exc)
+            return
+        self._put(self._DONE)
+
+    def __iter__(self) -> "_ReadAhead":
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        item = self._queue.get()
+        if item is self._DONE:
+            self._finished = True
+            raise StopIteration
+        if isinstance(item, BaseException):
+            self._finished = True
+            raise item
+        return item
+
+    def close(self) -> None:
+        self._stopping.set()
+        self._finished = True
+        self._thread.join()
+        self._source.close()
+
+
 @dataclass
 class VideoWriter:
+    """Encode RGB frames to H.264, optionally copying a reader's other streams (see :meth:`follow`)."""
+
     path: str
     width: int
     height: int
     fps: float
     codec: str = "libx264"
     crf: int = 18
+    threads: int = 0
 
     def __post_init__(self) -> None:
         self.container = av.open(self.path, mode="w")
@@ -46,9 +254,63 @@ class VideoWriter:
         self.stream.height = self.height
         self.stream.pix_fmt = "yuv420p"
         self.stream.options = {"crf": str(self.crf)}
+        # 0 lets the encoder pick a thread count for the host.
+        self.stream.codec_context.thread_type = "AUTO"
+        self.stream.codec_context.thread_count = self.threads
+        self.copied: dict[int, av.stream.Stream] = {}
+        self._source: VideoReader | None = None
+        self._last_pts: int | None = None
+
+    def follow(self, reader: VideoReader) -> list:
+        """Copy ``reader``'s passthrough streams into this file and keep its video timestamps.
+
+        Must be called before the first :meth:`write`. Packets are muxed as
+        the reader delivers them, so no second pass over the file is needed.
+        Returns the streams the output container cannot hold (not copied).
+        """
+
+        skipped = []
+        for stream in reader.passthrough_streams:
+            if muxable(self.container.format.name, stream):
+                self.copied[stream.index] = self.container.add_stream_from_template(stream)
+            else:
+                skipped.append(stream)
+        self.stream.codec_context.time_base = reader.stream.time_base
+        self.stream.time_base = reader.stream.time_base
+        self._source = reader
+        reader.on_packet = self.mux_packet
+        return skipped
+
+    def mux_packet(self, packet: av.Packet) -> None:
+        out = self.copied.get(packet.stream.index)
+        if out is not None:
+            packet.stream = out
+            self.container.mux(packet)
+
+    @property
+    def following(self) -> bool:
+        """Whether frames are stamped with a followed reader's timestamps (see :meth:`write`)."""
+
+        return self._source is not None
+
+    def write(self, rgb: np.ndarray, pts: int | None = None) -> None:
+        """Encode one frame.
+
+        When :attr:`following` a reader, the frame takes ``pts`` or, if that is
+        ``None``, the timestamp of the frame the reader yielded last; callers
+        that read ahead of writing pass each frame's own ``pts``.
+        """
 
-    def write(self, rgb: np.ndarray) -> None:
         frame = av.VideoFrame.from_ndarray(rgb, format="rgb24")
+        if self._source is not None:
+            # Source timestamps keep copied audio/subtitles in sync, also for VFR input.
+            tb = self._source.stream.time_base
+            if pts is None:
+                pts = self._source.pts
+            if self._last_pts is not None and (pts is None or pts <= self._last_pts):
+                pts = self._last_pts + max(1, round(1 / (self.fps * tb)))  # missing or repeated stamp
+            frame.pts = self._last_pts = pts if pts is not None else 0
+            frame.time_base = tb
         for packet in self.stream.encode(frame):
             self.container.mux(packet)
 
@@ -1,3 +1,3 @@
 """Image operations for FieldFixer."""
 
-__all__ = ["warp", "mask", "lut3d", "exposure"]
+__all__ = ["warp", "mask", "lut3d", "exposure", "kernels"]
@@ -1,17 +1,85 @@
 from __future__ import annotations
 
+from itertools import groupby
+from typing import Sequence
+
 import numpy as np
 
 
-def apply_curves(img: np.ndarray, curves: dict) -> np.ndarray:
-    """Apply exposure, gamma, and white-balance adjustments."""
+def _curve_table(exposure: float, gamma: float, wb: np.ndarray) -> np.ndarray:
+    # Same float32 arithmetic as the per-pixel path, evaluated once per code value.
+    arr = (np.arange(256, dtype=np.float32) / 255.0)[:, None]
+    arr = np.clip(arr * wb[None, :], 0, 10)
+    arr = np.clip(arr * exposure, 0, 10)
+    arr = arr ** (1.0 / max(gamma, 1e-6))
+    return np.clip(arr * 255.0, 0, 255).astype(np.uint8)
+
+
+def _curve_params(curves: dict) -> tuple[float, float, tuple[float, ...]]:
+    return (
+        float(curves.get("exposure", 1.0)),
+        float(curves.get("gamma", 1.0)),
+        tuple(float(v) for v in curves.get("white_balance", [1.0, 1.0, 1.0])),
+    )
+
+
+def _apply_table(img: np.ndarray, table: np.ndarray, out: np.ndarray) -> np.ndarray:
+    for ch in range(img.shape[-1]):
+        np.take(table[:, ch], img[..., ch], out=out[..., ch], mode="clip")
+    return out
+
 
-    exposure = float(curves.get("exposure", 1.0))
-    gamma = float(curves.get("gamma", 1.0))
-    wb = np.array(curves.get("white_balance", [1.0, 1.0, 1.0]), dtype=np.float32)
+def apply_curves(img: np.ndarray, curves: dict, out: np.ndarray | None = None) -> np.ndarray:
+    """Apply exposure, gamma, and white-balance adjustments.
+
+    uint8 frames go through a 256-entry table per channel, so ``out`` may alias
+    ``img`` and no frame-sized temporaries are created.
+    """
+
+    exposure, gamma, wb = _curve_params(curves)
+    wb = np.array(wb, dtype=np.float32)
+
+    if img.dtype == np.uint8:
+        if out is None:
+            out = np.empty(img.shape, dtype=np.uint8)
+        return _apply_table(img, _curve_table(exposure, gamma, wb), out)
 
     arr = img.astype(np.float32) / 255.0
     arr = np.clip(arr * wb[None, None, :], 0, 10)
     arr = np.clip(arr * exposure, 0, 10)
     arr = arr ** (1.0 / max(gamma, 1e-6))
-    return np.clip(arr * 255.0, 0, 255).astype(np.uint8)
+    result = np.clip(arr * 255.0, 0, 255).astype(np.uint8)
+    if out is None:
+        return result
+    np.copyto(out, result)
+    return out
+
+
+def apply_curves_batch(imgs: np.ndarray, curves: Sequence[dict], out: np.ndarray | None = None) -> np.ndarray:
+    """Apply per-frame curves to an ``(N, H, W, 3)`` stack; ``curves[i]`` belongs to frame ``i``.
+
+    uint8 stacks build one table per distinct parameter set, and each run of
+    consecutive frames sharing a table is mapped with one lookup per channel.
+    ``out`` may alias ``imgs``.
+    """
+
+    if imgs.ndim != 4 or len(curves) != imgs.shape[0]:
+        raise ValueError(f"Expected an (N, H, W, 3) stack and N curve sets, got {imgs.shape} and {len(curves)}")
+    if out is None:
+        out = np.empty(imgs.shape, dtype=np.uint8)
+    if imgs.dtype != np.uint8:
+        for i, params in enumerate(curves):
+            apply_curves(imgs[i], params, out=out[i])
+        return out
+
+    tables: dict[tuple, np.ndarray] = {}
+    start = 0
+    for params, run in groupby(_curve_params(c) for c in curves):
+        stop = start + sum(1 for _ in run)
+        table = tables.get(params)
+        if table is None:
+            exposure, gamma, wb = params
+            table = tables[params] = _curve_table(exposure, gamma, np.array(wb, dtype=np.float32))
+        _apply_table(imgs[start:stop], table, out[start:stop])
+        start = stop
+    return out
@@ -0,0 +1,88 @@
+"""Numba kernels, imported only when a NumPy/Numba code path needs them."""
+
+from __future__ import annotations
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def _bilinear_sample_at(
+    img: np.ndarray, du: np.ndarray, dv: np.ndarray, out: np.ndarray, oy: int, ox: int
+) -> np.ndarray:  # pragma: no cover - numba compiled
+    """Sample ``img`` for the window of ``out`` whose top-left pixel is ``(oy, ox)``."""
+
+    h, w, c = img.shape
+    for y in range(out.shape[0]):
+        for x in range(out.shape[1]):
+            xf = x + ox + du[y, x]
+            yf = y + oy + dv[y, x]
+            x0 = int(np.floor(xf))
+            x1 = x0 + 1
+            y0 = int(np.floor(yf))
+            y1 = y0 + 1
+            dx = xf - x0
+            dy = yf - y0
+            x0 = 0 if x0 < 0 else (w - 1 if x0 >= w else x0)
+            x1 = 0 if x1 < 0 else (w - 1 if x1 >= w else x1)
+            y0 = 0 if y0 < 0 else (h - 1 if y0 >= h else y0)
+            y1 = 0 if y1 < 0 else (h - 1 if y1 >= h else y1)
+            for ch in range(c):
+                v00 = img[y0, x0, ch]
+                v01 = img[y0, x1, ch]
+                v10 = img[y1, x0, ch]
+                v11 = img[y1, x1, ch]
+                out[y, x, ch] = (
+                    (1 - dx) * (1 - dy) * v00
+                    + dx * (1 - dy) * v01
+                    + (1 - dx) * dy * v10
+                    + dx * dy * v11
+                )
+    return out
+
+
+@njit(cache=True, fastmath=True)
+def _bilinear_sample(img: np.ndarray, du: np.ndarray, dv: np.ndarray, out: np.ndarray) -> np.ndarray:  # pragma: no cover - numba compiled
+    return _bilinear_sample_at(img, du, dv, out, 0, 0)
+
+
+@njit(cache=True, fastmath=True)
+def _bilinear_sample_batch(
+    imgs: np.ndarray, du: np.ndarray, dv: np.ndarray, out: np.ndarray
+) -> np.ndarray:  # pragma: no cover - numba compiled
+    """Sample every frame of an ``(N, H, W, C)`` stack with its own displacement."""
+
+    for i in range(imgs.shape[0]):
+        _bilinear_sample_at(imgs[i], du[i], dv[i], out[i], 0, 0)
+    return out
+
+
+def _warmup_cases():
+    img = np.zeros((4, 4, 3), dtype=np.uint8)
+    disp = np.zeros((4, 4), dtype=np.float32)
+    frozen = disp.copy()
+    frozen.setflags(write=False)
+    out = np.empty_like(img)
+    # C-contiguous arrays from decoders/sidecars, strided views (crops, stacks)
+    # and read-only maps shared from caches or memory maps.
+    yield _bilinear_sample, (img, disp, disp, out)
+    yield _bilinear_sample, (img[:, ::2], disp[:, ::2], disp[:, ::2], out[:, ::2])
+    yield _bilinear_sample, (img, frozen, frozen, out)
+    # Tile windows: strided sub-views of the maps and output.
+    yield _bilinear_sample_at, (img, disp[1:3, 1:3], disp[1:3, 1:3], out[1:3, 1:3], 1, 1)
+    yield _bilinear_sample_at, (img, frozen[1:3, 1:3], frozen[1:3, 1:3], out[1:3, 1:3], 1, 1)
+    # Frame stacks from the batched apply loop.
+    stack = np.zeros((2, 4, 4, 3), dtype=np.uint8)
+    disps = np.zeros((2, 4, 4), dtype=np.float32)
+    yield _bilinear_sample_batch, (stack, disps, disps, np.empty_like(stack))
+
+
+def warmup() -> list[str]:
+    """Compile every kernel for the supported dtypes/layouts and populate the on-disk cache.
+
+    Returns the compiled signatures so callers can report what was built.
+    """
+
+    for kernel, args in _warmup_cases():
+        kernel(*args)
+    return [str(sig) for kernel in (_bilinear_sample, _bilinear_sample_at, _bilinear_sample_batch) for sig in kernel.signatures]
@@ -4,11 +4,19 @@ from pathlib import Path
 
 import numpy as np
 
+from fieldfixer.buffers import FramePool, scratch
+
 
 def load_cube_lut(path: Path) -> dict:
     """Load a .cube LUT file into a lookup table dictionary."""
 
-    txt = Path(path).read_text().splitlines()
+    return parse_cube_lut(Path(path).read_text())
+
+
+def parse_cube_lut(text: str) -> dict:
+    """Parse the text of a .cube LUT into a lookup table dictionary."""
+
+    txt = text.splitlines()
     size: int | None = None
     table: list[list[float]] = []
     for line in txt:
@@ -26,42 +34,82 @@ def load_cube_lut(path: Path) -> dict:
     return {"size": size, "table": arr}
 
 
-def apply_lut(img: np.ndarray, lut: dict) -> np.ndarray:
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # a + (b - a) * t, accumulated into ``a``; ``b`` is clobbered.
+    np.subtract(b, a, out=b)
+    np.multiply(b, t, out=b)
+    np.add(a, b, out=a)
+    return a
+
+
+def apply_lut(
+    img: np.ndarray,
+    lut: dict,
+    out: np.ndarray | None = None,
+    pool: FramePool | None = None,
+) -> np.ndarray:
+    """Trilinearly sample ``lut`` at every pixel.
+
+    Every intermediate lives in ``pool`` buffers when one is given; ``out`` may
+    alias ``img`` because all lattice indices are computed before writing.
+    """
+
     size = lut["size"]
-    table = lut["table"]
-    rgb = img.astype(np.float32) / 255.0
-    coords = rgb * (size - 1)
-
-    x0 = np.floor(coords[..., 0]).astype(np.int32)
-    y0 = np.floor(coords[..., 1]).astype(np.int32)
-    z0 = np.floor(coords[..., 2]).astype(np.int32)
-    dx = coords[..., 0] - x0
-    dy = coords[..., 1] - y0
-    dz = coords[..., 2] - z0
-
-    x1 = np.clip(x0 + 1, 0, size - 1)
-    y1 = np.clip(y0 + 1, 0, size - 1)
-    z1 = np.clip(z0 + 1, 0, size - 1)
-
-    def sample(ix, iy, iz):  # noqa: ANN001 - helper for readability
-        return table[ix, iy, iz]
-
-    c000 = sample(x0, y0, z0)
-    c100 = sample(x1, y0, z0)
-    c010 = sample(x0, y1, z0)
-    c110 = sample(x1, y1, z0)
-    c001 = sample(x0, y0, z1)
-    c101 = sample(x1, y0, z1)
-    c011 = sample(x0, y1, z1)
-    c111 = sample(x1, y1, z1)
-
-    c00 = c000 * (1 - dx)[..., None] + c100 * dx[..., None]
-    c01 = c001 * (1 - dx)[..., None] + c101 * dx[..., None]
-    c10 = c010 * (1 - dx)[..., None] + c110 * dx[..., None]
-    c11 = c011 * (1 - dx)[..., None] + c111 * dx[..., None]
-
-    c0 = c00 * (1 - dy)[..., None] + c10 * dy[..., None]
-    c1 = c01 * (1 - dy)[..., None] + c11 * dy[..., None]
-
-    out = c0 * (1 - dz)[..., None] + c1 * dz[..., None]
-    return np.clip(out * 255.0, 0, 255).astype(np.uint8)
+    flat = lut["table"].reshape(-1, 3)
+    shape = img.shape
+    plane = shape[:-1]
+
+    frac = scratch(pool, "lut.frac", shape)
+    lo = scratch(pool, "lut.lo", shape, np.int32)
+    hi = scratch(pool, "lut.hi", shape, np.int32)
+    idx = scratch(pool, "lut.idx", plane, np.int32)
+    a, b, c, d = (scratch(pool, f"lut.c{n}", shape) for n in range(4))
+
+    np.divide(img, np.float32(255.0), out=frac)
+    np.multiply(frac, np.float32(size - 1), out=frac)
+    np.copyto(lo, frac, casting="unsafe")  # floor: coordinates are non-negative
+    np.subtract(frac, lo, out=frac, casting="unsafe")
+    np.add(lo, 1, out=hi)
+    np.minimum(hi, size - 1, out=hi)
+
+    # Pre-scale lattice coordinates so a corner's flat index is a sum of three planes.
+    strides = np.array([size * size, size, 1], dtype=np.int32)
+    np.multiply(lo, strides, out=lo)
+    np.multiply(hi, strides, out=hi)
+
+    def corner(ix: np.ndarray, iy: np.ndarray, iz: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        np.add(ix[..., 0], iy[..., 1], out=idx)
+        np.add(idx, iz[..., 2], out=idx)
+        return np.take(flat, idx, axis=0, out=dst, mode="clip")
+
+    dx = frac[..., 0:1]
+    dy = frac[..., 1:2]
+    dz = frac[..., 2:3]
+
+    c00 = _lerp(corner(lo, lo, lo, a), corner(hi, lo, lo, b), dx)
+    c10 = _lerp(corner(lo, hi, lo, c), corner(hi, hi, lo, d), dx)
+    c0 = _lerp(c00, c10, dy)
+    c01 = _lerp(corner(lo, lo, hi, c), corner(hi, lo, hi, d), dx)
+    c11 = _lerp(corner(lo, hi, hi, b), corner(hi, hi, hi, d), dx)
+    c1 = _lerp(c01, c11, dy)
+    res = _lerp(c0, c1, dz)
+
+    np.multiply(res, np.float32(255.0), out=res)
+    np.clip(res, 0, 255, out=res)
+    if out is None:
+        out = np.empty(shape, dtype=np.uint8)
+    np.copyto(out, res, casting="unsafe")
+    return out
+
+
+def apply_lut_batch(
+    imgs: np.ndarray,
+    lut: dict,
+    out: np.ndarray | None = None,
+    pool: FramePool | None = None,
+) -> np.ndarray:
+    """Apply ``lut`` to an ``(N, H, W, 3)`` stack in one pass (see :func:`apply_lut`)."""
+
+    if imgs.ndim != 4:
+        raise ValueError(f"Expected an (N, H, W, 3) stack, got shape {imgs.shape}")
+    return apply_lut(imgs, lut, out=out, pool=pool)
@@ -2,10 +2,52 @@ from __future__ import annotations
 
 import numpy as np
 
+from fieldfixer.buffers import FramePool, scratch
 
-def composite_with_mask(fg: np.ndarray, bg: np.ndarray, mask: np.ndarray) -> np.ndarray:
-    """Blend foreground/background frames using a uint8 mask."""
 
-    alpha = (mask.astype(np.float32) / 255.0)[..., None]
-    out = fg.astype(np.float32) * alpha + bg.astype(np.float32) * (1.0 - alpha)
-    return np.clip(out, 0, 255).astype(np.uint8)
+def composite_with_mask(
+    fg: np.ndarray,
+    bg: np.ndarray,
+    mask: np.ndarray,
+    out: np.ndarray | None = None,
+    pool: FramePool | None = None,
+) -> np.ndarray:
+    """Blend foreground/background frames using a uint8 mask.
+
+    ``out`` may alias ``fg`` or ``bg``; ``pool`` supplies the float scratch.
+    """
+
+    alpha = scratch(pool, "mask.alpha", mask.shape + (1,))
+    inv = scratch(pool, "mask.inv", mask.shape + (1,))
+    acc = scratch(pool, "mask.acc", fg.shape)
+    tmp = scratch(pool, "mask.tmp", fg.shape)
+
+    np.divide(mask[..., None], np.float32(255.0), out=alpha)
+    np.subtract(np.float32(1.0), alpha, out=inv)
+    np.multiply(fg, alpha, out=acc)
+    np.multiply(bg, inv, out=tmp)
+    np.add(acc, tmp, out=acc)
+    np.clip(acc, 0, 255, out=acc)
+
+    if out is None:
+        out = np.empty(fg.shape, dtype=np.uint8)
+    np.copyto(out, acc, casting="unsafe")
+    return out
+
+
+def composite_with_mask_batch(
+    fg: np.ndarray,
+    bg: np.ndarray,
+    masks: np.ndarray,
+    out: np.ndarray | None = None,
+    pool: FramePool | None = None,
+) -> np.ndarray:
+    """Blend ``(N, H, W, C)`` stacks using an ``(N, H, W)`` mask stack.
+
+    The blend is elementwise, so the whole stack goes through
+    :func:`composite_with_mask` in one pass instead of one call per frame.
+    """
+
+    if masks.ndim != 3 or fg.shape != bg.shape or fg.shape[:3] != masks.shape:
+        raise ValueError(f"Mask stack {masks.shape} does not match frames {fg.shape}/{bg.shape}")
+    return composite_with_mask(fg, bg, masks, out=out, pool=pool)
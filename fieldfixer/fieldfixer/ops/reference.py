@@ -0,0 +1,69 @@
+"""Float64 reference implementations of the runtime ops.
+
+These follow the op definitions as directly as possible and return unrounded
+float64 images. They are slow and only meant as ground truth for
+:mod:`fieldfixer.equivalence`, never for production paths.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def displacement(img: np.ndarray, du: np.ndarray, dv: np.ndarray) -> np.ndarray:
+    """Bilinear sample of ``img`` at ``(x + du, y + dv)`` with replicated borders."""
+
+    h, w = img.shape[:2]
+    ys, xs = np.mgrid[0:h, 0:w].astype(np.float64)
+    xf = xs + du.astype(np.float64)
+    yf = ys + dv.astype(np.float64)
+    x0 = np.floor(xf)
+    y0 = np.floor(yf)
+    fx = (xf - x0)[..., None]
+    fy = (yf - y0)[..., None]
+    x0 = x0.astype(np.int64)
+    y0 = y0.astype(np.int64)
+    xa, xb = np.clip(x0, 0, w - 1), np.clip(x0 + 1, 0, w - 1)
+    ya, yb = np.clip(y0, 0, h - 1), np.clip(y0 + 1, 0, h - 1)
+    src = img.astype(np.float64)
+    top = src[ya, xa] * (1 - fx) + src[ya, xb] * fx
+    bottom = src[yb, xa] * (1 - fx) + src[yb, xb] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+def composite(fg: np.ndarray, bg: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    alpha = mask.astype(np.float64)[..., None] / 255.0
+    return fg.astype(np.float64) * alpha + bg.astype(np.float64) * (1.0 - alpha)
+
+
+def curves(img: np.ndarray, params: dict) -> np.ndarray:
+    exposure = float(params.get("exposure", 1.0))
+    gamma = float(params.get("gamma", 1.0))
+    wb = np.asarray(params.get("white_balance", [1.0, 1.0, 1.0]), dtype=np.float64)
+    arr = np.clip(img.astype(np.float64) / 255.0 * wb, 0, 10)
+    arr = np.clip(arr * exposure, 0, 10)
+    arr = arr ** (1.0 / max(gamma, 1e-6))
+    return np.clip(arr * 255.0, 0, 255)
+
+
+def lut(img: np.ndarray, lut: dict) -> np.ndarray:
+    """Trilinear interpolation in a 3D LUT indexed ``[r, g, b]``."""
+
+    size = lut["size"]
+    table = lut["table"].astype(np.float64)
+    pos = img.astype(np.float64) / 255.0 * (size - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, size - 1)
+    t = pos - lo
+    res = np.zeros(img.shape, dtype=np.float64)
+    for cr in (0, 1):
+        wr = t[..., 0] if cr else 1 - t[..., 0]
+        ir = hi[..., 0] if cr else lo[..., 0]
+        for cg in (0, 1):
+            wg = t[..., 1] if cg else 1 - t[..., 1]
+            ig = hi[..., 1] if cg else lo[..., 1]
+            for cb in (0, 1):
+                wb = t[..., 2] if cb else 1 - t[..., 2]
+                ib = hi[..., 2] if cb else lo[..., 2]
+                res += (wr * wg * wb)[..., None] * table[ir, ig, ib]
+    return np.clip(res * 255.0, 0, 255)
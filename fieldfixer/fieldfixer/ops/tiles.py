@@ -0,0 +1,98 @@
+"""Tile activity maps: warp and blend only where a bake actually changes pixels.
+
+A tile is *active* when any of its pixels has a displacement above ``eps`` or
+a mask value below 255. Everywhere else the warp is the identity and the
+blend keeps the warped pixel, so the output equals the input frame and can
+be copied straight through.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from fieldfixer.buffers import FramePool, scratch
+from fieldfixer.ops.mask import composite_with_mask
+from fieldfixer.ops.warp import apply_displacement
+
+DEFAULT_TILE = 64
+DEFAULT_EPS = 1e-3  # px; keeps a skipped tile within rounding of the full warp
+DENSE_FRACTION = 0.6  # above this share of active tiles the full-frame path is cheaper
+
+
+def grid_shape(shape: tuple[int, int], tile: int) -> tuple[int, int]:
+    h, w = shape
+    return -(-h // tile), -(-w // tile)
+
+
+def activity_map(
+    du: np.ndarray,
+    dv: np.ndarray,
+    mask: np.ndarray | None = None,
+    tile: int = DEFAULT_TILE,
+    eps: float = DEFAULT_EPS,
+) -> np.ndarray:
+    """Return a ``(ceil(H/tile), ceil(W/tile))`` bool map of tiles that need work."""
+
+    active = np.abs(du) > eps
+    active |= np.abs(dv) > eps
+    if mask is not None:
+        active |= mask < 255
+    rows = np.logical_or.reduceat(active, np.arange(0, active.shape[0], tile), axis=0)
+    return np.logical_or.reduceat(rows, np.arange(0, active.shape[1], tile), axis=1)
+
+
+def active_regions(active: np.ndarray, tile: int, shape: tuple[int, int]) -> list[tuple[int, int, int, int]]:
+    """Cover the active tiles with pixel rectangles ``(y0, y1, x0, x1)``.
+
+    Runs of active tiles in a tile row become one rectangle, and identical
+    runs in consecutive tile rows are merged, so large blobs cost few calls.
+    """
+
+    h, w = shape
+    regions: list[list[int]] = []
+    open_runs: dict[tuple[int, int], list[int]] = {}
+    for ty in range(active.shape[0]):
+        row = np.flatnonzero(np.diff(np.concatenate(([0], active[ty].view(np.int8), [0]))))
+        still_open: dict[tuple[int, int], list[int]] = {}
+        for c0, c1 in zip(row[0::2], row[1::2]):
+            rect = open_runs.get((c0, c1))
+            if rect is None:
+                rect = [ty * tile, 0, c0 * tile, min(c1 * tile, w)]
+                regions.append(rect)
+            rect[1] = min((ty + 1) * tile, h)
+            still_open[(c0, c1)] = rect
+        open_runs = still_open
+    return [tuple(r) for r in regions]
+
+
+def warp_blend_tiles(
+    frame: np.ndarray,
+    du: np.ndarray,
+    dv: np.ndarray,
+    mask: np.ndarray,
+    active: np.ndarray,
+    tile: int,
+    out: np.ndarray | None = None,
+    pool: FramePool | None = None,
+) -> np.ndarray:
+    """Warp and mask-blend ``frame`` inside active tiles only; copy every other pixel.
+
+    Matches ``composite_with_mask(apply_displacement(frame, du, dv), frame, mask)``
+    up to ``eps``. ``out`` must not alias ``frame``.
+    """
+
+    if active.shape != grid_shape(frame.shape[:2], tile):
+        raise ValueError(f"Activity map {active.shape} does not fit a {frame.shape[:2]} frame with tile {tile}")
+    if out is None:
+        out = np.empty_like(frame)
+    if active.mean() > DENSE_FRACTION:
+        warped = apply_displacement(frame, du, dv, out=scratch(pool, "frame.warped", frame.shape, np.uint8), pool=pool)
+        return composite_with_mask(warped, frame, mask, out=out, pool=pool)
+
+    np.copyto(out, frame)
+    for y0, y1, x0, x1 in active_regions(active, tile, frame.shape[:2]):
+        win = (slice(y0, y1), slice(x0, x1))
+        # Window-sized scratch would give the pool one entry per distinct size; allocate instead.
+        warped = apply_displacement(frame, du[win], dv[win], origin=(y0, x0))
+        composite_with_mask(warped, frame[win], mask[win], out=out[win])
+    return out
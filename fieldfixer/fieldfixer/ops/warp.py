@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import numpy as np
-from numba import njit
+
+from fieldfixer.buffers import FramePool, scratch
 
 try:
     import cv2
@@ -13,52 +14,96 @@ except Exception:  # pragma: no cover
 # TODO(codex): Add SSE/AVX-accelerated path via Numba prange if OpenCV absent.
 # TODO(codex): Add edge-handling modes (replicate, reflect, constant).
 
+_GRIDS: dict[tuple[int, int], tuple[np.ndarray, np.ndarray]] = {}
 
-def apply_displacement(img: np.ndarray, du: np.ndarray, dv: np.ndarray) -> np.ndarray:
-    """Warp an RGB frame using displacement maps."""
 
-    h, w = img.shape[:2]
-    if _HAS_CV2:
+def _pixel_grid(h: int, w: int) -> tuple[np.ndarray, np.ndarray]:
+    grid = _GRIDS.get((h, w))
+    if grid is None:
         xs, ys = np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32))
-        map_x = xs + du
-        map_y = ys + dv
+        xs.setflags(write=False)
+        ys.setflags(write=False)
+        grid = _GRIDS[(h, w)] = (xs, ys)
+    return grid
+
+
+def apply_displacement(
+    img: np.ndarray,
+    du: np.ndarray,
+    dv: np.ndarray,
+    out: np.ndarray | None = None,
+    pool: FramePool | None = None,
+    origin: tuple[int, int] = (0, 0),
+) -> np.ndarray:
+    """Warp an RGB frame using displacement maps.
+
+    ``out`` must not alias ``img``; ``pool`` supplies the remap coordinate maps.
+    With an ``origin`` of ``(y, x)``, ``du``/``dv``/``out`` cover only the
+    window starting there, while samples are still taken from all of ``img``.
+    """
+
+    h, w = du.shape[:2]
+    oy, ox = origin
+    if _HAS_CV2:
+        xs, ys = _pixel_grid(*img.shape[:2])
+        map_x = scratch(pool, "warp.map_x", (h, w))
+        map_y = scratch(pool, "warp.map_y", (h, w))
+        np.add(xs[oy : oy + h, ox : ox + w], du, out=map_x)
+        np.add(ys[oy : oy + h, ox : ox + w], dv, out=map_y)
         return cv2.remap(
             img,
             map_x,
             map_y,
             interpolation=cv2.INTER_LINEAR,
             borderMode=cv2.BORDER_REPLICATE,
+            dst=out,
         )
-    return _bilinear_sample(img, du, dv)
-
-
-@njit(cache=True, fastmath=True)
-def _bilinear_sample(img: np.ndarray, du: np.ndarray, dv: np.ndarray) -> np.ndarray:  # pragma: no cover - numba compiled
-    h, w, c = img.shape
-    out = np.empty_like(img)
-    for y in range(h):
-        for x in range(w):
-            xf = x + du[y, x]
-            yf = y + dv[y, x]
-            x0 = int(np.floor(xf))
-            x1 = x0 + 1
-            y0 = int(np.floor(yf))
-            y1 = y0 + 1
-            dx = xf - x0
-            dy = yf - y0
-            x0 = 0 if x0 < 0 else (w - 1 if x0 >= w else x0)
-            x1 = 0 if x1 < 0 else (w - 1 if x1 >= w else x1)
-            y0 = 0 if y0 < 0 else (h - 1 if y0 >= h else y0)
-            y1 = 0 if y1 < 0 else (h - 1 if y1 >= h else y1)
-            for ch in range(c):
-                v00 = img[y0, x0, ch]
-                v01 = img[y0, x1, ch]
-                v10 = img[y1, x0, ch]
-                v11 = img[y1, x1, ch]
-                out[y, x, ch] = (
-                    (1 - dx) * (1 - dy) * v00
-                    + dx * (1 - dy) * v01
-                    + (1 - dx) * dy * v10
-                    + dx * dy * v11
-                )
-    return out
+    from fieldfixer.ops.kernels import _bilinear_sample_at
+
+    if out is None:
+        out = np.empty((h, w) + img.shape[2:], dtype=img.dtype)
+    du = np.asarray(du, dtype=np.float32)
+    dv = np.asarray(dv, dtype=np.float32)
+    return _bilinear_sample_at(img, du, dv, out, oy, ox)
+
+
+def apply_displacement_batch(
+    imgs: np.ndarray,
+    du: np.ndarray,
+    dv: np.ndarray,
+    out: np.ndarray | None = None,
+    pool: FramePool | None = None,
+) -> np.ndarray:
+    """Warp an ``(N, H, W, C)`` stack with ``(N, H, W)`` displacement stacks.
+
+    Frame ``i`` of the result equals ``apply_displacement(imgs[i], du[i], dv[i])``.
+    The remap coordinates of the whole stack are built with one add per axis
+    against the shared pixel grid. ``out`` must not alias ``imgs``.
+    """
+
+    if du.ndim != 3 or du.shape != dv.shape or imgs.shape[:3] != du.shape:
+        raise ValueError(f"Displacement stacks {du.shape}/{dv.shape} do not match frames {imgs.shape}")
+    n, h, w = du.shape
+    if out is None:
+        out = np.empty(imgs.shape, dtype=imgs.dtype)
+    if _HAS_CV2:
+        xs, ys = _pixel_grid(h, w)
+        map_x = scratch(pool, "warp.batch_x", (n, h, w))
+        map_y = scratch(pool, "warp.batch_y", (n, h, w))
+        np.add(xs, du, out=map_x)
+        np.add(ys, dv, out=map_y)
+        for i in range(n):
+            cv2.remap(
+                imgs[i],
+                map_x[i],
+                map_y[i],
+                interpolation=cv2.INTER_LINEAR,
+                borderMode=cv2.BORDER_REPLICATE,
+                dst=out[i],
+            )
+        return out
+    from fieldfixer.ops.kernels import _bilinear_sample_batch
+
+    du = np.asarray(du, dtype=np.float32)
+    dv = np.asarray(dv, dtype=np.float32)
+    return _bilinear_sample_batch(imgs, du, dv, out)
@@ -0,0 +1,361 @@
+"""Per-frame apply loop shared by the CLI entry points."""
+
+from __future__ import annotations
+
+import warnings
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from tqdm import tqdm
+
+from fieldfixer.buffers import FramePool, scratch
+from fieldfixer.io.sidecar import SidecarBundle
+from fieldfixer.io.storage import LocalStore
+from fieldfixer.ops.exposure import apply_curves, apply_curves_batch
+from fieldfixer.ops.lut3d import apply_lut, apply_lut_batch, parse_cube_lut
+from fieldfixer.ops.mask import composite_with_mask, composite_with_mask_batch
+from fieldfixer.ops.tiles import grid_shape, warp_blend_tiles
+from fieldfixer.ops.warp import apply_displacement, apply_displacement_batch
+
+
+_LUT_NAME = "LUT/scene.cube"
+_LUT_CACHE_SIZE = 16
+_LUT_CACHE: dict[tuple[str, object], dict | None] = {}
+# Frames are batched until a batch holds this many pixels: small enough that
+# the stacked scratch of the LUT stage stays in cache, which larger batches lose.
+BATCH_PIXELS = 1 << 15
+MAX_BATCH = 8
+
+
+def load_bake_lut(bundle: SidecarBundle) -> dict | None:
+    """Return the bake's scene LUT, parsing each file version only once per process.
+
+    Local LUTs are revalidated by mtime. Remote ones are keyed on their URL
+    alone, like the rest of a remote bake, so repeat calls cost no requests.
+    """
+
+    if bundle.has(_LUT_NAME) is False:
+        return None  # listed in the manifest as absent: skip the probe
+    store = bundle.store
+    if isinstance(store, LocalStore):
+        stamp = store.stamp(_LUT_NAME)
+        if stamp is None:
+            return None
+    else:
+        stamp = None
+    key = (store.url(_LUT_NAME), stamp)
+    if key not in _LUT_CACHE:
+        data = store.read(_LUT_NAME)
+        if len(_LUT_CACHE) >= _LUT_CACHE_SIZE:
+            _LUT_CACHE.pop(next(iter(_LUT_CACHE)))
+        _LUT_CACHE[key] = None if data is None else parse_cube_lut(data.decode())
+    return _LUT_CACHE[key]
+
+
+def _bands(height: int, band_rows: int) -> list[tuple[int, int]]:
+    return [(y, min(y + band_rows, height)) for y in range(0, height, band_rows)]
+
+
+def _run_bands(executor: Executor, bands: list[tuple[int, int]], fn) -> None:
+    # list() re-raises the first worker exception here.
+    list(executor.map(lambda ib: fn(ib[0], *ib[1]), enumerate(bands)))
+
+
+def render_frame(
+    frame: np.ndarray,
+    idx: int,
+    bundle: SidecarBundle,
+    lut: dict | None,
+    pool: FramePool | None = None,
+    executor: Executor | None = None,
+    band_rows: int = 0,
+) -> np.ndarray:
+    """Run warp -> mask -> curves -> LUT for a single frame.
+
+    When the bake has tile activity maps, only active tiles are warped and
+    blended. With a ``pool`` the result lives in a pooled buffer and is only
+    valid until the next call with the same pool. With an ``executor`` and
+    ``band_rows`` the dense warp/blend and the colour stages run on horizontal
+    bands of that many rows in parallel; the output is identical.
+    """
+
+    h = frame.shape[0]
+    du, dv = bundle.load_warp(idx, shape=frame.shape[:2])
+    mask = bundle.load_mask(idx, shape=frame.shape[:2])
+    tiles = bundle.load_tiles(idx)
+    curves = bundle.load_curves(idx)
+
+    result = scratch(pool, "frame.out", frame.shape, np.uint8)
+    bands = _bands(h, band_rows) if executor is not None and 0 < band_rows < h else None
+    if tiles is not None and tiles.shape == grid_shape(frame.shape[:2], bundle.tile_size):
+        warp_blend_tiles(frame, du, dv, mask, tiles, bundle.tile_size, out=result, pool=pool)
+    elif bands is None:
+        warped = apply_displacement(frame, du, dv, out=scratch(pool, "frame.warped", frame.shape, np.uint8), pool=pool)
+        composite_with_mask(warped, frame, mask, out=result, pool=pool)
+    else:
+        warped = scratch(pool, "frame.warped", frame.shape, np.uint8)
+
+        def warp_band(i: int, y0: int, y1: int) -> None:
+            sub = pool.child(i) if pool is not None else None
+            rows = slice(y0, y1)
+            apply_displacement(frame, du[rows], dv[rows], out=warped[rows], pool=sub, origin=(y0, 0))
+            composite_with_mask(warped[rows], frame[rows], mask[rows], out=result[rows], pool=sub)
+
+        _run_bands(executor, bands, warp_band)
+
+    if bands is None:
+        apply_curves(result, curves, out=result)
+        if lut is not None:
+            apply_lut(result, lut, out=result, pool=pool)
+        return result
+
+    def colour_band(i: int, y0: int, y1: int) -> None:
+        band = result[y0:y1]
+        apply_curves(band, curves, out=band)
+        if lut is not None:
+            apply_lut(band, lut, out=band, pool=pool.child(i) if pool is not None else None)
+
+    _run_bands(executor, bands, colour_band)
+    return result
+
+
+def batch_size(height: int, width: int, batch_frames: int = 0) -> int:
+    """Frames per batch: ``batch_frames`` when set, else as many as fit in :data:`BATCH_PIXELS`."""
+
+    if batch_frames > 0:
+        return batch_frames
+    return max(1, min(MAX_BATCH, BATCH_PIXELS // max(1, height * width)))
+
+
+def render_batch(
+    frames: np.ndarray,
+    indices: list[int],
+    bundle: SidecarBundle,
+    lut: dict | None,
+    pool: FramePool | None = None,
+) -> np.ndarray:
+    """Run warp -> mask -> curves -> LUT for an ``(N, H, W, 3)`` stack of frames ``indices``.
+
+    Each op runs once over the whole stack, which amortizes per-call overhead
+    on small frames; frame ``i`` of the result equals ``render_frame(frames[i],
+    indices[i], ...)``. Frames with usable tile activity maps are still
+    warped and blended tile by tile. The result is a pooled buffer as in
+    :func:`render_frame`.
+    """
+
+    n, h, w = frames.shape[:3]
+    du = scratch(pool, "batch.du", (n, h, w))
+    dv = scratch(pool, "batch.dv", (n, h, w))
+    masks = scratch(pool, "batch.mask", (n, h, w), np.uint8)
+    result = scratch(pool, "batch.out", frames.shape, np.uint8)
+    tiles = []
+    for k, idx in enumerate(indices):
+        du[k], dv[k] = bundle.load_warp(idx, shape=(h, w))
+        masks[k] = bundle.load_mask(idx, shape=(h, w))
+        active = bundle.load_tiles(idx)
+        tiles.append(active if active is not None and active.shape == grid_shape((h, w), bundle.tile_size) else None)
+    curves = [bundle.load_curves(idx) for idx in indices]
+
+    if all(t is None for t in tiles):
+        warped = apply_displacement_batch(
+            frames, du, dv, out=scratch(pool, "batch.warped", frames.shape, np.uint8), pool=pool
+        )
+        composite_with_mask_batch(warped, frames, masks, out=result, pool=pool)
+    else:
+        for k, active in enumerate(tiles):
+            if active is not None:
+                warp_blend_tiles(frames[k], du[k], dv[k], masks[k], active, bundle.tile_size, out=result[k], pool=pool)
+            else:
+                warped = apply_displacement(
+                    frames[k], du[k], dv[k], out=scratch(pool, "frame.warped", frames.shape[1:], np.uint8), pool=pool
+                )
+                composite_with_mask(warped, frames[k], masks[k], out=result[k], pool=pool)
+
+    apply_curves_batch(result, curves, out=result)
+    if lut is not None:
+        apply_lut_batch(result, lut, out=result, pool=pool)
+    return result
+
+
+def run_apply(
+    reader,
+    writer,
+    bundle: SidecarBundle,
+    lut: dict | None,
+    progress: bool = True,
+    start: int = 0,
+    workers: int = 1,
+    band_rows: int = 0,
+    batch_frames: int = 0,
+) -> int:
+    """Stream every frame of ``reader`` through the pipeline into ``writer``.
+
+    ``start`` is the clip index of the reader's first frame (non-zero when
+    resuming). Returns the number of frames written. Neither end is closed
+    here. One buffer pool serves the whole clip, so frames after the first
+    reuse it. With ``workers > 1`` each frame is rendered in ``band_rows``-row
+    bands on that many threads. Otherwise frames are rendered in batches of
+    :func:`batch_size` frames (``batch_frames``: 0 = by resolution, 1 = off)
+    with :func:`render_batch`.
+    """
+
+    pool = FramePool()
+    frames = tqdm(reader, total=reader.nframes or None, initial=start) if progress else reader
+    count = 0
+    executor = ThreadPoolExecutor(workers, thread_name_prefix="ffx-band") if workers > 1 and band_rows > 0 else None
+    height, width = getattr(reader, "height", None), getattr(reader, "width", None)
+    batch = batch_size(height, width, batch_frames) if executor is None and height and width else 1
+    try:
+        if batch > 1:
+            return _run_batched(frames, reader, writer, bundle, lut, pool, start, batch)
+        for i, frame in enumerate(frames, start=start):
+            writer.write(render_frame(frame, i, bundle, lut, pool=pool, executor=executor, band_rows=band_rows))
+            count += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return count
+
+
+def _run_batched(frames, reader, writer, bundle, lut, pool: FramePool, start: int, batch: int) -> int:
+    # Decoded frames live in the reader's ring buffers only until the next
+    # one is pulled, so each is copied into a pooled stack first.
+    stamped = getattr(writer, "following", False)
+    stack = stamps = None
+    filled = count = 0
+
+    def flush() -> None:
+        result = render_batch(stack[:filled], list(range(start + count, start + count + filled)), bundle, lut, pool=pool)
+        for k in range(filled):
+            if stamped:
+                writer.write(result[k], pts=stamps[k])
+            else:
+                writer.write(result[k])
+
+    for frame in frames:
+        if stack is None:
+            stack = pool.get("batch.in", (batch,) + frame.shape, np.uint8)
+            stamps = [None] * batch
+        stack[filled] = frame
+        stamps[filled] = getattr(reader, "pts", None)
+        filled += 1
+        if filled == batch:
+            flush()
+            count += filled
+            filled = 0
+    if filled:
+        flush()
+        count += filled
+    return count
+
+
+def apply_video(
+    inp: Path,
+    bake: Path | str,
+    out: Path,
+    crf: int = 18,
+    progress: bool = True,
+    bundle: SidecarBundle | None = None,
+    resume: bool = False,
+    chunk_frames: int = 600,
+    readahead: int | None = None,
+    decode_threads: int | None = None,
+    workers: int | None = None,
+    band_rows: int | None = None,
+    passthrough: bool = True,
+    batch_frames: int | None = None,
+) -> int:
+    """Apply a bake (directory or URL) to a video file and encode the result; returns the frame count.
+
+    Pass an already open ``bundle`` to reuse it across calls; it is then left open.
+    With ``resume`` the output is encoded in ``chunk_frames``-frame chunks under
+    ``<out>.parts`` with a checkpoint, and a rerun continues after the last
+    completed chunk; the returned count then covers only newly rendered frames.
+    Decoding runs up to ``readahead`` frames ahead of rendering on its own thread,
+    using ``decode_threads`` codec threads (0 = auto); frames render on ``workers``
+    threads in ``band_rows``-row bands, or ``batch_frames`` at a time on one
+    thread (0 = by resolution). Settings left as ``None`` come from the
+    tuned profile for the clip's resolution (see :mod:`fieldfixer.tuning`).
+    With ``passthrough`` the input's audio, subtitle and data streams are
+    copied into ``out`` without re-encoding, in sync with the video.
+    """
+
+    from fieldfixer.io.video import VideoReader, VideoWriter
+    from fieldfixer.tuning import resolve_settings
+
+    owns_bundle = bundle is None
+    if bundle is None:
+        bundle = SidecarBundle.load(bake)
+    try:
+        lut = load_bake_lut(bundle)
+        # Resumable output copies the other streams when joining chunks instead.
+        vr = VideoReader(inp, pool=FramePool(), passthrough=passthrough and not resume)
+        try:
+            settings = resolve_settings(
+                vr.width,
+                vr.height,
+                readahead=readahead,
+                decode_threads=decode_threads,
+                workers=workers,
+                band_rows=band_rows,
+                batch_frames=batch_frames,
+            )
+            # Nothing has been decoded yet, so the codec still takes a new thread count.
+            vr.stream.codec_context.thread_count = vr.threads = settings.decode_threads
+            vr.readahead = settings.readahead
+            render = {
+                "workers": settings.workers,
+                "band_rows": settings.band_rows,
+                "batch_frames": settings.batch_frames,
+            }
+            if resume:
+                return _apply_resumable(
+                    vr, bundle, lut, inp, bake, out, crf, chunk_frames, progress, render, passthrough
+                )
+            vw = VideoWriter(out, width=vr.width, height=vr.height, fps=vr.fps, crf=crf)
+            try:
+                if passthrough:
+                    for stream in vw.follow(vr):
+                        warnings.warn(
+                            f"Not copying {stream.type} stream #{stream.index}: {Path(out).suffix} cannot hold it",
+                            RuntimeWarning,
+                            stacklevel=2,
+                        )
+                return run_apply(vr, vw, bundle, lut, progress=progress, **render)
+            finally:
+                vw.close()
+        finally:
+            vr.close()
+    finally:
+        if owns_bundle:
+            bundle.close()
+
+
+def _apply_resumable(vr, bundle, lut, inp, bake, out, crf, chunk_frames, progress, render, passthrough) -> int:
+    from fieldfixer.io.chunked import ChunkedVideoWriter
+
+    stat = Path(inp).stat()
+    fingerprint = {
+        "in": str(Path(inp).resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "bake": str(bake),
+    }
+    vw = ChunkedVideoWriter(
+        out,
+        width=vr.width,
+        height=vr.height,
+        fps=vr.fps,
+        crf=crf,
+        chunk_frames=chunk_frames,
+        fingerprint=fingerprint,
+        passthrough_from=Path(inp) if passthrough else None,
+    )
+    start = vw.resume_frame
+    if start:
+        vr.seek(start)
+    # On failure the completed chunks and checkpoint stay on disk for the next run.
+    count = run_apply(vr, vw, bundle, lut, progress=progress, start=start, **render)
+    vw.close()
+    return count
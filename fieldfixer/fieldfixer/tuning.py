@@ -0,0 +1,334 @@
+"""Per-machine auto-tuning of the apply pipeline.
+
+``fieldfixer tune`` measures the real ops on this machine at a given
+resolution and stores the fastest settings in a tuned profile:
+
+* ``workers`` / ``band_rows``: threads rendering each frame and the height of
+  the row bands they split it into (see :func:`fieldfixer.runtime.render_frame`);
+* ``batch_frames``: frames rendered together as one stack when a frame is
+  rendered on a single thread (see :func:`fieldfixer.runtime.render_batch`);
+* ``readahead``: frames decoded ahead of rendering;
+* ``decode_threads``: codec threads of the decoder (0 lets FFmpeg pick);
+* ``batch_workers``: processes for ``apply-batch``, so process and thread
+  parallelism together fill the CPUs without oversubscribing them.
+
+Profiles live in ``$FIELDFIXER_TUNED`` or ``~/.config/fieldfixer/tuned.json``
+(``$XDG_CONFIG_HOME`` is honoured), keyed by ``WIDTHxHEIGHT``. ``apply`` picks
+the profile nearest to the clip's pixel count; explicit options win.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import platform
+import tempfile
+import time
+from dataclasses import asdict, dataclass, fields, replace
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+PROFILE_ENV = "FIELDFIXER_TUNED"
+PROFILE_VERSION = 1
+BAND_ROWS = (32, 64, 128, 256)
+READAHEAD = (0, 2, 4, 8)
+BATCH_FRAMES = (1, 2, 4, 8)
+MIN_GAIN = 1.05  # a costlier setting must beat the simplest near-best one by this factor
+
+
+@dataclass
+class TunedSettings:
+    workers: int = 1
+    band_rows: int = 0
+    batch_frames: int = 0  # 0 = by resolution (see fieldfixer.runtime.batch_size)
+    readahead: int = 4
+    decode_threads: int = 0
+    batch_workers: int = 2
+    fps: float | None = None  # measured decode + render throughput
+
+
+@dataclass
+class Trial:
+    stage: str  # render | batch | decode | threads
+    settings: dict[str, int]
+    fps: float
+
+
+def profile_path() -> Path:
+    env = os.environ.get(PROFILE_ENV)
+    if env:
+        return Path(env).expanduser()
+    base = os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config"
+    return Path(base) / "fieldfixer" / "tuned.json"
+
+
+def read_profiles(path: str | os.PathLike | None = None) -> dict[str, Any]:
+    """Load the profile file; a missing, unreadable or outdated file counts as empty."""
+
+    path = Path(path) if path is not None else profile_path()
+    try:
+        doc = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError):
+        doc = None
+    if not isinstance(doc, dict) or doc.get("version") != PROFILE_VERSION:
+        return {"version": PROFILE_VERSION, "profiles": {}}
+    doc.setdefault("profiles", {})
+    return doc
+
+
+def _settings(entry: dict[str, Any]) -> TunedSettings:
+    known = {f.name for f in fields(TunedSettings)}
+    return TunedSettings(**{k: v for k, v in entry.items() if k in known})
+
+
+def load_profile(
+    width: int | None = None,
+    height: int | None = None,
+    path: str | os.PathLike | None = None,
+) -> TunedSettings | None:
+    """Settings tuned for the resolution closest to ``width x height`` (by pixel count).
+
+    Without a size the most recently tuned profile is returned; ``None`` when
+    nothing has been tuned yet.
+    """
+
+    entries = read_profiles(path)["profiles"]
+    if not entries:
+        return None
+    if width and height:
+
+        def distance(entry: dict[str, Any]) -> float:
+            return abs(math.log(width * height / max(entry["width"] * entry["height"], 1)))
+
+        best = min(entries.values(), key=distance)
+    else:
+        best = max(entries.values(), key=lambda e: e.get("tuned_at", 0))
+    return _settings(best)
+
+
+def save_profile(width: int, height: int, settings: TunedSettings, path: str | os.PathLike | None = None) -> Path:
+    """Store ``settings`` for this resolution, keeping profiles for other sizes."""
+
+    path = Path(path) if path is not None else profile_path()
+    doc = read_profiles(path)
+    doc["host"] = {"cpus": os.cpu_count(), "machine": platform.machine(), "node": platform.node()}
+    doc["profiles"][f"{width}x{height}"] = {"width": width, "height": height, "tuned_at": time.time(), **asdict(settings)}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(doc, indent=2))
+    os.replace(tmp, path)
+    return path
+
+
+def resolve_settings(width: int | None = None, height: int | None = None, **overrides: int | None) -> TunedSettings:
+    """Tuned settings for a clip size with every non-``None`` override applied on top."""
+
+    base = load_profile(width, height) or TunedSettings()
+    return replace(base, **{k: v for k, v in overrides.items() if v is not None})
+
+
+def worker_candidates(cpus: int | None = None) -> list[int]:
+    cpus = max(1, cpus or os.cpu_count() or 1)
+    return sorted({1, cpus, *(n for n in (2, 4, 8, 16, 32, 64) if n <= cpus)})
+
+
+def _synthetic_bake(root: Path, width: int, height: int) -> None:
+    """A dense worst-case bake: a smooth warp and soft mask over every pixel, no tile maps."""
+
+    from fieldfixer.io.sidecar import SidecarWriter
+
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    du = 3.0 * np.sin(xs / 97.0) * np.cos(ys / 61.0)
+    dv = 2.0 * np.cos(xs / 53.0)
+    mask = (np.clip(xs / max(width - 1, 1), 0, 1) * 254).astype(np.uint8)
+    writer = SidecarWriter(root)
+    writer.write_warp(0, du, dv)
+    writer.write_mask(0, mask)
+    writer.close()
+    curves = {"exposure": 1.05, "gamma": 1.1, "white_balance": [1.02, 1.0, 0.97]}
+    (root / "curves.json").write_text(json.dumps({"global": curves}))
+
+
+def _synthetic_lut(size: int = 33) -> dict:
+    axis = np.linspace(0.0, 1.0, size, dtype=np.float32)
+    table = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1)
+    return {"size": size, "table": np.ascontiguousarray(table**1.1)}
+
+
+def _synthetic_frames(width: int, height: int, count: int = 2) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def _time(fn: Callable[[], None], frames: int) -> float:
+    fn()  # warm pools and caches outside the timed loop
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return frames / max(time.perf_counter() - start, 1e-9)
+
+
+def bench_render(bundle, lut: dict, images: list[np.ndarray], workers: int, band_rows: int, frames: int) -> float:
+    """Rendered frames per second for one (workers, band_rows) setting."""
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    from fieldfixer.buffers import FramePool
+    from fieldfixer.runtime import render_frame
+
+    pool = FramePool()
+    executor = ThreadPoolExecutor(workers, thread_name_prefix="ffx-tune") if workers > 1 else None
+    counter = iter(range(1 << 30))
+    try:
+        return _time(
+            lambda: render_frame(
+                images[next(counter) % len(images)], 0, bundle, lut, pool=pool, executor=executor, band_rows=band_rows
+            ),
+            frames,
+        )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def bench_batch(bundle, lut: dict, images: list[np.ndarray], batch_frames: int, frames: int) -> float:
+    """Rendered frames per second when ``batch_frames`` frames are rendered as one stack."""
+
+    from fieldfixer.buffers import FramePool
+    from fieldfixer.runtime import render_batch
+
+    pool = FramePool()
+    stack = np.stack([images[i % len(images)] for i in range(batch_frames)])
+    indices = [0] * batch_frames
+    rounds = max(1, frames // batch_frames)
+    return _time(lambda: render_batch(stack, indices, bundle, lut, pool=pool), rounds) * batch_frames
+
+
+def _write_clip(path: Path, images: list[np.ndarray], frames: int) -> None:
+    from fieldfixer.io.video import VideoWriter
+
+    h, w = images[0].shape[:2]
+    vw = VideoWriter(path, width=w, height=h, fps=30, crf=23)
+    for i in range(frames):
+        vw.write(images[i % len(images)])
+    vw.close()
+
+
+class _NullWriter:
+    def write(self, rgb: np.ndarray) -> None:
+        pass
+
+
+def bench_pipeline(clip: Path, bundle, lut: dict, settings: TunedSettings) -> float:
+    """Decode + render frames per second for a clip (encoding excluded)."""
+
+    from fieldfixer.buffers import FramePool
+    from fieldfixer.io.video import VideoReader
+    from fieldfixer.runtime import run_apply
+
+    vr = VideoReader(str(clip), threads=settings.decode_threads, readahead=settings.readahead, pool=FramePool())
+    try:
+        start = time.perf_counter()
+        count = run_apply(
+            vr,
+            _NullWriter(),
+            bundle,
+            lut,
+            progress=False,
+            workers=settings.workers,
+            band_rows=settings.band_rows,
+            batch_frames=settings.batch_frames,
+        )
+        return count / max(time.perf_counter() - start, 1e-9)
+    finally:
+        vr.close()
+
+
+def _pick(trials: list[Trial]) -> Trial:
+    """The cheapest trial within ``MIN_GAIN`` of the fastest, so timing noise does not buy threads.
+
+    ``trials`` must be ordered from cheapest to costliest.
+    """
+
+    fastest = max(t.fps for t in trials)
+    return next(t for t in trials if t.fps * MIN_GAIN >= fastest)
+
+
+def tune(
+    width: int,
+    height: int,
+    frames: int = 8,
+    clip_frames: int = 24,
+    cpus: int | None = None,
+    log: Callable[[Trial], None] | None = None,
+) -> tuple[TunedSettings, list[Trial]]:
+    """Search render threading, band height, batch size and read-ahead depth for this machine.
+
+    Render settings are measured first on in-memory frames (``frames`` timed
+    renders per candidate). When one thread wins, batch sizes are measured
+    next the same way. Read-ahead and then decoder threads are measured end
+    to end on a short synthetic clip with the winning render settings.
+    Odd sizes are measured one pixel larger, since the clip is yuv420p.
+    Returns the chosen settings and every trial, in the order they ran.
+    """
+
+    from fieldfixer.io.sidecar import SidecarBundle
+
+    cpus = max(1, cpus or os.cpu_count() or 1)
+    width, height = width + width % 2, height + height % 2
+    trials: list[Trial] = []
+
+    def record(stage: str, fps: float, **settings: int) -> Trial:
+        trial = Trial(stage, settings, fps)
+        trials.append(trial)
+        if log is not None:
+            log(trial)
+        return trial
+
+    images = _synthetic_frames(width, height)
+    lut = _synthetic_lut()
+    with tempfile.TemporaryDirectory(prefix="ffx-tune-") as tmp:
+        root = Path(tmp)
+        _synthetic_bake(root / "bake", width, height)
+        bundle = SidecarBundle.load(root / "bake")
+
+        # Cheapest first: one thread, then more threads with larger (fewer) bands.
+        render = [record("render", bench_render(bundle, lut, images, 1, 0, frames), workers=1, band_rows=0)]
+        for workers in worker_candidates(cpus)[1:]:
+            for band_rows in sorted((b for b in BAND_ROWS if b < height), reverse=True):
+                fps = bench_render(bundle, lut, images, workers, band_rows, frames)
+                render.append(record("render", fps, workers=workers, band_rows=band_rows))
+        best = TunedSettings(**_pick(render).settings)
+        # Batching only applies to single-threaded renders.
+        best.batch_frames = 1
+        if best.workers == 1:
+            batched = [
+                record("batch", bench_batch(bundle, lut, images, n, max(frames, n)), batch_frames=n)
+                for n in BATCH_FRAMES
+            ]
+            best.batch_frames = _pick(batched).settings["batch_frames"]
+
+        clip = root / "clip.mp4"
+        _write_clip(clip, images, clip_frames)
+        decode = []
+        for readahead in READAHEAD:
+            fps = bench_pipeline(clip, bundle, lut, replace(best, readahead=readahead))
+            decode.append(record("decode", fps, readahead=readahead))
+        chosen = _pick(decode)
+        best.readahead = chosen.settings["readahead"]
+
+        # Explicit counts first, FFmpeg's own choice (0, usually one per core) last.
+        threads = []
+        for count in [*worker_candidates(cpus), 0]:
+            fps = bench_pipeline(clip, bundle, lut, replace(best, decode_threads=count))
+            threads.append(record("threads", fps, decode_threads=count))
+        chosen = _pick(threads)
+        best.decode_threads = chosen.settings["decode_threads"]
+        bundle.close()
+
+    best.batch_workers = max(1, cpus // best.workers)
+    best.fps = round(chosen.fps, 2)
+    return best, trials
@@ -0,0 +1,55 @@
+"""Measure CLI startup and first-kernel latency in fresh interpreters."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+CASES = {
+    "import_cli": "import fieldfixer.cli",
+    "cli_help": "from fieldfixer.cli import app; app(['--help'], standalone_mode=False)",
+    "import_runtime": "import fieldfixer.runtime",
+    "first_kernel_call": (
+        "import numpy as np\n"
+        "from fieldfixer.ops.kernels import _bilinear_sample\n"
+        "img = np.zeros((8, 8, 3), np.uint8); d = np.zeros((8, 8), np.float32)\n"
+        "_bilinear_sample(img, d, d, np.empty_like(img))"
+    ),
+}
+
+
+def _time_case(code: str, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_startup(repeats: int = 5, warm: bool = True) -> dict[str, dict[str, float]]:
+    if warm:
+        from fieldfixer.ops.kernels import warmup
+
+        warmup()
+    results = {}
+    for name, code in CASES.items():
+        samples = _time_case(code, repeats)
+        results[name] = {
+            "median_s": round(statistics.median(samples), 4),
+            "min_s": round(min(samples), 4),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FieldFixer startup benchmark")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--no-warmup", action="store_true", help="Skip populating the Numba cache first")
+    args = parser.parse_args()
+
+    print(json.dumps(bench_startup(args.repeats, warm=not args.no_warmup), indent=2))
@@ -0,0 +1,24 @@
+"""Report every fast path's error against the reference ops; exit 1 if any is over budget."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from fieldfixer.equivalence import format_report, run_equivalence
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seeds", type=int, default=4, help="Random seeds per shape")
+    parser.add_argument("--size", action="append", default=[], help="Frame size HxW (repeatable)")
+    args = parser.parse_args()
+
+    shapes = tuple(tuple(int(v) for v in s.lower().split("x")) for s in args.size) or ((24, 40), (37, 53), (120, 160))
+    results = run_equivalence(seeds=tuple(range(args.seeds)), shapes=shapes)
+    print(format_report(results))
+    return 0 if all(r.passed for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,9 +7,12 @@ import json
 from pathlib import Path
 
 import cv2
-import imageio.v3 as iio
 import numpy as np
 
+from fieldfixer.bake.framestore import FrameStore
+from fieldfixer.io.sidecar import SidecarWriter
+from fieldfixer.ops.tiles import DEFAULT_TILE, activity_map
+
 
 def _sorted(glob_pattern: str) -> list[str]:
     paths = sorted(glob.glob(glob_pattern))
@@ -23,11 +26,6 @@ def _ensure_dirs(out_root: Path) -> None:
         (out_root / sub).mkdir(parents=True, exist_ok=True)
 
 
-def _save_flow(path: Path, du: np.ndarray, dv: np.ndarray) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    np.savez_compressed(path, du=du.astype(np.float16), dv=dv.astype(np.float16))
-
-
 def _confidence_mask(rs_rgb: np.ndarray, gs_rgb: np.ndarray, du: np.ndarray, dv: np.ndarray) -> np.ndarray:
     h, w = rs_rgb.shape[:2]
     xs, ys = np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32))
@@ -53,20 +51,21 @@ def bake(rs_glob: str, gs_glob: str, out_dir: str, fps: float = 20.0) -> None:
     out_root = Path(out_dir)
     _ensure_dirs(out_root)
 
-    rs_paths = _sorted(rs_glob)
-    gs_paths = _sorted(gs_glob)
-    n = min(len(rs_paths), len(gs_paths))
-
-    sample = iio.imread(rs_paths[0])
-    height, width = sample.shape[:2]
+    # Decode both sequences once into memory-mapped stores; reruns reuse them.
+    work = out_root.with_name(out_root.name + ".work")
+    rs_frames = FrameStore.build(_sorted(rs_glob), work / "rs")
+    gs_frames = FrameStore.build(_sorted(gs_glob), work / "gs")
+    n = min(len(rs_frames), len(gs_frames))
+    height, width = rs_frames.shape
 
     (out_root / "curves.json").write_text(json.dumps({"global": {"exposure": 1.0, "gamma": 1.0}}, indent=2))
     (out_root / "LUT" / "scene.cube").write_text(_identity_cube_lut())
 
-    for idx, (rs_path, gs_path) in enumerate(zip(rs_paths[:n], gs_paths[:n])):
+    writer = SidecarWriter(out_root)
+    for idx in range(n):
         print(f"[Bake] Processing frame {idx + 1}/{n}")
-        rs = iio.imread(rs_path)
-        gs = iio.imread(gs_path)
+        rs = rs_frames[idx]
+        gs = gs_frames[idx]
         if rs.ndim == 3:
             rs_gray = cv2.cvtColor(rs, cv2.COLOR_RGB2GRAY)
         else:
@@ -89,12 +88,15 @@ def bake(rs_glob: str, gs_glob: str, out_dir: str, fps: float = 20.0) -> None:
         )
         du = flow[..., 0].astype(np.float32)
         dv = flow[..., 1].astype(np.float32)
-        _save_flow(out_root / "W" / f"{idx:06d}.npz", du, dv)
+        writer.write_warp(idx, du, dv)
         # For mask confidence, ensure RGB for visual difference
         rs_rgb = rs if rs.ndim == 3 else cv2.cvtColor(rs, cv2.COLOR_GRAY2RGB)
         gs_rgb = gs if gs.ndim == 3 else cv2.cvtColor(gs, cv2.COLOR_GRAY2RGB)
         mask = _confidence_mask(rs_rgb, gs_rgb, du, dv)
-        iio.imwrite(out_root / "M" / f"{idx:06d}.png", mask)
+        writer.write_mask(idx, mask)
+        stored = (du.astype(np.float16), dv.astype(np.float16))
+        writer.write_tiles(idx, activity_map(*stored, mask, tile=DEFAULT_TILE))
+    writer.close()
 
     meta = {
         "version": 1,
@@ -105,6 +107,7 @@ def bake(rs_glob: str, gs_glob: str, out_dir: str, fps: float = 20.0) -> None:
         "height": height,
         "fps": fps,
         "frame_count": n,
+        "tile_size": DEFAULT_TILE,
         "sources": {"dataset": "TUM RS-GS seq4"},
     }
     (out_root / "meta.json").write_text(json.dumps(meta, indent=2))
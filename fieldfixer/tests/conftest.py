@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolated_tuned_profile(tmp_path_factory, monkeypatch) -> None:
+    # apply_video and resolve_settings read the tuned profile; never the developer's real one.
+    monkeypatch.setenv("FIELDFIXER_TUNED", str(tmp_path_factory.mktemp("tuned") / "tuned.json"))
+
+
+@pytest.fixture
+def write_clip():
+    """Encode a small H.264 clip of flat frames; frame ``i`` has level ``step * i``."""
+
+    av = pytest.importorskip("av")
+
+    def write(
+        path: Path,
+        frames: int = 3,
+        width: int = 16,
+        height: int = 16,
+        step: int = 40,
+        gop: int | None = None,
+    ) -> Path:
+        container = av.open(str(path), mode="w")
+        stream = container.add_stream("libx264", rate=24)
+        stream.width = width
+        stream.height = height
+        stream.pix_fmt = "yuv420p"
+        if gop is not None:
+            stream.codec_context.gop_size = gop
+        for i in range(frames):
+            rgb = np.full((height, width, 3), step * i, dtype=np.uint8)
+            for packet in stream.encode(av.VideoFrame.from_ndarray(rgb, format="rgb24")):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+        container.close()
+        return path
+
+    return write
+
+
+@pytest.fixture
+def make_lut():
+    """Build an in-memory 3D LUT: identity, or ``x ** gamma`` per channel."""
+
+    def make(size: int = 5, gamma: float = 1.0) -> dict:
+        axis = np.linspace(0.0, 1.0, size, dtype=np.float32)
+        table = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1)
+        if gamma != 1.0:
+            table = table**gamma
+        return {"size": size, "table": np.ascontiguousarray(table)}
+
+    return make
@@ -0,0 +1,116 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from fieldfixer import batch
+from fieldfixer.batch import BatchJob, load_manifest, run_batch
+
+pytest.importorskip("av")
+
+
+def test_load_manifest_resolves_relative_paths(tmp_path: Path) -> None:
+    manifest = tmp_path / "jobs.jsonl"
+    manifest.write_text(
+        "\n".join(
+            [
+                json.dumps({"in": "a.mp4", "bake": "bake", "out": "out/a.mp4"}),
+                json.dumps({"in": "b.mp4", "bake": "bake", "out": "out/b.mp4", "crf": 23}),
+            ]
+        )
+    )
+    jobs = load_manifest(manifest)
+    assert [j.inp for j in jobs] == [tmp_path / "a.mp4", tmp_path / "b.mp4"]
+    assert jobs[1].crf == 23
+
+    (tmp_path / "bad.json").write_text(json.dumps([{"in": "a.mp4"}]))
+    with pytest.raises(ValueError):
+        load_manifest(tmp_path / "bad.json")
+
+
+def test_run_batch_reports_and_retries(tmp_path: Path, write_clip) -> None:
+    write_clip(tmp_path / "clip.mp4")
+    good = BatchJob(inp=tmp_path / "clip.mp4", bake=tmp_path / "bake", out=tmp_path / "out" / "clip.mp4")
+    bad = BatchJob(inp=tmp_path / "missing.mp4", bake=tmp_path / "bake", out=tmp_path / "out" / "missing.mp4")
+    report = tmp_path / "report.json"
+
+    summary = run_batch([good, bad], workers=0, retries=2, report=report)
+
+    assert summary["succeeded"] == 1
+    assert summary["failed"] == 1
+    jobs = {Path(j["in"]).name: j for j in json.loads(report.read_text())["jobs"]}
+    assert jobs["clip.mp4"]["status"] == "ok"
+    assert jobs["clip.mp4"]["frames"] == 3
+    assert jobs["missing.mp4"]["attempts"] == 3
+    assert (tmp_path / "out" / "clip.mp4").exists()
+
+
+def test_run_batch_worker_pool(tmp_path: Path, write_clip) -> None:
+    for name in ("a", "b"):
+        write_clip(tmp_path / f"{name}.mp4", frames=2)
+    jobs = [
+        BatchJob(inp=tmp_path / f"{name}.mp4", bake=tmp_path / "bake", out=tmp_path / "out" / f"{name}.mp4")
+        for name in ("a", "b")
+    ]
+    summary = run_batch(jobs, workers=2, retries=0)
+    assert summary["succeeded"] == 2
+    assert summary["frames"] == 4
+
+
+_real_run_job = batch._run_job
+
+
+def _die_once(job: BatchJob):
+    # Kills its worker process the first time it sees job "a", like an OOM kill.
+    marker = job.out.with_suffix(".crashed")
+    if job.inp.stem == "a" and not marker.exists():
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+        os._exit(9)
+    return _real_run_job(job)
+
+
+def test_run_batch_survives_dead_worker(tmp_path: Path, monkeypatch, write_clip) -> None:
+    for name in ("a", "b"):
+        write_clip(tmp_path / f"{name}.mp4", frames=2)
+    jobs = [
+        BatchJob(inp=tmp_path / f"{name}.mp4", bake=tmp_path / "bake", out=tmp_path / "out" / f"{name}.mp4")
+        for name in ("a", "b")
+    ]
+    monkeypatch.setattr(batch, "_run_job", _die_once)  # forked workers inherit the patch
+    report = tmp_path / "report.json"
+
+    summary = run_batch(jobs, workers=2, retries=1, report=report)
+
+    assert summary["succeeded"] == 2
+    jobs = {Path(j["in"]).name: j for j in json.loads(report.read_text())["jobs"]}
+    assert jobs["a.mp4"]["attempts"] == 2
+    assert jobs["a.mp4"]["errors"][0].startswith("BrokenProcessPool")
+
+
+def test_dead_worker_does_not_charge_queued_jobs(tmp_path: Path, monkeypatch, write_clip) -> None:
+    names = ("a", "b", "c", "d")
+    for name in names:
+        write_clip(tmp_path / f"{name}.mp4", frames=4 if name == "a" else 2)  # "a" is scheduled first
+    jobs = [
+        BatchJob(inp=tmp_path / f"{name}.mp4", bake=tmp_path / "bake", out=tmp_path / "out" / f"{name}.mp4")
+        for name in names
+    ]
+    monkeypatch.setattr(batch, "_run_job", _die_once)
+
+    summary = run_batch(jobs, workers=1, retries=1)
+
+    assert summary["succeeded"] == 4
+    attempts = {Path(j["in"]).stem: j["attempts"] for j in summary["jobs"]}
+    assert attempts == {"a": 2, "b": 1, "c": 1, "d": 1}
+
+def test_run_batch_writes_report_when_aborted(tmp_path: Path, monkeypatch) -> None:
+    def interrupted(job: BatchJob):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(batch, "_run_job", interrupted)
+    job = BatchJob(inp=tmp_path / "a.mp4", bake=tmp_path / "bake", out=tmp_path / "out" / "a.mp4")
+    with pytest.raises(KeyboardInterrupt):
+        run_batch([job], workers=0, report=tmp_path / "report.json")
+    assert json.loads((tmp_path / "report.json").read_text())["jobs"][0]["status"] == "pending"
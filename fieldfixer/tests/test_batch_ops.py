@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldfixer.buffers import FramePool
+from fieldfixer.io.sidecar import SidecarBundle, SidecarWriter
+from fieldfixer.ops.exposure import apply_curves, apply_curves_batch
+from fieldfixer.ops.lut3d import apply_lut, apply_lut_batch
+from fieldfixer.ops.mask import composite_with_mask, composite_with_mask_batch
+from fieldfixer.ops.tiles import activity_map
+from fieldfixer.ops.warp import apply_displacement, apply_displacement_batch
+from fieldfixer.runtime import batch_size, render_batch, render_frame, run_apply
+
+
+def _stack(rng: np.random.Generator, n: int = 3, h: int = 9, w: int = 11):
+    imgs = rng.integers(0, 256, (n, h, w, 3), dtype=np.uint8)
+    du = rng.uniform(-3, 3, (n, h, w)).astype(np.float32)
+    dv = rng.uniform(-3, 3, (n, h, w)).astype(np.float32)
+    masks = rng.integers(0, 256, (n, h, w), dtype=np.uint8)
+    return imgs, du, dv, masks
+
+
+def test_batched_ops_match_per_frame(make_lut) -> None:
+    rng = np.random.default_rng(5)
+    imgs, du, dv, masks = _stack(rng)
+    bg = imgs[::-1].copy()
+    pool = FramePool()
+    curves = [{"exposure": 1.3}, {"exposure": 1.3}, {"gamma": 0.7, "white_balance": [1.1, 1.0, 0.9]}]
+    lut = make_lut(gamma=1.2)
+
+    warped = apply_displacement_batch(imgs, du, dv, pool=pool)
+    blended = composite_with_mask_batch(warped, bg, masks, pool=pool)
+    graded = apply_curves_batch(blended, curves)
+    looked = apply_lut_batch(graded, lut, pool=pool)
+    for i in range(len(imgs)):
+        frame = apply_displacement(imgs[i], du[i], dv[i])
+        assert np.array_equal(warped[i], frame)
+        frame = composite_with_mask(frame, bg[i], masks[i])
+        assert np.array_equal(blended[i], frame)
+        frame = apply_curves(frame, curves[i])
+        assert np.array_equal(graded[i], frame)
+        assert np.array_equal(looked[i], apply_lut(frame, lut))
+
+    in_place = blended.copy()
+    assert np.array_equal(apply_curves_batch(in_place, curves, out=in_place), graded)
+    with pytest.raises(ValueError):
+        apply_curves_batch(imgs, curves[:2])
+    with pytest.raises(ValueError):
+        apply_displacement_batch(imgs, du[:2], dv[:2])
+
+
+def test_numba_batch_kernel_matches_per_frame() -> None:
+    pytest.importorskip("numba")
+    from fieldfixer.ops.kernels import _bilinear_sample, _bilinear_sample_batch
+
+    imgs, du, dv, _ = _stack(np.random.default_rng(6))
+    out = _bilinear_sample_batch(imgs, du, dv, np.empty_like(imgs))
+    for i in range(len(imgs)):
+        assert np.array_equal(out[i], _bilinear_sample(imgs[i], du[i], dv[i], np.empty_like(imgs[i])))
+
+
+def _bake(root: Path, rng: np.random.Generator, frames: int, h: int, w: int) -> SidecarBundle:
+    writer = SidecarWriter(root)
+    for idx in range(frames):
+        du = rng.uniform(-2, 2, (h, w)) * (idx % 2)
+        dv = rng.uniform(-2, 2, (h, w)) * (idx % 2)
+        writer.write_warp(idx, du, dv)
+        mask = rng.integers(0, 256, (h, w), dtype=np.uint8)
+        writer.write_mask(idx, mask)
+        if idx == 3:  # one frame renders tile by tile
+            writer.write_tiles(idx, activity_map(du.astype(np.float32), dv.astype(np.float32), mask, tile=4))
+    writer.close()
+    (root / "curves.json").write_text('{"global": {"exposure": 1.1}, "2": {"gamma": 0.8}}')
+    (root / "meta.json").write_text('{"version": 1, "tile_size": 4}')
+    return SidecarBundle.load(root)
+
+
+class _Reader(list):
+    height, width, nframes = 8, 12, None
+
+
+class _Writer(list):
+    def write(self, rgb: np.ndarray) -> None:
+        self.append(rgb.copy())
+
+
+def test_batched_apply_matches_frame_by_frame(tmp_path: Path, make_lut) -> None:
+    rng = np.random.default_rng(7)
+    bundle = _bake(tmp_path, rng, 7, 8, 12)
+    frames = _Reader(rng.integers(0, 256, (8, 12, 3), dtype=np.uint8) for _ in range(7))
+    lut = make_lut(gamma=1.2)
+    expected = [render_frame(f, i, bundle, lut).copy() for i, f in enumerate(frames)]
+
+    stack = np.stack(frames[:4])
+    assert all(np.array_equal(a, b) for a, b in zip(render_batch(stack, [0, 1, 2, 3], bundle, lut), expected))
+
+    assert batch_size(8, 12) == 8 and batch_size(1080, 1920) == 1 and batch_size(1080, 1920, 4) == 4
+    batched = _Writer()
+    assert run_apply(frames, batched, bundle, lut, progress=False, batch_frames=3) == 7  # last batch is partial
+    assert len(batched) == 7 and all(np.array_equal(a, b) for a, b in zip(batched, expected))
+    single = _Writer()
+    run_apply(frames, single, bundle, lut, progress=False, batch_frames=1)
+    assert all(np.array_equal(a, b) for a, b in zip(single, expected))
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import numpy as np
+
+from fieldfixer.buffers import FramePool
+from fieldfixer.io.sidecar import SidecarBundle
+from fieldfixer.ops.exposure import apply_curves
+from fieldfixer.ops.lut3d import apply_lut
+from fieldfixer.ops.mask import composite_with_mask
+from fieldfixer.ops.warp import apply_displacement
+from fieldfixer.runtime import render_frame
+
+
+def test_pool_reuses_buffers() -> None:
+    pool = FramePool()
+    a = pool.get("x", (4, 4), np.float32)
+    assert pool.get("x", (4, 4), np.float32) is a
+    assert pool.get("x", (8, 4), np.float32) is not a
+    assert pool.allocations == 2
+
+
+def test_ops_out_matches_allocating_path(make_lut) -> None:
+    rng = np.random.default_rng(1)
+    img = rng.integers(0, 256, (6, 7, 3), dtype=np.uint8)
+    bg = rng.integers(0, 256, (6, 7, 3), dtype=np.uint8)
+    mask = rng.integers(0, 256, (6, 7), dtype=np.uint8)
+    du = rng.uniform(-2, 2, (6, 7)).astype(np.float32)
+    dv = rng.uniform(-2, 2, (6, 7)).astype(np.float32)
+    lut = make_lut()
+    pool = FramePool()
+    out = np.empty_like(img)
+
+    assert np.array_equal(apply_displacement(img, du, dv, out=out, pool=pool), apply_displacement(img, du, dv))
+    assert np.array_equal(composite_with_mask(img, bg, mask, out=out, pool=pool), composite_with_mask(img, bg, mask))
+    curves = {"exposure": 1.2, "gamma": 0.9}
+    assert np.array_equal(apply_curves(img, curves, out=out), apply_curves(img, curves))
+    expected = apply_lut(img, lut)
+    in_place = img.copy()
+    apply_lut(in_place, lut, out=in_place, pool=pool)
+    assert np.array_equal(in_place, expected)
+
+
+def test_render_frame_steady_state_allocates_nothing(tmp_path: Path, make_lut) -> None:
+    bundle = SidecarBundle.load(tmp_path)
+    lut = make_lut()
+    pool = FramePool()
+    frame = np.full((8, 8, 3), 100, dtype=np.uint8)
+
+    first = render_frame(frame, 0, bundle, lut, pool=pool)
+    allocations = pool.allocations
+    second = render_frame(frame, 1, bundle, lut, pool=pool)
+
+    assert pool.allocations == allocations
+    assert second is first
+    assert np.abs(second.astype(int) - 100).max() <= 1
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldfixer.io.chunked import CHECKPOINT_NAME, ChunkedVideoWriter, parts_dir_for
+from fieldfixer.io.video import VideoReader
+from fieldfixer.runtime import apply_video
+
+pytest.importorskip("av")
+
+
+def _levels(path: Path) -> list[int]:
+    reader = VideoReader(str(path))
+    levels = [int(round(frame.mean())) for frame in reader]
+    reader.close()
+    return levels
+
+
+def test_resume_after_interrupted_render(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, write_clip) -> None:
+    clip, out = tmp_path / "clip.mp4", tmp_path / "out.mp4"
+    write_clip(clip, frames=20, step=8)
+
+    # Die while rendering frame 12: chunks 0-4 and 5-9 are complete, the third is not.
+    real_write = ChunkedVideoWriter.write
+    calls = []
+
+    def flaky_write(self, rgb):
+        calls.append(1)
+        if len(calls) == 13:
+            raise MemoryError("killed")
+        real_write(self, rgb)
+
+    monkeypatch.setattr(ChunkedVideoWriter, "write", flaky_write)
+    with pytest.raises(MemoryError):
+        apply_video(clip, tmp_path / "bake", out, progress=False, resume=True, chunk_frames=5)
+    assert not out.exists()
+    assert (parts_dir_for(out) / CHECKPOINT_NAME).exists()
+
+    monkeypatch.setattr(ChunkedVideoWriter, "write", real_write)
+    rendered = apply_video(clip, tmp_path / "bake", out, progress=False, resume=True, chunk_frames=5)
+
+    assert rendered == 10
+    assert not parts_dir_for(out).exists()
+    assert _levels(out) == pytest.approx([8 * i for i in range(20)], abs=3)
+
+
+def test_checkpoint_reset_on_fingerprint_change(tmp_path: Path) -> None:
+    out = tmp_path / "out.mp4"
+    writer = ChunkedVideoWriter(out, 16, 16, 24.0, chunk_frames=2, fingerprint={"in": "a"})
+    for _ in range(3):
+        writer.write(np.zeros((16, 16, 3), dtype=np.uint8))
+    assert writer.resume_frame == 2
+
+    assert ChunkedVideoWriter(out, 16, 16, 24.0, chunk_frames=2, fingerprint={"in": "a"}).resume_frame == 2
+    assert ChunkedVideoWriter(out, 16, 16, 24.0, chunk_frames=2, fingerprint={"in": "b"}).resume_frame == 0
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+from fieldfixer.ops.kernels import warmup
+
+
+def test_cli_import_defers_heavy_modules() -> None:
+    code = (
+        "import sys, fieldfixer.cli\n"
+        "heavy = [m for m in ('numpy', 'numba', 'cv2', 'av', 'tqdm') if m in sys.modules]\n"
+        "print(','.join(heavy))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    assert result.stdout.strip() == ""
+
+
+def test_warmup_compiles_kernels() -> None:
+    signatures = warmup()
+    assert any("uint8" in sig and "'C'" in sig for sig in signatures)
+    assert any("'A'" in sig for sig in signatures)
+
+
+def test_bad_size_is_a_usage_error(tmp_path) -> None:
+    from typer.testing import CliRunner
+
+    from fieldfixer.cli import app
+
+    runner = CliRunner()
+    args = ["apply", "--in", "-", "--bake", str(tmp_path), "--out", "-", "--size", "12"]
+    for argv in (args, ["tune", "--size", "0x4", "--dry-run"]):
+        result = runner.invoke(app, argv)
+        assert result.exit_code == 2
+        assert "--size" in result.output and "WIDTHxHEIGHT" in result.output
+
+
+def test_bad_pix_fmt_is_a_usage_error(tmp_path) -> None:
+    from typer.testing import CliRunner
+
+    from fieldfixer.cli import app
+
+    runner = CliRunner()
+    args = ["apply", "--in", "-", "--bake", str(tmp_path), "--out", "-"]
+    result = runner.invoke(app, [*args, "--size", "16x16", "--pix-fmt", "bgr24"])
+    assert result.exit_code == 2 and "--pix-fmt" in result.output
+    result = runner.invoke(app, [*args, "--size", "15x16", "--pix-fmt", "yuv420p"])
+    assert result.exit_code == 2 and "even width and height" in result.output
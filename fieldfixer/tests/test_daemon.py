@@ -0,0 +1,135 @@
+import http.client
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldfixer.daemon import ApplyService, ServiceBusy, make_server
+
+pytest.importorskip("av")
+
+
+@pytest.fixture
+def daemon(tmp_path: Path):
+    service = ApplyService(max_concurrency=1, max_queue=2)
+    service.warm()
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def _post(port: int, path: str, payload: dict) -> tuple[int, dict[str, str], bytes]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("POST", path, body=json.dumps(payload), headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    body = resp.read()
+    conn.close()
+    return resp.status, dict(resp.headers), body
+
+
+def test_daemon_renders_frames_and_reports_metrics(daemon: int, tmp_path: Path, write_clip) -> None:
+    clip = tmp_path / "clip.mp4"
+    write_clip(clip, frames=4, step=50)
+    bake = tmp_path / "bake"
+    bake.mkdir()
+
+    status, headers, body = _post(daemon, "/render", {"in": str(clip), "bake": str(bake), "frame": 2, "format": "raw"})
+    assert status == 200
+    frame = np.frombuffer(body, dtype=np.uint8).reshape(int(headers["X-Height"]), int(headers["X-Width"]), 3)
+    assert abs(int(frame.mean()) - 100) <= 3
+
+    status, _, _ = _post(daemon, "/render", {"in": str(clip), "bake": str(bake), "frame": 0})
+    assert status == 200
+    status, _, body = _post(daemon, "/render", {"in": str(clip), "bake": str(bake), "frame": 99})
+    assert status == 400
+
+    status, _, body = _post(daemon, "/apply", {"in": str(clip), "bake": str(bake), "out": str(tmp_path / "out.mp4")})
+    assert status == 200
+    assert json.loads(body)["frames"] == 4
+
+    conn = http.client.HTTPConnection("127.0.0.1", daemon, timeout=30)
+    conn.request("GET", "/metrics")
+    metrics = json.loads(conn.getresponse().read())
+    conn.close()
+    assert metrics["completed"] == 3
+    assert metrics["failed"] == 1
+    assert metrics["cached_bundles"] == 1
+
+
+def test_service_rejects_when_queue_full() -> None:
+    service = ApplyService(max_concurrency=1, max_queue=0)
+    with service.slot():
+        with pytest.raises(ServiceBusy):
+            with service.slot():
+                pass
+    assert service.metrics()["rejected"] == 1
+
+
+class _Closable:
+    def __init__(self) -> None:
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_evicted_entries_close_after_last_lease() -> None:
+    service = ApplyService(cache_size=1)
+    first = _Closable()
+    with service._lease(service._cursors, "a", None, lambda: first) as held:
+        with service._lease(service._cursors, "b", None, _Closable):  # evicts "a"
+            pass
+        assert held is first and not first.closed
+    assert first.closed
+    with service._lease(service._cursors, "b", "rebuilt", _Closable) as fresh:
+        pass
+    assert not fresh.closed
+    service.close()
+    assert fresh.closed
+
+
+def test_bundle_reloads_when_bake_is_rebuilt(tmp_path: Path) -> None:
+    import os
+
+    service = ApplyService()
+    (tmp_path / "meta.json").write_text('{"version": 1}')
+    with service.bundle(str(tmp_path)) as bundle:
+        pass
+    with service.bundle(str(tmp_path)) as again:
+        assert again is bundle
+    (tmp_path / "meta.json").write_text('{"version": 1, "tile_size": 8}')
+    os.utime(tmp_path / "meta.json", ns=(1, 1))  # visible even on coarse-mtime filesystems
+    with service.bundle(str(tmp_path)) as rebuilt:
+        assert rebuilt is not bundle and rebuilt.tile_size == 8
+    service.close()
+
+
+def test_malformed_content_length_is_a_bad_request(daemon: int) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", daemon, timeout=30)
+    conn.putrequest("POST", "/render")
+    conn.putheader("Content-Length", "lots")
+    conn.endheaders()
+    resp = conn.getresponse()
+    assert resp.status == 400 and b"ValueError" in resp.read()
+    conn.close()
+
+
+def test_unix_socket_only_replaces_stale_sockets(tmp_path: Path) -> None:
+    path = tmp_path / "d.sock"
+    path.write_text("not a socket")
+    with pytest.raises(FileExistsError):
+        make_server(ApplyService(), socket_path=path)
+    assert path.read_text() == "not a socket"
+    path.unlink()
+
+    live = make_server(ApplyService(), socket_path=path)
+    with pytest.raises(FileExistsError):
+        make_server(ApplyService(), socket_path=path)
+    live.server_close()  # leaves the socket file behind, like a crashed daemon
+    make_server(ApplyService(), socket_path=path).server_close()
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from fieldfixer.equivalence import Budget, ErrorStats, Variant, format_report, run_equivalence
+
+
+def test_fast_paths_stay_within_budget() -> None:
+    results = run_equivalence()
+    report = format_report(results)
+    assert {r.variant.op for r in results} == {"warp", "composite", "warp_blend", "curves", "lut"}
+    assert all(r.passed for r in results), report
+
+
+def test_harness_flags_variant_over_budget() -> None:
+    from fieldfixer.ops.mask import composite_with_mask
+
+    def off_by_three(fg, bg, mask):
+        return np.clip(composite_with_mask(fg, bg, mask).astype(int) + 3, 0, 255).astype(np.uint8)
+
+    variant = Variant("composite", "biased", off_by_three, Budget(max_abs=1.0, mean_abs=0.75))
+    [result] = run_equivalence([variant], seeds=(0,), shapes=((8, 8),))
+    assert not result.passed
+    assert result.worst_case.startswith("seed=0")
+    assert "OVER BUDGET" in format_report([result])
+
+
+def test_error_stats() -> None:
+    ref = np.zeros((2, 2, 3))
+    out = np.full((2, 2, 3), 2, np.uint8)
+    stats = ErrorStats.compare(ref, out)
+    assert stats.max_abs == 2.0 and stats.mean_abs == 2.0
+    assert stats.psnr == pytest.approx(10 * np.log10(255.0**2 / 4))
+    assert ErrorStats.compare(ref, np.zeros((2, 2, 3), np.uint8)).psnr == float("inf")
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldfixer.io.frames import encode_frames, iter_frames, list_frames, to_uint8
+
+iio = pytest.importorskip("imageio.v3")
+
+
+def test_to_uint8_converts_into_buffer() -> None:
+    out = np.empty((1, 2, 3), dtype=np.uint8)
+    grey16 = np.array([[65535, 256]], dtype=np.uint16)
+    assert to_uint8(grey16, out=out) is out
+    assert out[0, 0].tolist() == [255, 255, 255]
+    assert out[0, 1].tolist() == [1, 1, 1]
+
+    rgba = np.zeros((1, 2, 4), dtype=np.float32)
+    rgba[..., 0] = 300.0
+    assert to_uint8(rgba, out=out)[0, 0].tolist() == [255, 0, 0]
+
+    with pytest.raises(ValueError):
+        to_uint8(np.zeros((3, 3), dtype=np.uint8), out=out)
+
+
+def test_iter_frames_preserves_order(tmp_path: Path) -> None:
+    for i in range(7):
+        iio.imwrite(tmp_path / f"{i:06d}.png", np.full((4, 4, 3), i, dtype=np.uint8))
+    paths = list_frames(tmp_path)
+    values = [int(f[0, 0, 0]) for f in iter_frames(paths, (4, 4), workers=3, readahead=2)]
+    assert values == list(range(7))
+
+
+def test_encode_frames_writes_every_frame(tmp_path: Path) -> None:
+    pytest.importorskip("av")
+    from fieldfixer.io.video import VideoReader
+
+    frames = tmp_path / "targets"
+    frames.mkdir()
+    for i in range(4):
+        iio.imwrite(frames / f"{i:06d}.png", np.full((16, 16), 4000 * i, dtype=np.uint16))
+    out = tmp_path / "preview.mp4"
+    assert encode_frames(frames, out, fps=10.0, workers=2) == 4
+
+    vr = VideoReader(str(out))
+    assert sum(1 for _ in vr) == 4
+    vr.close()
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldfixer.bake.framestore import FrameStore
+
+iio = pytest.importorskip("imageio.v3")
+
+
+def _write_frames(root: Path, count: int = 3, shape: tuple[int, int] = (10, 14)) -> list[Path]:
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        rgb = np.full(shape + (3,), 30 * i, dtype=np.uint8)
+        rgb[0, 0] = (255, 0, 0)
+        path = root / f"{i:06d}.png"
+        iio.imwrite(path, rgb)
+        paths.append(path)
+    return paths
+
+
+def test_build_from_images_with_pyramid(tmp_path: Path) -> None:
+    _write_frames(tmp_path / "frames")
+    store = FrameStore.build(tmp_path / "frames", tmp_path / "store", levels=2)
+
+    assert len(store) == 3
+    assert store.shape == (10, 14)
+    assert store.level(1).shape == (3, 5, 7, 3)
+    frame = store[2]
+    assert frame[5, 5].tolist() == [60, 60, 60]
+    assert frame[0, 0].tolist() == [255, 0, 0]
+    assert not frame.flags.writeable
+    assert np.shares_memory(frame, store.level(0))
+
+
+def test_build_reuses_store_until_source_changes(tmp_path: Path) -> None:
+    paths = _write_frames(tmp_path / "frames")
+    FrameStore.build(paths, tmp_path / "store")
+    data = tmp_path / "store" / "level0.u8"
+    stamp = data.stat().st_mtime_ns
+
+    FrameStore.build(paths, tmp_path / "store")
+    assert data.stat().st_mtime_ns == stamp
+
+    paths = _write_frames(tmp_path / "frames", count=4)
+    assert len(FrameStore.build(paths, tmp_path / "store")) == 4
+
+
+def test_empty_range_keeps_container_size(tmp_path: Path, write_clip) -> None:
+    write_clip(tmp_path / "clip.mp4", frames=3, width=16, height=12)
+    store = FrameStore.build(tmp_path / "clip.mp4", tmp_path / "store", levels=2, frame_range=(5, None))
+
+    assert len(store) == 0 and store.start == 5
+    assert store.shape == (12, 16)
+    assert store.level(1).shape == (0, 6, 8, 3)
@@ -0,0 +1,77 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldfixer.bake.exporters.pack import pack_sidecars
+from fieldfixer.io.manifest import MANIFEST_NAME, Manifest
+from fieldfixer.io.sidecar import REFS_NAME, SidecarBundle
+
+
+def _no_fs(*args, **kwargs):
+    raise AssertionError("filesystem touched after the scan")
+
+
+def test_lookups_after_scan_never_touch_the_filesystem(tmp_path: Path, monkeypatch) -> None:
+    flows = tmp_path / "flows"
+    flows.mkdir()
+    for name in ("000002.npy", "000000.npy", "notes.npy", "000001.png"):
+        (flows / name).write_bytes(b"")
+    manifest = Manifest.scan(tmp_path, ["flows", "conf"])
+
+    monkeypatch.setattr(os, "scandir", _no_fs)
+    monkeypatch.setattr(os, "stat", _no_fs)
+    assert manifest.frame_indices("flows") == [0, 2]
+    assert manifest.exists("flows/000002.npy")
+    assert not manifest.exists("flows/000001.npy")
+    assert not manifest.exists("conf/000000.npy")  # missing dirs are listed as empty
+
+
+def test_saved_manifest_rescans_only_changed_dirs(tmp_path: Path) -> None:
+    for sub in ("a", "b"):
+        (tmp_path / sub).mkdir()
+        (tmp_path / sub / "000000.npy").write_bytes(b"")
+    Manifest.scan(tmp_path, ["a", "b"]).save(tmp_path / MANIFEST_NAME)
+    (tmp_path / "b" / "000001.npy").write_bytes(b"")
+    os.utime(tmp_path / "b", ns=(1, 1))  # make the change visible even on coarse-mtime filesystems
+
+    loaded = Manifest.load(tmp_path / MANIFEST_NAME, root=tmp_path)
+    assert loaded.frame_indices("b") == [0, 1]
+    assert loaded.frame_indices("a") == [0]
+    offline = Manifest.load(tmp_path / MANIFEST_NAME, validate=False)
+    assert offline.frame_indices("b") == [0]
+
+
+def test_pack_writes_manifest_used_by_bundle(tmp_path: Path) -> None:
+    pytest.importorskip("imageio")
+    flow_dir = tmp_path / "module" / "flows"
+    flow_dir.mkdir(parents=True)
+    for idx in (0, 3):
+        np.save(flow_dir / f"{idx:06d}.npy", np.full((4, 5, 2), idx, dtype=np.float32))
+    out = tmp_path / "bake"
+    pack_sidecars([], [flow_dir], out)
+
+    doc = json.loads((out / MANIFEST_NAME).read_text())
+    assert doc["dirs"]["W"]["files"] == ["000000.npz", "000003.npz"]
+
+    # Even with refs, files the manifest lists as absent are never requested.
+    from fieldfixer.runtime import load_bake_lut
+
+    bundle = SidecarBundle.load(out)
+    bundle.store.read = bundle.store.stamp = _no_fs
+    assert bundle.has("curves.json") is False and bundle.has("meta.json") is True
+    assert bundle.load_curves(0) == {"exposure": 1.0, "gamma": 1.0}
+    assert load_bake_lut(bundle) is None
+
+    (out / REFS_NAME).unlink()  # a bake without refs falls back to the manifest
+    bundle = SidecarBundle.load(out)
+    reads = []
+    read = bundle.store.read
+    bundle.store.read = lambda name: reads.append(name) or read(name)
+    du, _ = bundle.load_warp(3, shape=(4, 5))
+    assert np.all(du == 3)
+    bundle.load_warp(1, shape=(4, 5))
+    bundle.load_mask(1, shape=(4, 5))
+    assert reads == ["W/000003.npz"]
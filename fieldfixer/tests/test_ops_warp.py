@@ -19,3 +19,20 @@ def test_apply_displacement_shift() -> None:
     du[:] = 1.0
     warped = apply_displacement(img, du, dv)
     assert warped[1, 2, 0] >= warped[1, 1, 0]
+
+
+def test_apply_displacement_window_matches_full_frame() -> None:
+    from fieldfixer.ops.kernels import _bilinear_sample, _bilinear_sample_at
+
+    rng = np.random.default_rng(3)
+    img = rng.integers(0, 256, (12, 10, 3), dtype=np.uint8)
+    du = rng.uniform(-2, 2, (12, 10)).astype(np.float32)
+    dv = rng.uniform(-2, 2, (12, 10)).astype(np.float32)
+    win = (slice(3, 9), slice(2, 7))
+
+    full = apply_displacement(img, du, dv)
+    assert np.array_equal(apply_displacement(img, du[win], dv[win], origin=(3, 2)), full[win])
+
+    ref = _bilinear_sample(img, du, dv, np.empty_like(img))
+    out = np.empty((6, 5, 3), np.uint8)
+    assert np.array_equal(_bilinear_sample_at(img, du[win], dv[win], out, 3, 2), ref[win])
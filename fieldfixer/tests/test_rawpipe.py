@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldfixer.io.rawpipe import RawFrameReader, RawFrameWriter, parse_size
+
+
+def test_parse_size() -> None:
+    assert parse_size("1920x1080") == (1920, 1080)
+    with pytest.raises(ValueError):
+        parse_size("1920")
+
+
+def test_raw_rgb_roundtrip_reuses_buffer(tmp_path: Path) -> None:
+    frames = [np.full((2, 4, 3), i, dtype=np.uint8) for i in range(3)]
+    path = tmp_path / "frames.rgb"
+    writer = RawFrameWriter(str(path), width=4, height=2)
+    for frame in frames:
+        writer.write(frame)
+    writer.close()
+
+    reader = RawFrameReader(str(path), width=4, height=2)
+    seen = []
+    buffers = set()
+    for frame in reader:
+        seen.append(frame.copy())
+        buffers.add(frame.__array_interface__["data"][0])
+    reader.close()
+
+    assert len(seen) == 3
+    assert all(np.array_equal(a, b) for a, b in zip(seen, frames))
+    assert len(buffers) == 1
+
+
+def test_raw_yuv420p_roundtrip(tmp_path: Path) -> None:
+    frame = np.full((4, 4, 3), 128, dtype=np.uint8)
+    path = tmp_path / "frames.yuv"
+    writer = RawFrameWriter(str(path), width=4, height=4, pix_fmt="yuv420p")
+    writer.write(frame)
+    writer.close()
+    assert path.stat().st_size == 4 * 4 * 3 // 2
+
+    reader = RawFrameReader(str(path), width=4, height=4, pix_fmt="yuv420p")
+    out = list(frame.copy() for frame in reader)
+    reader.close()
+    assert len(out) == 1
+    assert np.abs(out[0].astype(int) - 128).max() <= 2
+
+
+def test_raw_reader_rejects_truncated_frame(tmp_path: Path) -> None:
+    path = tmp_path / "short.rgb"
+    path.write_bytes(b"\x00" * 10)
+    reader = RawFrameReader(str(path), width=2, height=2)
+    with pytest.raises(EOFError):
+        list(reader)
+    reader.close()
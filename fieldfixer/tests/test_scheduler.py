@@ -0,0 +1,150 @@
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from fieldfixer.bake.scheduler import MARKER_NAME, Scheduler, file_fingerprint
+
+pytest.importorskip("av")
+
+
+def test_scheduler_respects_cpu_budget_and_dependencies(tmp_path: Path) -> None:
+    lock = threading.Lock()
+    active, peak, order = [0], [0], []
+
+    def step(name):
+        def run(ctx):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+                order.append(name)
+            return {"name": name}
+
+        return run
+
+    sched = Scheduler(tmp_path, cpus=2, mem_mb=0)
+    sched.add("a", step("a"))
+    for name in ("b", "c", "d"):
+        sched.add(name, step(name), deps=("a",))
+    sched.add("e", step("e"), deps=("b", "c", "d"))
+    results = sched.run()
+
+    assert all(r.status == "ok" for r in results.values())
+    assert order[0] == "a" and order[-1] == "e"
+    assert peak[0] == 2
+
+
+def test_scheduler_caches_and_reruns_only_changed_nodes(tmp_path: Path) -> None:
+    calls = []
+
+    def build(config):
+        sched = Scheduler(tmp_path, input_key="clip-1")
+        sched.add("fit", lambda ctx: calls.append("fit") or {"gain": ctx.config["gain"]}, config=config)
+        sched.add("other", lambda ctx: calls.append("other") or {})
+        sched.add("pack", lambda ctx: calls.append("pack") or {}, deps=("fit", "other"))
+        return sched
+
+    build({"gain": 1}).run()
+    assert sorted(calls) == ["fit", "other", "pack"]
+    calls.clear()
+
+    assert {r.status for r in build({"gain": 1}).run().values()} == {"cached"}
+    assert calls == []
+
+    results = build({"gain": 2}).run()
+    assert sorted(calls) == ["fit", "pack"]
+    assert results["other"].status == "cached"
+    assert len(list((tmp_path / "nodes").glob("fit-*"))) == 1
+
+
+def test_scheduler_skips_stubs_and_blocks_after_failure(tmp_path: Path) -> None:
+    def stub(ctx):
+        raise NotImplementedError("pending")
+
+    def boom(ctx):
+        raise OSError("disk full")
+
+    sched = Scheduler(tmp_path)
+    sched.add("stub", stub)
+    sched.add("after_stub", lambda ctx: {"upstream": ctx.deps["stub"].status}, deps=("stub",))
+    sched.add("boom", boom)
+    sched.add("after_boom", lambda ctx: {}, deps=("boom",))
+    results = sched.run()
+
+    assert results["stub"].status == "skipped"
+    assert results["after_stub"].data == {"upstream": "skipped"}
+    assert results["boom"].status == "failed" and "disk full" in results["boom"].error
+    assert results["after_boom"].status == "blocked"
+
+    cyclic = Scheduler(tmp_path)
+    cyclic.add("x", lambda ctx: {}, deps=("y",))
+    cyclic.add("y", lambda ctx: {}, deps=("x",))
+    with pytest.raises(ValueError):
+        cyclic.run()
+
+
+def test_run_bake_falls_back_to_identity_and_reuses_cache(tmp_path: Path, write_clip) -> None:
+    from fieldfixer.bake.pipeline import run_bake
+    from fieldfixer.io.sidecar import SidecarBundle
+
+    write_clip(tmp_path / "clip.mp4", frames=4)
+    out = tmp_path / "bake"
+
+    results = run_bake(tmp_path / "clip.mp4", out, "quality", ["rsnerf", "nerfw"])
+    assert results["rsnerf"].status == "skipped"
+    assert results["pack"].status == "ok"
+    meta = json.loads((out / "meta.json").read_text())
+    assert meta["frames"] == 4 and meta["nodes"]["nerfw"] == "skipped"
+    du, dv = SidecarBundle.load(out).load_warp(3, shape=(16, 16))
+    assert not du.any() and not dv.any()
+
+    assert not (out / MARKER_NAME).exists()  # the marker stays in the work dir
+
+    again = run_bake(tmp_path / "clip.mp4", out, "quality", ["rsnerf", "nerfw"])
+    assert again["frames"].status == "cached"
+    assert again["pack"].status == "cached"
+
+    shutil.rmtree(out)  # a deleted bake is rebuilt, not reported as cached
+    assert run_bake(tmp_path / "clip.mp4", out, "quality", ["rsnerf", "nerfw"])["pack"].status == "ok"
+    assert (out / "meta.json").exists()
+
+
+def test_run_bake_of_empty_clip_writes_one_identity_frame(tmp_path: Path, monkeypatch, write_clip) -> None:
+    from fieldfixer.bake import framestore
+    from fieldfixer.bake.pipeline import run_bake
+    from fieldfixer.io.sidecar import SidecarBundle
+
+    write_clip(tmp_path / "clip.mp4", frames=2, width=16, height=12)
+    decode = framestore._decode
+
+    def no_frames(*args):
+        _, fps, size = decode(*args)
+        return iter(()), fps, size  # stands in for a container with no decodable frames
+
+    monkeypatch.setattr(framestore, "_decode", no_frames)
+    run_bake(tmp_path / "clip.mp4", tmp_path / "bake", "quality", [])
+    meta = json.loads((tmp_path / "bake" / "meta.json").read_text())
+    assert (meta["frames"], meta["width"], meta["height"]) == (1, 16, 12)
+    du, _ = SidecarBundle.load(tmp_path / "bake").load_warp(0, shape=(12, 16))
+    assert not du.any()
+
+    with pytest.raises(RuntimeError, match="past the end"):
+        run_bake(tmp_path / "clip.mp4", tmp_path / "shard", "quality", [], frame_range=(4, None))
+
+def test_file_fingerprint_tracks_changes_without_reading(tmp_path: Path, monkeypatch) -> None:
+    import builtins
+    import os
+
+    clip = tmp_path / "clip.mp4"
+    clip.write_bytes(b"x" * 64)
+    monkeypatch.setattr(builtins, "open", lambda *a, **k: pytest.fail("file was read"))
+    key = file_fingerprint(clip)
+    assert file_fingerprint(clip) == key
+    os.utime(clip, ns=(1, 1))
+    assert file_fingerprint(clip) != key
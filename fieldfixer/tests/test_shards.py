@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldfixer.io.shards import ShardedBundle, _join, merge_shards, parse_frame_range
+from fieldfixer.io.sidecar import SidecarBundle, SidecarWriter
+
+
+def _shard(root: Path, start: int, end: int, shape: tuple[int, int] = (4, 6)) -> Path:
+    writer = SidecarWriter(root)
+    for idx in range(start, end):
+        writer.write_warp(idx, np.full(shape, idx), np.zeros(shape))
+    writer.close()
+    (root / "LUT").mkdir()
+    (root / "LUT" / "scene.cube").write_text("LUT_3D_SIZE 2\n")
+    meta = {"version": 1, "height": shape[0], "width": shape[1], "tile_size": 64, "shard": {"start": start, "end": end}}
+    (root / "meta.json").write_text(json.dumps(meta))
+    return root
+
+
+def test_parse_frame_range() -> None:
+    assert parse_frame_range("600:1200") == (600, 1200)
+    assert parse_frame_range("600:") == (600, None)
+    for bad in ("600", "5:5", "-1:4", "a:b"):
+        with pytest.raises(ValueError):
+            parse_frame_range(bad)
+
+
+def test_merged_shards_open_as_one_bundle(tmp_path: Path) -> None:
+    shards = [_shard(tmp_path / "s1", 3, 7), _shard(tmp_path / "s0", 0, 3)]
+    meta = merge_shards(shards, tmp_path / "bake", frames=7)
+
+    assert [s["path"] for s in meta["shards"]] == ["../s0", "../s1"]
+    assert not (tmp_path / "bake" / "W").exists()  # shards are referenced, not copied
+    bundle = SidecarBundle.load(tmp_path / "bake")
+    assert isinstance(bundle, ShardedBundle)
+    for idx in range(7):
+        du, _ = bundle.load_warp(idx, shape=(4, 6))
+        assert np.all(du == idx)
+    du, _ = bundle.load_warp(7, shape=(4, 6))
+    assert not du.any()
+    bundle.close()
+
+
+def test_merge_validates_shape_and_coverage(tmp_path: Path) -> None:
+    a = _shard(tmp_path / "a", 0, 4)
+    b = _shard(tmp_path / "b", 6, 8)
+    with pytest.raises(ValueError, match="uncovered: 4:6"):
+        merge_shards([a, b], tmp_path / "bake")
+    with pytest.raises(ValueError, match="uncovered: 8:10"):
+        merge_shards([a, _shard(tmp_path / "c", 4, 8)], tmp_path / "bake", frames=10)
+    with pytest.raises(ValueError, match="overlaps"):
+        merge_shards([a, _shard(tmp_path / "d", 3, 6)], tmp_path / "bake")
+    with pytest.raises(ValueError, match="width"):
+        merge_shards([a, _shard(tmp_path / "e", 4, 6, shape=(4, 8))], tmp_path / "bake")
+
+    meta = merge_shards([a, b], tmp_path / "bake", allow_gaps=True)
+    assert meta["gaps"] == [[4, 6]]
+    du, _ = SidecarBundle.load(tmp_path / "bake").load_warp(5, shape=(4, 6))
+    assert not du.any()
+
+
+def test_sharded_bake_matches_range(tmp_path: Path) -> None:
+    pytest.importorskip("av")
+    from fieldfixer.bake.pipeline import run_bake
+    from fieldfixer.io.video import VideoWriter
+
+    clip = tmp_path / "clip.mp4"
+    vw = VideoWriter(clip, width=16, height=16, fps=24, crf=18)
+    for i in range(6):
+        vw.write(np.full((16, 16, 3), 30 * i, dtype=np.uint8))
+    vw.close()
+
+    run_bake(clip, tmp_path / "s0", "quality", [], frame_range=(0, 4))
+    run_bake(clip, tmp_path / "s1", "quality", [], frame_range=(4, None))
+    meta = json.loads((tmp_path / "s1" / "meta.json").read_text())
+    assert meta["shard"] == {"start": 4, "end": 6}
+    refs = json.loads((tmp_path / "s1" / "refs.json").read_text())
+    assert sorted(map(int, refs["frames"]["W"])) == [4, 5]
+
+    merged = merge_shards([tmp_path / "s0", tmp_path / "s1"], tmp_path / "bake", frames=6)
+    assert merged["frame_count"] == 6
+
+
+def test_remote_shard_paths_are_resolved(monkeypatch) -> None:
+    assert _join("https://host/runs/bake", "../s0") == "https://host/runs/s0"
+    assert _join("https://host/runs/bake/", "shards/s1") == "https://host/runs/bake/shards/s1"
+
+    opened = []
+    monkeypatch.setattr(SidecarBundle, "load", classmethod(lambda cls, root, store=None: opened.append(root)))
+    meta = {"layout": "shards", "shards": [{"path": "../s0", "start": 0, "end": 4}]}
+    bundle = ShardedBundle.from_index("https://host/runs/bake", meta, store=object())
+    bundle._shard(2)
+    assert opened == ["https://host/runs/s0"]
@@ -3,7 +3,7 @@ from pathlib import Path
 
 import numpy as np
 
-from fieldfixer.io.sidecar import SidecarBundle
+from fieldfixer.io.sidecar import SidecarBundle, SidecarWriter
 
 
 def test_sidecar_identity(tmp_path: Path) -> None:
@@ -27,3 +27,29 @@ def test_sidecar_reads_meta(tmp_path: Path) -> None:
     (tmp_path / "meta.json").write_text(json.dumps(meta))
     bundle = SidecarBundle.load(tmp_path)
     assert bundle.meta == meta
+
+
+def test_sidecar_writer_deduplicates_payloads(tmp_path: Path) -> None:
+    writer = SidecarWriter(tmp_path)
+    zeros = np.zeros((4, 4), dtype=np.float32)
+    ramp = np.arange(16, dtype=np.float32).reshape(4, 4)
+    for idx in range(3):
+        writer.write_warp(idx, zeros, zeros)
+        writer.write_mask(idx, np.full((4, 4), 255, dtype=np.uint8))
+    writer.write_warp(3, ramp, zeros)
+    writer.write_mask(3, np.full((4, 4), 255, dtype=np.uint8))
+    writer.close()
+
+    assert sorted(p.name for p in (tmp_path / "W").iterdir()) == ["000000.npz", "000003.npz"]
+    assert [p.name for p in (tmp_path / "M").iterdir()] == ["000000.png"]
+
+    bundle = SidecarBundle.load(tmp_path)
+    du0, _ = bundle.load_warp(0, shape=(4, 4))
+    du2, _ = bundle.load_warp(2, shape=(4, 4))
+    du3, _ = bundle.load_warp(3, shape=(4, 4))
+    assert du2 is du0  # decoded once, shared by hash
+    assert not du0.flags.writeable
+    assert np.array_equal(du3, ramp)
+    assert bundle.load_mask(1, shape=(4, 4)) is bundle.load_mask(3, shape=(4, 4))
+    # Frames missing from the reference table fall back to identity.
+    assert np.all(bundle.load_mask(9, shape=(4, 4)) == 255)
@@ -0,0 +1,124 @@
+import json
+import re
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldfixer.io.sidecar import SidecarBundle
+from fieldfixer.io.storage import DiskCache, HTTPStore
+
+iio = pytest.importorskip("imageio.v3")
+
+
+class _RangeHandler(SimpleHTTPRequestHandler):
+    """Static file handler with single-range support, standing in for object storage."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:  # noqa: ANN002 - silence test output
+        pass
+
+    def do_GET(self) -> None:
+        path = Path(self.translate_path(self.path))
+        if not path.is_file():
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = path.read_bytes()
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+            body = data[start : end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            body = data
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def served_bake(tmp_path: Path):
+    bake = tmp_path / "bake"
+    (bake / "W").mkdir(parents=True)
+    (bake / "M").mkdir()
+    rng = np.random.default_rng(0)
+    du = rng.standard_normal((16, 16)).astype(np.float16)
+    np.savez(bake / "W" / "000000.npz", du=du, dv=-du)
+    iio.imwrite(bake / "M" / "000000.png", np.full((16, 16), 128, dtype=np.uint8))
+    (bake / "meta.json").write_text(json.dumps({"version": 1, "width": 16}))
+    (bake / "curves.json").write_text(json.dumps({"global": {"exposure": 1.5, "gamma": 1.0}}))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_RangeHandler, directory=str(bake)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield bake, f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_bundle_matches_local(served_bake, tmp_path: Path) -> None:
+    bake, url = served_bake
+    store = HTTPStore(url, cache_dir=tmp_path / "cache", block_size=256, readahead=2)
+    remote = SidecarBundle.load(url, store=store)
+    local = SidecarBundle.load(bake)
+
+    assert remote.meta == local.meta
+    for a, b in zip(remote.load_warp(0, (16, 16)), local.load_warp(0, (16, 16))):
+        assert np.array_equal(a, b)
+    assert np.array_equal(remote.load_mask(0, (16, 16)), local.load_mask(0, (16, 16)))
+    assert remote.load_curves(3)["exposure"] == 1.5
+    # Missing frames fall back to identity just like a local bake.
+    assert np.all(remote.load_mask(5, (16, 16)) == 255)
+    # The npz is larger than one block, so it was fetched in several ranges over few connections.
+    assert store.requests > 4
+    assert store.connections_opened <= 4
+    remote.close()
+
+
+def test_http_store_reuses_disk_cache(served_bake, tmp_path: Path) -> None:
+    _, url = served_bake
+    first = HTTPStore(url, cache_dir=tmp_path / "cache", readahead=0)
+    data = first.read("W/000000.npz")
+    first.close()
+
+    second = HTTPStore(url, cache_dir=tmp_path / "cache", readahead=0)
+    assert second.read("W/000000.npz") == data
+    assert second.requests == 0
+    assert second.read_range("W/000000.npz", 2, 5) == data[2:7]
+    second.close()
+
+
+def test_remote_lut_is_not_revalidated_per_frame(served_bake, tmp_path: Path) -> None:
+    from fieldfixer.runtime import load_bake_lut
+
+    bake, url = served_bake
+    (bake / "LUT").mkdir()
+    corners = [f"{r} {g} {b}" for b in (0, 1) for g in (0, 1) for r in (0, 1)]
+    (bake / "LUT" / "scene.cube").write_text("LUT_3D_SIZE 2\n" + "\n".join(corners) + "\n")
+    store = HTTPStore(url, cache_dir=tmp_path / "cache", readahead=0)
+    bundle = SidecarBundle.load(url, store=store)
+
+    lut = load_bake_lut(bundle)
+    assert lut is not None and lut["size"] == 2
+    requests = store.requests
+    assert all(load_bake_lut(bundle) is lut for _ in range(5))
+    assert store.requests == requests
+    bundle.close()
+
+def test_disk_cache_evicts_to_size_bound(tmp_path: Path) -> None:
+    cache = DiskCache(tmp_path, max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    cache.put("c", b"12345")
+    assert cache.nbytes <= 10
+    assert cache.get("c") == b"12345"
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= 10
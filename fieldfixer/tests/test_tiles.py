@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import numpy as np
+
+from fieldfixer.io.sidecar import SidecarBundle, SidecarWriter
+from fieldfixer.ops.mask import composite_with_mask
+from fieldfixer.ops.tiles import active_regions, activity_map, warp_blend_tiles
+from fieldfixer.ops.warp import apply_displacement
+
+
+def _sparse_case(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (70, 90, 3), dtype=np.uint8)
+    du = np.zeros((70, 90), np.float32)
+    dv = np.zeros((70, 90), np.float32)
+    mask = np.full((70, 90), 255, np.uint8)
+    du[5:20, 40:60] = rng.uniform(-3, 3, (15, 20))
+    dv[5:20, 40:60] = rng.uniform(-3, 3, (15, 20))
+    mask[50:66, 2:9] = 128
+    return frame, du, dv, mask
+
+
+def test_activity_map_marks_motion_and_soft_mask() -> None:
+    _, du, dv, mask = _sparse_case()
+    active = activity_map(du, dv, mask, tile=16)
+    assert active.shape == (5, 6)
+    expected = np.zeros((5, 6), bool)
+    expected[0:2, 2:4] = True  # motion at rows 5-19, cols 40-59
+    expected[3:5, 0] = True  # soft mask at rows 50-65, cols 2-8
+    assert np.array_equal(active, expected)
+
+    regions = active_regions(active, 16, (70, 90))
+    covered = np.zeros((70, 90), bool)
+    for y0, y1, x0, x1 in regions:
+        covered[y0:y1, x0:x1] = True
+    assert np.array_equal(covered, np.kron(active, np.ones((16, 16), bool))[:70, :90])
+    assert len(regions) == 2
+
+
+def test_warp_blend_tiles_matches_full_frame() -> None:
+    frame, du, dv, mask = _sparse_case(1)
+    full = composite_with_mask(apply_displacement(frame, du, dv), frame, mask)
+    active = activity_map(du, dv, mask, tile=16)
+    tiled = warp_blend_tiles(frame, du, dv, mask, active, 16)
+    assert np.abs(tiled.astype(int) - full.astype(int)).max() <= 1
+
+
+def test_bundle_roundtrips_tiles(tmp_path: Path) -> None:
+    writer = SidecarWriter(tmp_path)
+    idle = np.zeros((2, 3), bool)
+    busy = idle.copy()
+    busy[1, 2] = True
+    for idx, tiles in enumerate([idle, idle, busy]):
+        writer.write_tiles(idx, tiles)
+    writer.close()
+    (tmp_path / "meta.json").write_text('{"tile_size": 16}')
+
+    bundle = SidecarBundle.load(tmp_path)
+    assert bundle.tile_size == 16
+    assert writer.unique_payloads["T"] == 2
+    assert not bundle.load_tiles(1).any()
+    assert np.array_equal(bundle.load_tiles(2), busy)
+    assert bundle.load_tiles(7) is None
@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from fieldfixer.buffers import FramePool
+from fieldfixer.io.sidecar import SidecarBundle, SidecarWriter
+from fieldfixer.runtime import render_frame
+from fieldfixer.tuning import TunedSettings, load_profile, resolve_settings, save_profile, tune
+
+
+def test_banded_render_matches_single_thread(tmp_path: Path, make_lut) -> None:
+    rng = np.random.default_rng(3)
+    h, w = 37, 29
+    writer = SidecarWriter(tmp_path)
+    writer.write_warp(0, rng.uniform(-3, 3, (h, w)), rng.uniform(-3, 3, (h, w)))
+    writer.write_mask(0, rng.integers(0, 256, (h, w), dtype=np.uint8))
+    writer.close()
+    bundle = SidecarBundle.load(tmp_path)
+    frame = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    lut = make_lut(gamma=1.2)
+
+    expected = render_frame(frame, 0, bundle, lut).copy()
+    pool = FramePool()
+    with ThreadPoolExecutor(3) as executor:
+        banded = render_frame(frame, 0, bundle, lut, pool=pool, executor=executor, band_rows=8)
+        assert np.array_equal(banded, expected)
+        allocations = pool.allocations
+        render_frame(frame, 0, bundle, lut, pool=pool, executor=executor, band_rows=8)
+    assert pool.allocations == allocations
+
+
+def test_profile_roundtrip_picks_nearest_size(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "tuned.json"
+    monkeypatch.setenv("FIELDFIXER_TUNED", str(path))
+    assert load_profile(1920, 1080) is None
+    assert resolve_settings(1920, 1080) == TunedSettings()
+
+    save_profile(1280, 720, TunedSettings(workers=2, band_rows=64, readahead=2))
+    save_profile(3840, 2160, TunedSettings(workers=8, band_rows=128, readahead=8))
+
+    assert load_profile(1920, 1080).workers == 2
+    assert load_profile(4096, 2160).workers == 8
+    assert load_profile().workers == 8  # most recently tuned
+    assert resolve_settings(4096, 2160, workers=1, readahead=None) == TunedSettings(
+        workers=1, band_rows=128, readahead=8
+    )
+
+    path.write_text("{not json")
+    assert load_profile(1920, 1080) is None
+
+
+def test_tune_measures_every_stage(tmp_path: Path) -> None:
+    seen = []
+    settings, trials = tune(48, 40, frames=1, clip_frames=4, cpus=2, log=seen.append)
+
+    assert seen == trials
+    # Batch sizes are only searched when a single render thread wins.
+    single = settings.workers == 1
+    stages = {"render", "batch", "decode", "threads"} if single else {"render", "decode", "threads"}
+    assert {t.stage for t in trials} == stages
+    if single:
+        assert {t.settings["batch_frames"] for t in trials if t.stage == "batch"} == {1, 2, 4, 8}
+    else:
+        assert settings.batch_frames == 1
+    assert {t.settings["readahead"] for t in trials if t.stage == "decode"} == {0, 2, 4, 8}
+    assert [t.settings["decode_threads"] for t in trials if t.stage == "threads"] == [1, 2, 0]
+    assert settings.workers in (1, 2)
+    assert settings.batch_workers == 2 // settings.workers
+    assert settings.fps > 0
+
+
+def test_tune_handles_odd_sizes() -> None:
+    settings, trials = tune(47, 39, frames=1, clip_frames=2, cpus=1)
+    assert {t.stage for t in trials} >= {"render", "decode", "threads"}
+    assert settings.fps > 0
@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from fieldfixer.buffers import FramePool
+from fieldfixer.io.video import VideoReader
+
+av = pytest.importorskip("av")
+
+
+def _plain(path: Path) -> list[np.ndarray]:
+    reader = VideoReader(str(path), threads=1, thread_type="SLICE")
+    frames = list(reader)
+    reader.close()
+    return frames
+
+
+def test_pooled_readahead_matches_plain_decode(tmp_path: Path, write_clip) -> None:
+    write_clip(tmp_path / "clip.mp4", frames=12, height=18, step=16, gop=4)
+    expected = _plain(tmp_path / "clip.mp4")
+
+    pool = FramePool()
+    reader = VideoReader(str(tmp_path / "clip.mp4"), readahead=3, pool=pool)
+    seen = [frame.copy() for frame in reader]
+    reader.close()
+
+    assert len(seen) == len(expected) == 12
+    assert all(np.array_equal(a, b) for a, b in zip(seen, expected))
+    assert pool.allocations == 5  # readahead + 2 ring slots, reused for every frame
+
+
+def test_frames_into_and_seek(tmp_path: Path, write_clip) -> None:
+    write_clip(tmp_path / "clip.mp4", frames=12, height=18, step=16, gop=4)
+    expected = _plain(tmp_path / "clip.mp4")
+
+    reader = VideoReader(str(tmp_path / "clip.mp4"), readahead=2)
+    out = np.empty((18, 16, 3), dtype=np.uint8)
+    first = next(reader.frames_into(out))
+    assert first is out and np.array_equal(out, expected[0])
+
+    reader.seek(7)
+    rest = list(reader)
+    reader.close()
+    assert len(rest) == 5
+    assert np.array_equal(rest[0], expected[7])
+
+    with pytest.raises(ValueError):
+        VideoReader.to_rgb(av.VideoFrame.from_ndarray(expected[0], format="rgb24"), np.empty((4, 4, 3), np.uint8))
+
+
+def _write_av_clip(path: Path, fmt: str | None = None, offset: float = 0.0) -> None:
+    from fractions import Fraction
+
+    container = av.open(str(path), mode="w", format=fmt)
+    video = container.add_stream("libx264", rate=24)
+    video.width, video.height, video.pix_fmt = 32, 16, "yuv420p"
+    audio = container.add_stream("aac", rate=48000)
+    audio.layout = "mono"
+    for i in range(24):
+        frame = av.VideoFrame.from_ndarray(np.full((16, 32, 3), 8 * i, dtype=np.uint8), format="rgb24")
+        frame.pts, frame.time_base = i + round(offset * 24), Fraction(1, 24)
+        for packet in video.encode(frame):
+            container.mux(packet)
+    for k in range(47):
+        samples = np.sin(np.arange(k * 1024, (k + 1) * 1024) / 20.0).astype(np.float32)[None] * 0.2
+        frame = av.AudioFrame.from_ndarray(samples, format="fltp", layout="mono")
+        frame.sample_rate, frame.pts, frame.time_base = 48000, k * 1024 + round(offset * 48000), Fraction(1, 48000)
+        for packet in audio.encode(frame):
+            container.mux(packet)
+    for stream in (video, audio):
+        for packet in stream.encode():
+            container.mux(packet)
+    container.close()
+
+
+def _packets(path: Path) -> dict[str, list[float]]:
+    times: dict[str, list[float]] = {}
+    with av.open(str(path)) as container:
+        for packet in container.demux():
+            if packet.pts is not None:
+                times.setdefault(packet.stream.type, []).append(float(packet.pts * packet.time_base))
+    return times
+
+
+@pytest.mark.parametrize("resume", [False, True])
+def test_apply_copies_audio_in_sync(tmp_path: Path, resume: bool) -> None:
+    from fieldfixer.runtime import apply_video
+
+    src = tmp_path / "clip.ts"
+    _write_av_clip(src, fmt="mpegts", offset=1.5)
+    out = tmp_path / "out.mp4"
+    assert apply_video(src, tmp_path, out, progress=False, resume=resume, chunk_frames=10) == 24
+
+    before, after = _packets(src), _packets(out)
+    assert len(after["audio"]) == len(before["audio"])
+    assert len(after["video"]) == 24
+    # Audio keeps its offset from the video (chunked output restarts both at the video start).
+    lead = min(before["audio"]) - min(before["video"])
+    assert min(after["audio"]) - min(after["video"]) == pytest.approx(lead, abs=0.03)
+    if not resume:
+        assert min(after["video"]) == pytest.approx(1.5, abs=1e-3)
+
+    plain = tmp_path / "plain.mp4"
+    apply_video(src, tmp_path, plain, progress=False, passthrough=False)
+    assert set(_packets(plain)) == {"video"}